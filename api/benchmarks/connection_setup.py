@@ -0,0 +1,77 @@
+"""Benchmark building connection URLs and finding the ODBC driver, per call vs cached.
+
+Before connection settings were cached, every engine, handler and query re-read the .env
+file, rebuilt the URL and enumerated the ODBC drivers. This compares that per-call cost
+with the cached lookups used now.
+
+Run from the api folder:
+    python -m benchmarks.connection_setup
+"""
+import time
+from typing import Callable
+from pyodbc import drivers
+from database.database_helper import (
+    DatabaseEnvVariables,
+    create_sql_server_connection_string,
+    load_connection_config,
+    reload_connection_config,
+)
+from helper.database_handler import get_sql_server_driver_name
+
+ENV_VARIABLES = DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+
+
+def time_calls(function: Callable[[], object], calls: int) -> float:
+    """Average microseconds per call
+
+    Args:
+        function (Callable[[], object]): function to time
+        calls (int): number of calls
+
+    Returns:
+        float: microseconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def uncached_connection_string() -> None:
+    """What each connection used to do: read .env, build the URL and list the drivers"""
+    load_connection_config()
+    create_sql_server_connection_string.__wrapped__(ENV_VARIABLES)
+    drivers()
+
+
+def cached_connection_string() -> None:
+    """What each connection does now"""
+    create_sql_server_connection_string(ENV_VARIABLES)
+    get_sql_server_driver_name()
+
+
+def run_benchmark(calls: int = 1000) -> dict[str, float]:
+    """Time connection setup per call and cached
+
+    Args:
+        calls (int, optional): calls to time each way. Defaults to 1000.
+
+    Returns:
+        dict[str, float]: microseconds per call for each way
+    """
+    reload_connection_config()
+    # first call does the real work, the rest are cache hits
+    startup_us = time_calls(cached_connection_string, 1)
+
+    return {
+        'per_call_us': time_calls(uncached_connection_string, calls),
+        'startup_us': startup_us,
+        'cached_us': time_calls(cached_connection_string, calls),
+    }
+
+
+if __name__ == "__main__":
+    benchmark_results = run_benchmark()
+    print(f"uncached: {benchmark_results['per_call_us']:.1f} us per connection")
+    print(f"cached:   {benchmark_results['cached_us']:.2f} us per connection "
+          f"(one-off startup cost {benchmark_results['startup_us']:.1f} us)")
@@ -0,0 +1,196 @@
+"""Benchmark round trips against a simulated remote database (see simulated_database).
+
+Each statement waits a simulated network round trip, so the timings show what batching
+inserts, loading a season's queries concurrently and fanning out independent selects
+over pooled connections save against a remote SQL Server.
+
+Run from the api folder:
+    python -m benchmarks.round_trips --latency-ms 2 --jitter-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+from data.excel_conversion import Division, Game, Season, Team
+from database.database_helper import engine_registry
+from database.insert.db_insert import add_entire_season_to_database
+from database.select.db_select import get_entire_season
+from helper.async_database_handler import async_run_multiple_select_queries
+from benchmarks.season_load import get_entire_season_sequential
+from benchmarks.simulated_database import (
+    CONNECTION_STRING_VARIABLE,
+    ENV_VARIABLES,
+    SimulatedDatabase,
+)
+
+SEASON_YEAR = 2023
+CONFERENCES = ('AFC', 'NFC')
+DIVISIONS = ('East', 'North', 'South', 'West')
+
+
+def synthetic_season(
+    season_year: int,
+) -> tuple[Season, list[Division], list[Team], list[Game]]:
+    """A completed season of 32 teams in 8 divisions, each playing 17 games
+
+    Args:
+        season_year (int): season year
+
+    Returns:
+        tuple[Season, list[Division], list[Team], list[Game]]: season information,
+            divisions, teams and games with results and team stats
+    """
+    season_info = Season(season_year, f'{season_year}-{season_year + 1}', 14, 18)
+
+    divisions: list[Division] = []
+    teams: list[Team] = []
+    for division_index in range(8):
+        conference = CONFERENCES[division_index // 4]
+        division_name = f'{conference} {DIVISIONS[division_index % 4]}'
+        divisions.append(Division(division_name, conference))
+
+        for team_index in range(4):
+            team_number = division_index * 4 + team_index
+            teams.append(
+                Team(
+                    f'City {team_number}',
+                    f'Team {team_number}',
+                    f'City {team_number} Team {team_number}',
+                    division_name,
+                )
+            )
+
+    games: list[Game] = []
+    for week in range(1, 18):
+        for pairing in range(16):
+            game_number = (week - 1) * 16 + pairing
+            away_team, home_team = teams[pairing], teams[(pairing + week) % 16 + 16]
+            games.append(
+                Game(
+                    week,
+                    f'Week {week}',
+                    datetime(season_year, 9, 7),
+                    away_team.full_name,
+                    home_team.full_name,
+                    (game_number * 7) % 38,
+                    (game_number * 11) % 41,
+                    False,
+                    300 + game_number % 150,
+                    game_number % 4,
+                    (game_number * 7) % 38 // 7,
+                    300 + game_number * 3 % 150,
+                    game_number % 3,
+                    (game_number * 11) % 41 // 7,
+                )
+            )
+
+    return season_info, divisions, teams, games
+
+
+async def median_ms(
+    function: Callable[[], Awaitable[object]], repeats: int
+) -> float:
+    """Median milliseconds per call
+
+    Args:
+        function (Callable[[], Awaitable[object]]): coroutine function to time
+        repeats (int): number of calls
+
+    Returns:
+        float: median milliseconds
+    """
+    timings: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run_benchmark(
+    latency_ms: float = 2.0,
+    jitter_ms: float = 0.5,
+    max_concurrent_queries: int = 8,
+    repeats: int = 20,
+) -> dict[str, dict[str, float]]:
+    """Insert a season, then time season loads and fanned-out selects against a
+        simulated remote database
+
+    Args:
+        latency_ms (float, optional): simulated round trip. Defaults to 2.0.
+        jitter_ms (float, optional): round trip jitter. Defaults to 0.5.
+        max_concurrent_queries (int, optional): statements the simulated server runs at
+            once. Defaults to 8.
+        repeats (int, optional): runs of each timed load. Defaults to 20.
+
+    Returns:
+        dict[str, dict[str, float]]: benchmark name mapped to its milliseconds and
+            round trips
+    """
+    results: dict[str, dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory() as directory, SimulatedDatabase(
+        os.path.join(directory, 'NFL_Stats.db'), latency_ms, jitter_ms, max_concurrent_queries
+    ) as database:
+        # add_entire_season_to_database asks for an echoing engine, which would print
+        #   every statement
+        engine_registry.get_async_engine(ENV_VARIABLES, True).echo = False
+
+        start = time.perf_counter()
+        await add_entire_season_to_database(*synthetic_season(SEASON_YEAR), True)
+        results['insert season'] = {
+            'ms': (time.perf_counter() - start) * 1000,
+            'round_trips': database.round_trips,
+            'rows': database.parameter_sets,
+        }
+
+        loaders = {
+            'load season sequentially': lambda: get_entire_season_sequential(SEASON_YEAR),
+            'load season concurrently': lambda: get_entire_season(SEASON_YEAR),
+        }
+
+        select_queries = [
+            ('SELECT COUNT(*) FROM Game WHERE Week = :week', {'week': week})
+            for week in range(1, 18)
+        ]
+        for name, max_concurrent in (('selects one at a time', 1), ('selects fanned out', 5)):
+            loaders[name] = lambda max_concurrent=max_concurrent: (
+                async_run_multiple_select_queries(
+                    CONNECTION_STRING_VARIABLE, select_queries,
+                    max_concurrent_queries=max_concurrent,
+                )
+            )
+
+        for name, loader in loaders.items():
+            # warm up the connection pool so no loader pays for opening connections
+            await loader()
+
+            database.reset_counts()
+            milliseconds = await median_ms(loader, repeats)
+            results[name] = {'ms': milliseconds, 'round_trips': database.round_trips / repeats}
+
+        await engine_registry.async_dispose()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark against a simulated remote database')
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.5)
+    parser.add_argument('--max-concurrent-queries', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    for benchmark_name, benchmark_results in asyncio.run(
+        run_benchmark(args.latency_ms, args.jitter_ms, args.max_concurrent_queries, args.repeats)
+    ).items():
+        summary = f"{benchmark_name}: {benchmark_results['ms']:.1f} ms, " \
+                  f"{benchmark_results['round_trips']:g} round trips"
+        if 'rows' in benchmark_results:
+            summary += f" for {benchmark_results['rows']} rows"
+        print(summary)
@@ -0,0 +1,179 @@
+"""Benchmark the season queries on a multi-decade synthetic database, with and without
+the indexes and unique constraints declared in db_tables.
+
+Both databases are SQLite files with the same rows; the baseline copy of the tables only
+has primary keys, like the database had before the indexes were declared.
+
+Run from the api folder:
+    python -m benchmarks.season_indexes --seasons 60
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import Column, Engine, MetaData, Select, Table, create_engine
+from database.db_tables import meta, season, division, team, game, game_result
+from database.select.db_select import (
+    GAMES_FOR_SEASON_SELECT,
+    SEASON_INFO_SELECT,
+    TEAMS_FOR_SEASON_SELECT,
+)
+
+CONFERENCES = ('AFC', 'NFC')
+DIVISIONS = ('East', 'North', 'South', 'West')
+
+
+def primary_keys_only(db_meta_object: MetaData) -> MetaData:
+    """Copy of the tables without foreign keys, indexes or unique constraints
+
+    Args:
+        db_meta_object (MetaData): MetaData object containing table information
+
+    Returns:
+        MetaData: the same tables with only their primary keys
+    """
+    baseline_meta = MetaData()
+    for table in db_meta_object.sorted_tables:
+        Table(
+            table.name,
+            baseline_meta,
+            *[
+                Column(
+                    column.name,
+                    column.type,
+                    primary_key=column.primary_key,
+                    nullable=column.nullable,
+                    # NOT NULL columns like Season.DataVersion are filled by their default
+                    server_default=(
+                        column.server_default.arg if column.server_default is not None else None
+                    ),
+                )
+                for column in table.columns
+            ],
+        )
+    return baseline_meta
+
+
+def fill_synthetic_seasons(engine: Engine, season_count: int) -> None:
+    """Add seasons of 32 teams in 8 divisions, each playing 17 games
+
+    Args:
+        engine (Engine): engine for an empty database
+        season_count (int): number of seasons, ending with 2023
+    """
+    with engine.begin() as db:
+        for season_id, year in enumerate(range(2024 - season_count, 2024), start=1):
+            db.execute(
+                season.insert(),
+                {'Id': season_id, 'Name': f'{year}-{year + 1}', 'Year': year,
+                 'RegularSeasonWeekCount': 18, 'PlayoffTeams': 14},
+            )
+
+            division_rows, team_rows = [], []
+            for division_index in range(8):
+                division_id = (season_id - 1) * 8 + division_index + 1
+                division_rows.append(
+                    {'Id': division_id, 'SeasonId': season_id,
+                     'Name': f'{CONFERENCES[division_index // 4]} '
+                             f'{DIVISIONS[division_index % 4]}',
+                     'Conference': CONFERENCES[division_index // 4]}
+                )
+                for team_index in range(4):
+                    team_number = division_index * 4 + team_index
+                    team_rows.append(
+                        {'Id': (season_id - 1) * 32 + team_number + 1,
+                         'Location': f'City {team_number}', 'Name': f'Team {team_number}',
+                         'FullName': f'City {team_number} Team {team_number}',
+                         'DivisionId': division_id}
+                    )
+            db.execute(division.insert(), division_rows)
+            db.execute(team.insert(), team_rows)
+
+            first_team_id = (season_id - 1) * 32 + 1
+            game_rows, result_rows = [], []
+            for week in range(1, 18):
+                for pairing in range(16):
+                    game_id = (season_id - 1) * 17 * 16 + (week - 1) * 16 + pairing + 1
+                    away_number, home_number = pairing, (pairing + week) % 16 + 16
+                    game_rows.append(
+                        {'Id': game_id, 'SeasonId': season_id, 'Week': week,
+                         'WeekName': f'Week {week}', 'StartTime': datetime(year, 9, 7),
+                         'AwayTeamId': first_team_id + away_number,
+                         'HomeTeamId': first_team_id + home_number}
+                    )
+                    result_rows.append(
+                        {'GameId': game_id, 'AwayScore': (game_id * 7) % 38,
+                         'HomeScore': (game_id * 11) % 41, 'Overtime': False}
+                    )
+            db.execute(game.insert(), game_rows)
+            db.execute(game_result.insert(), result_rows)
+
+
+def time_query(engine: Engine, statement: Select, repeats: int) -> float:
+    """Median milliseconds to run a query and fetch every row
+
+    Args:
+        engine (Engine): engine to query
+        statement (Select): query, with a season_year bind parameter
+        repeats (int): number of runs
+
+    Returns:
+        float: median milliseconds
+    """
+    timings: list[float] = []
+    with engine.connect() as db:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            db.execute(statement, {'season_year': 2000}).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(season_count: int = 60, repeats: int = 20) -> dict[str, tuple[float, float]]:
+    """Time the season queries against an unindexed and an indexed database
+
+    Args:
+        season_count (int, optional): seasons of synthetic data. Defaults to 60.
+        repeats (int, optional): runs of each query. Defaults to 20.
+
+    Returns:
+        dict[str, tuple[float, float]]: query name mapped to (unindexed, indexed) median ms
+    """
+    queries: dict[str, Select] = {
+        'season info': SEASON_INFO_SELECT,
+        'teams for season': TEAMS_FOR_SEASON_SELECT,
+        'games for season': GAMES_FOR_SEASON_SELECT,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        engines: list[Engine] = []
+        for name, db_meta_object in (('unindexed', primary_keys_only(meta)), ('indexed', meta)):
+            engine = create_engine(f"sqlite:///{os.path.join(directory, name)}.db")
+            db_meta_object.create_all(engine)
+            fill_synthetic_seasons(engine, season_count)
+            engines.append(engine)
+
+        results = {
+            query_name: tuple(time_query(engine, statement, repeats) for engine in engines)
+            for query_name, statement in queries.items()
+        }
+
+        for engine in engines:
+            engine.dispose()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the season query indexes')
+    parser.add_argument('--seasons', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    for query, (unindexed_ms, indexed_ms) in run_benchmark(args.seasons, args.repeats).items():
+        print(
+            f'{query}: {unindexed_ms:.2f} ms unindexed, {indexed_ms:.2f} ms indexed '
+            f'({unindexed_ms / indexed_ms:.1f}x)'
+        )
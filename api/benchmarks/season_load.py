@@ -0,0 +1,114 @@
+"""Benchmark loading a season: three sequential queries vs one concurrent round trip.
+
+Run from the api folder:
+    python -m benchmarks.season_load 2023
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+from data.data import Game, Season, Team
+from database.database_helper import (
+    DatabaseEnvVariables,
+    engine_registry,
+    get_async_sql_server_engine,
+)
+from database.select.db_select import (
+    get_entire_season,
+    get_games_for_season,
+    get_season_info,
+    get_teams_for_season,
+)
+
+
+async def get_entire_season_sequential(
+    season_year: int,
+) -> tuple[Season, list[Team], list[Game]]:
+    """The previous loader: season info, teams and games one after another in one
+        transaction, with the dataclasses built row by row
+
+    Args:
+        season_year (int): season year
+
+    Returns:
+        tuple[Season, list[Team], list[Game]]: season information, teams and games
+    """
+    engine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    async with engine.begin() as db:
+        season_info: Season = await get_season_info(db, season_year)
+        teams: list[Team] = await get_teams_for_season(db, season_year)
+        games: list[Game] = await get_games_for_season(db, season_year)
+
+    return season_info, teams, games
+
+
+async def time_loader(
+    loader: Callable[[int], Awaitable[tuple]], season_year: int, repeats: int
+) -> list[float]:
+    """Milliseconds for each load of the season
+
+    Args:
+        loader (Callable[[int], Awaitable[tuple]]): season loader
+        season_year (int): season year
+        repeats (int): number of loads
+
+    Returns:
+        list[float]: milliseconds per load
+    """
+    timings: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await loader(season_year)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def run_benchmark(season_year: int, repeats: int = 50) -> dict[str, dict[str, float]]:
+    """Time both season loaders
+
+    Args:
+        season_year (int): season to load
+        repeats (int, optional): loads per loader. Defaults to 50.
+
+    Returns:
+        dict[str, dict[str, float]]: loader name mapped to median and p95 milliseconds
+    """
+    loaders = {
+        'sequential': get_entire_season_sequential,
+        'single round trip': get_entire_season,
+    }
+
+    # warm up the connection pool so neither loader pays for opening connections
+    for loader in loaders.values():
+        await loader(season_year)
+
+    results: dict[str, dict[str, float]] = {}
+    for name, loader in loaders.items():
+        timings = sorted(await time_loader(loader, season_year, repeats))
+        results[name] = {
+            'median_ms': statistics.median(timings),
+            'p95_ms': timings[int(len(timings) * 0.95) - 1],
+        }
+
+    await engine_registry.async_dispose()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark season loading')
+    parser.add_argument('season_year', type=int)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    for loader_name, loader_timings in asyncio.run(
+        run_benchmark(args.season_year, args.repeats)
+    ).items():
+        print(
+            f"{loader_name}: median {loader_timings['median_ms']:.2f} ms, "
+            f"p95 {loader_timings['p95_ms']:.2f} ms"
+        )
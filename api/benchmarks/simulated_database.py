@@ -0,0 +1,138 @@
+"""Local stand-in for a remote SQL Server: the embedded SQLite backend with injected latency.
+
+Every statement sent to the SQLite file waits a simulated round trip (latency plus
+jitter) first, and only max_concurrent_queries statements can be in flight at once, like
+a server with a few workers. Pooling and fan-out savings can then be measured on a plain
+Linux box, without a live server.
+
+Import:
+    from benchmarks.simulated_database import SimulatedDatabase
+
+Example:
+    with SimulatedDatabase(path, latency_ms=2.0) as database:
+        await get_entire_season(2023)
+        database.round_trips
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.util import await_only
+from database.database_helper import (
+    DatabaseEnvVariables,
+    SQLITE_BACKEND,
+    create_sqlite_connection_string,
+    engine_registry,
+    reload_connection_config,
+)
+from database.db_tables import meta
+
+ENV_VARIABLES = DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+
+# environment variable with the async URL, for the helpers that take a connection string
+CONNECTION_STRING_VARIABLE = "NFL_Stats_Simulated"
+
+
+class SimulatedDatabase:
+    """
+    Routes the NFL_Stats engines to a SQLite file and adds a simulated round trip to every
+        statement they run
+        - The environment points the backend at the file while the context is open, so
+            the real insert and select functions run unchanged
+        - executemany sends all its parameter sets in one round trip, as with SQL Server
+
+    Attributes:
+        sqlite_path (str): SQLite database file, tables are created if missing
+        latency_ms (float): simulated round trip per statement
+        jitter_ms (float): up to this much is added to or taken from each round trip
+        max_concurrent_queries (int): statements the simulated server runs at once
+        round_trips (int): statements run so far
+        parameter_sets (int): rows of parameters sent so far
+    """
+
+    def __init__(
+        self,
+        sqlite_path: str,
+        latency_ms: float = 2.0,
+        jitter_ms: float = 0.5,
+        max_concurrent_queries: int = 8,
+        seed: int = 0,
+    ):
+        self.sqlite_path = os.path.abspath(sqlite_path)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_concurrent_queries = max_concurrent_queries
+
+        self.round_trips = 0
+        self.parameter_sets = 0
+
+        self._random = random.Random(seed)
+        self._thread_slots = threading.BoundedSemaphore(max_concurrent_queries)
+        self._async_slots: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._saved_environment: dict[str, str | None] = {}
+
+    def __enter__(self) -> "SimulatedDatabase":
+        environment = {
+            "Database_Backend": SQLITE_BACKEND,
+            "SQLite_Database": self.sqlite_path,
+            CONNECTION_STRING_VARIABLE: create_sqlite_connection_string(
+                self.sqlite_path, is_async=True
+            ).render_as_string(),
+        }
+        for name, value in environment.items():
+            self._saved_environment[name] = os.environ.get(name)
+            os.environ[name] = value
+        reload_connection_config()
+
+        meta.create_all(engine_registry.get_engine(ENV_VARIABLES))
+
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *_) -> None:
+        event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+
+        for name, value in self._saved_environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reload_connection_config()
+
+    def reset_counts(self) -> None:
+        """Start counting round trips and parameter sets from zero"""
+        self.round_trips = 0
+        self.parameter_sets = 0
+
+    def _round_trip_seconds(self) -> float:
+        """Latency plus jitter for one round trip"""
+        jitter_ms = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(self.latency_ms + jitter_ms, 0.0) / 1000
+
+    async def _async_round_trip(self, seconds: float) -> None:
+        """Wait for a free simulated server worker, then for the round trip"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_slots:
+            self._async_slots[loop] = asyncio.Semaphore(self.max_concurrent_queries)
+
+        async with self._async_slots[loop]:
+            await asyncio.sleep(seconds)
+
+    def _before_cursor_execute(
+        self, conn: Connection, _cursor, _statement, parameters, _context, executemany: bool
+    ) -> None:
+        if conn.engine.url.database != self.sqlite_path:
+            return
+
+        self.round_trips += 1
+        self.parameter_sets += len(parameters) if executemany else 1
+        seconds = self._round_trip_seconds()
+
+        # async engines run this in a greenlet on the event loop, which must not block
+        if conn.dialect.is_async:
+            await_only(self._async_round_trip(seconds))
+        else:
+            with self._thread_slots:
+                time.sleep(seconds)
@@ -0,0 +1,149 @@
+"""Benchmark the per-call overhead of the season selects, built per call vs module-level.
+
+The selects used to be built (with fresh aliases) on every call, so each execution paid
+for constructing the statement and generating its cache key before the compiled cache
+could be hit. The module-level statements only bind values. The tables are empty, so
+the timings are almost all SQLAlchemy overhead rather than the query.
+
+Run from the api folder:
+    python -m benchmarks.statement_cache
+"""
+import time
+from typing import Callable
+from sqlalchemy import Connection, Select, create_engine, select
+from database.db_tables import meta, season, division, team, game, game_result
+from database.select.db_select import GAMES_FOR_SEASON_SELECT, TEAMS_FOR_SEASON_SELECT
+from database.select.select_foreign_keys import GAME_KEYS_SELECT
+
+SEASON_YEAR = 2023
+SEASON_ID = 1
+
+
+def teams_for_season_per_call(season_year: int) -> Select:
+    """The previous teams select, built per call"""
+    return (
+        select(
+            team.columns.Location,
+            team.columns.Name,
+            team.columns.FullName,
+            division.columns.Name.label('Division'),
+            division.columns.Conference,
+        )
+        .join(division, onclause=division.columns.Id == team.columns.DivisionId)
+        .join(season)
+        .where(season.c.Year == season_year)
+    )
+
+
+def games_for_season_per_call(season_year: int) -> Select:
+    """The previous games select, built per call with fresh aliases"""
+    away_team = team.alias('away_team')
+    home_team = team.alias('home_team')
+
+    return (
+        select(
+            game.columns.Id,
+            game.columns.Week,
+            game.columns.WeekName,
+            game.columns.StartTime,
+            away_team.columns.FullName.label("AwayTeam"),
+            home_team.columns.FullName.label("HomeTeam"),
+            game_result.columns.AwayScore,
+            game_result.columns.HomeScore,
+            game_result.columns.Overtime,
+        )
+        .join(away_team, onclause=away_team.columns.Id == game.columns.AwayTeamId)
+        .join(home_team, onclause=home_team.columns.Id == game.columns.HomeTeamId)
+        .join(game_result)
+        .join(season)
+        .where(season.c.Year == season_year)
+    )
+
+
+def game_keys_per_call(season_id: int) -> Select:
+    """The previous game keys select, built per call with fresh aliases"""
+    away_team = team.alias("away_team")
+    home_team = team.alias("home_team")
+
+    return (
+        select(
+            game.columns.Week,
+            away_team.columns.FullName,
+            home_team.columns.FullName,
+            game.columns.Id,
+        )
+        .join(away_team, onclause=away_team.columns.Id == game.columns.AwayTeamId)
+        .join(home_team, onclause=home_team.columns.Id == game.columns.HomeTeamId)
+        .where(game.columns.SeasonId == season_id)
+    )
+
+
+def time_calls(function: Callable[[], object], calls: int) -> float:
+    """Average microseconds per call
+
+    Args:
+        function (Callable[[], object]): function to time
+        calls (int): number of calls
+
+    Returns:
+        float: microseconds per call
+    """
+    # warm the compiled cache first, so neither way is charged for the first compile
+    function()
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def run_benchmark(calls: int = 5000) -> dict[str, tuple[float, float]]:
+    """Time each select built per call and module-level, against empty in-memory tables
+
+    Args:
+        calls (int, optional): executions of each select. Defaults to 5000.
+
+    Returns:
+        dict[str, tuple[float, float]]: select name mapped to (per call, module-level)
+            microseconds per execution
+    """
+    engine = create_engine("sqlite://")
+    meta.create_all(engine)
+
+    with engine.connect() as db:
+        db: Connection
+
+        selects = {
+            'teams for season': (
+                lambda: db.execute(teams_for_season_per_call(SEASON_YEAR)).fetchall(),
+                lambda: db.execute(
+                    TEAMS_FOR_SEASON_SELECT, {'season_year': SEASON_YEAR}
+                ).fetchall(),
+            ),
+            'games for season': (
+                lambda: db.execute(games_for_season_per_call(SEASON_YEAR)).fetchall(),
+                lambda: db.execute(
+                    GAMES_FOR_SEASON_SELECT, {'season_year': SEASON_YEAR}
+                ).fetchall(),
+            ),
+            'game keys': (
+                lambda: db.execute(game_keys_per_call(SEASON_ID)).fetchall(),
+                lambda: db.execute(GAME_KEYS_SELECT, {'season_id': SEASON_ID}).fetchall(),
+            ),
+        }
+
+        results = {
+            select_name: (time_calls(per_call, calls), time_calls(module_level, calls))
+            for select_name, (per_call, module_level) in selects.items()
+        }
+
+    engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    for select_name, (per_call_us, module_level_us) in run_benchmark().items():
+        print(
+            f'{select_name}: {per_call_us:.1f} us built per call, '
+            f'{module_level_us:.1f} us module-level ({per_call_us / module_level_us:.1f}x)'
+        )
@@ -0,0 +1,104 @@
+"""Benchmark loading a cached query result: pickle vs a memory-mapped Arrow IPC file.
+
+Tables used to save every query result as a .pkl file and unpickle the whole frame on
+every cold start. The Arrow files are memory-mapped, and a projection only converts the
+columns asked for.
+
+Run from the api folder:
+    python -m benchmarks.table_cache --rows 2000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable
+import numpy as np
+import pandas as pd
+from helper.result_cache import read_cached_result, write_cached_result
+
+
+def synthetic_result(rows: int) -> pd.DataFrame:
+    """A query result with integer, float, date, bool and string columns
+
+    Args:
+        rows (int): number of rows
+
+    Returns:
+        pd.DataFrame: query result
+    """
+    generator = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            'Id': np.arange(rows),
+            'SeasonId': generator.integers(1, 60, rows),
+            'Week': generator.integers(1, 23, rows),
+            'Yards': generator.integers(0, 600, rows),
+            'WinPercentage': generator.random(rows),
+            'StartTime': pd.Timestamp('2023-09-07') + pd.to_timedelta(
+                generator.integers(0, 86_400 * 150, rows), unit='s'
+            ),
+            'Overtime': generator.random(rows) < 0.05,
+            'FullName': pd.Series(generator.integers(0, 32, rows)).map(
+                lambda team_number: f'City {team_number} Team {team_number}'
+            ),
+        }
+    )
+
+
+def median_ms(function: Callable[[], object], repeats: int) -> float:
+    """Median milliseconds per call
+
+    Args:
+        function (Callable[[], object]): function to time
+        repeats (int): number of calls
+
+    Returns:
+        float: median milliseconds
+    """
+    timings: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(rows: int = 2_000_000, repeats: int = 5) -> dict[str, float]:
+    """Time loading the same result from a pickle and from an Arrow file
+
+    Args:
+        rows (int, optional): rows in the result. Defaults to 2_000_000.
+        repeats (int, optional): loads of each. Defaults to 5.
+
+    Returns:
+        dict[str, float]: load name mapped to median milliseconds
+    """
+    df = synthetic_result(rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, 'result.pkl')
+        arrow_path = os.path.join(directory, 'result.arrow')
+        df.to_pickle(pickle_path)
+        write_cached_result(arrow_path, df)
+
+        return {
+            'pickle': median_ms(lambda: pd.read_pickle(pickle_path), repeats),
+            'arrow': median_ms(lambda: read_cached_result(arrow_path), repeats),
+            'arrow, numeric columns': median_ms(
+                lambda: read_cached_result(arrow_path, ['SeasonId', 'Week', 'Yards']), repeats
+            ),
+            'arrow, one string column': median_ms(
+                lambda: read_cached_result(arrow_path, ['FullName']), repeats
+            ),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark cached result loading')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for load_name, milliseconds in run_benchmark(args.rows, args.repeats).items():
+        print(f'{load_name}: {milliseconds:.1f} ms')
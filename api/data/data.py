@@ -37,6 +37,7 @@ class Team():
     strength_of_schedule: float = field(default=0.0)
     points_for_in_conference_games: int = field(default=0)
     points_against_in_conference_games: int = field(default=0)
+    net_touchdowns: int = field(default=0)
     offensive_rank: int = field(default=0)
     defensive_rank: int = field(default=0)
     offensive_rank_in_conference: int = field(default=0)
@@ -21,6 +21,12 @@ class Game:
     away_score: int
     home_score: int
     overtime: bool
+    away_yards: int = None
+    away_turnovers: int = None
+    away_touchdowns: int = None
+    home_yards: int = None
+    home_turnovers: int = None
+    home_touchdowns: int = None
 
 
 @dataclass(slots=True, frozen=True)
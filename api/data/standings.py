@@ -0,0 +1,565 @@
+"""Calculate standings (records, point rankings, tiebreakers, seeds, clinches) for a week"""
+from dataclasses import dataclass, field
+from typing import Callable
+from data.data import Game, Season, Team, TeamGame
+
+# higher is better, None when the tiebreaker doesn't apply to the tied teams
+Tiebreaker = Callable[[Team, list[Team], 'StandingsContext'], float | None]
+
+# playoff clinch types, best first
+CLINCHED_TOP_SEED = '*'
+CLINCHED_DIVISION = 'z'
+CLINCHED_PLAYOFFS = 'x'
+ELIMINATED = 'e'
+
+
+@dataclass(slots=True)
+class StandingsContext:
+    """Everything the tiebreakers need besides the teams' records"""
+    teams: dict[str, Team]
+    team_games: dict[str, list[TeamGame]] = field(default_factory=dict)
+    min_common_games: int = field(default=1)
+
+
+def win_percentage(wins: int, losses: int, ties: int) -> float:
+    """Win percentage, with ties counting as half a win
+
+    Args:
+        wins (int): wins
+        losses (int): losses
+        ties (int): ties
+
+    Returns:
+        float: win percentage rounded to 3 places, 0.0 with no games played
+    """
+    num_games: int = wins + losses + ties
+
+    if num_games == 0:
+        return 0.0
+
+    return round((wins + (ties * 0.5)) / num_games, 3)
+
+
+def win_percentage_from_games(team_games: list[TeamGame]) -> float:
+    """Win percentage over a set of games
+
+    Args:
+        team_games (list[TeamGame]): games from one team's point of view
+
+    Returns:
+        float: win percentage
+    """
+    results = [team_game.result for team_game in team_games]
+
+    return win_percentage(results.count('W'), results.count('L'), results.count('T'))
+
+
+def calculate_standings(
+    season_info: Season,
+    teams: list[Team],
+    games: list[Game],
+    week: int,
+    scheduled_games: dict[str, int] = None,
+    net_touchdowns: dict[str, int] = None,
+) -> list[Team]:
+    """Calculate the standings after a week of the regular season
+
+    Args:
+        season_info (Season): season information
+        teams (list[Team]): teams in the season
+        games (list[Game]): games in the season, games without a result are left out
+        week (int): last week to include
+        scheduled_games (dict[str, int], optional): regular season games on each team's
+            schedule, used for clinches. Defaults to the games played (no clinches until
+            the season is over).
+        net_touchdowns (dict[str, int], optional): net touchdowns through the week for
+            each team. Defaults to 0 for every team.
+
+    Returns:
+        list[Team]: new Team objects with every standings field filled in, in playoff order
+            for each conference
+    """
+    standings: dict[str, Team] = {
+        team.full_name: Team(
+            team.location, team.name, team.full_name, team.division, team.conference
+        )
+        for team in teams
+    }
+    team_games: dict[str, list[TeamGame]] = {team_name: [] for team_name in standings}
+
+    last_week = min(week, season_info.regular_season_week_count)
+    for game in games:
+        if game.week > last_week or game.away_score is None or game.home_score is None:
+            continue
+        add_game(standings, team_games, game)
+
+    for team in standings.values():
+        team.win_percentage = win_percentage(team.wins, team.losses, team.ties)
+        team.division_win_percentage = win_percentage(
+            team.division_wins, team.division_losses, team.division_ties
+        )
+        team.conference_win_percentage = win_percentage(
+            team.conference_wins, team.conference_losses, team.conference_ties
+        )
+        team.net_touchdowns = (net_touchdowns or {}).get(team.full_name, 0)
+
+    for team in standings.values():
+        set_strength_of_schedule(team, team_games[team.full_name], standings)
+
+    set_points_rankings(list(standings.values()))
+
+    context = StandingsContext(standings, team_games)
+    set_division_ranks(standings, context)
+    set_playoff_ranks(standings, context)
+    set_clinch_types(season_info, standings, team_games, scheduled_games)
+
+    return sorted(standings.values(), key=lambda team: (team.conference, team.playoff_rank))
+
+
+def add_game(standings: dict[str, Team], team_games: dict[str, list[TeamGame]], game: Game) -> None:
+    """Add a game's result to both teams' records
+
+    Args:
+        standings (dict[str, Team]): team name mapped to its standings
+        team_games (dict[str, list[TeamGame]]): team name mapped to its games played
+        game (Game): played game
+    """
+    away_team, home_team = standings[game.away_team], standings[game.home_team]
+    division_game: bool = away_team.division == home_team.division
+    conference_game: bool = away_team.conference == home_team.conference
+
+    for team, opponent, score, opponent_score, home_game in (
+        (away_team, home_team, game.away_score, game.home_score, False),
+        (home_team, away_team, game.home_score, game.away_score, True),
+    ):
+        result = 'W' if score > opponent_score else 'L' if score < opponent_score else 'T'
+
+        team.points_for += score
+        team.points_against += opponent_score
+        team.point_differential += score - opponent_score
+        if result == 'W':
+            team.wins += 1
+        elif result == 'L':
+            team.losses += 1
+        else:
+            team.ties += 1
+
+        if conference_game:
+            team.points_for_in_conference_games += score
+            team.points_against_in_conference_games += opponent_score
+            team.conference_wins += result == 'W'
+            team.conference_losses += result == 'L'
+            team.conference_ties += result == 'T'
+        if division_game:
+            team.division_wins += result == 'W'
+            team.division_losses += result == 'L'
+            team.division_ties += result == 'T'
+
+        team_games[team.full_name].append(
+            TeamGame(
+                game.week,
+                game.week_name,
+                opponent.full_name,
+                score,
+                opponent_score,
+                result,
+                home_game,
+                division_game,
+                conference_game,
+                False,
+            )
+        )
+
+
+def set_strength_of_schedule(
+    team: Team, team_games: list[TeamGame], standings: dict[str, Team]
+) -> None:
+    """Set strength of victory and strength of schedule, the average win percentage of the
+        teams beaten and of every opponent played
+
+    Args:
+        team (Team): team to update
+        team_games (list[TeamGame]): the team's games played
+        standings (dict[str, Team]): team name mapped to its standings
+    """
+    opponent_win_percentages = [
+        standings[team_game.opponent].win_percentage for team_game in team_games
+    ]
+    victory_win_percentages = [
+        standings[team_game.opponent].win_percentage
+        for team_game in team_games
+        if team_game.result == 'W'
+    ]
+
+    team.strength_of_schedule = (
+        round(sum(opponent_win_percentages) / len(opponent_win_percentages), 3)
+        if opponent_win_percentages else 0.0
+    )
+    team.strength_of_victory = (
+        round(sum(victory_win_percentages) / len(victory_win_percentages), 3)
+        if victory_win_percentages else 0.0
+    )
+
+
+def rank_values(values: dict[str, float], ascending: bool = False) -> dict[str, int]:
+    """Rank teams by a value, tied teams share the best rank (1, 2, 2, 4)
+
+    Args:
+        values (dict[str, float]): team name mapped to value
+        ascending (bool, optional): rank the lowest value first. Defaults to False.
+
+    Returns:
+        dict[str, int]: team name mapped to rank
+    """
+    sorted_values = sorted(values.values(), reverse=not ascending)
+
+    return {team_name: sorted_values.index(value) + 1 for team_name, value in values.items()}
+
+
+def set_points_rankings(teams: list[Team]) -> None:
+    """Set the offensive (points scored), defensive (points allowed) and combined rankings,
+        among all teams and within each conference
+
+    Args:
+        teams (list[Team]): teams to rank
+    """
+    team_dict: dict[str, Team] = {team.full_name: team for team in teams}
+
+    offensive = rank_values({team.full_name: team.points_for for team in teams})
+    defensive = rank_values({team.full_name: team.points_against for team in teams}, True)
+    combined = rank_values(
+        {name: offensive[name] + defensive[name] for name in team_dict}, True
+    )
+    for name, team in team_dict.items():
+        team.offensive_rank = offensive[name]
+        team.defensive_rank = defensive[name]
+        team.combined_score_ranking = combined[name]
+
+    for conference in {team.conference for team in teams}:
+        conference_teams = [team for team in teams if team.conference == conference]
+
+        offensive = rank_values({team.full_name: team.points_for for team in conference_teams})
+        defensive = rank_values(
+            {team.full_name: team.points_against for team in conference_teams}, True
+        )
+        combined = rank_values(
+            {name: offensive[name] + defensive[name] for name in offensive}, True
+        )
+        for name, rank in combined.items():
+            team_dict[name].offensive_rank_in_conference = offensive[name]
+            team_dict[name].defensive_rank_in_conference = defensive[name]
+            team_dict[name].combined_score_ranking_in_conference = rank
+
+
+## tiebreakers ##
+
+def games_against(team: Team, opponents: set[str], context: StandingsContext) -> list[TeamGame]:
+    """A team's games against a set of opponents"""
+    return [
+        team_game
+        for team_game in context.team_games[team.full_name]
+        if team_game.opponent in opponents
+    ]
+
+
+def head_to_head(team: Team, tied_teams: list[Team], context: StandingsContext) -> float | None:
+    """Win percentage in games between the tied teams
+        - With 3+ teams, only applies if every team has played each of the others
+    """
+    opponents = {other.full_name for other in tied_teams if other is not team}
+    team_games = games_against(team, opponents, context)
+
+    if {team_game.opponent for team_game in team_games} != opponents:
+        return None
+
+    return win_percentage_from_games(team_games)
+
+
+def head_to_head_sweep(
+    team: Team, tied_teams: list[Team], context: StandingsContext
+) -> float | None:
+    """Wild card head to head: only separates a team that beat, or lost to, every other
+        tied team
+    """
+    if len(tied_teams) == 2:
+        return head_to_head(team, tied_teams, context)
+
+    opponents = {other.full_name for other in tied_teams if other is not team}
+    team_games = games_against(team, opponents, context)
+    results = {team_game.result for team_game in team_games}
+    opponents_played = {team_game.opponent for team_game in team_games}
+
+    if opponents_played == opponents and results == {'W'}:
+        return 1.0
+    if opponents_played == opponents and results == {'L'}:
+        return -1.0
+    return 0.0
+
+
+def common_games(team: Team, tied_teams: list[Team], context: StandingsContext) -> float | None:
+    """Win percentage in games against opponents every tied team has played"""
+    common_opponents: set[str] = set.intersection(
+        *[
+            {team_game.opponent for team_game in context.team_games[other.full_name]}
+            for other in tied_teams
+        ]
+    )
+    team_games = games_against(team, common_opponents, context)
+
+    if len(team_games) < context.min_common_games:
+        return None
+
+    return win_percentage_from_games(team_games)
+
+
+def division_win_percentage(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Win percentage in division games"""
+    return team.division_win_percentage
+
+
+def conference_win_percentage(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Win percentage in conference games"""
+    return team.conference_win_percentage
+
+
+def strength_of_victory(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Average win percentage of the teams beaten"""
+    return team.strength_of_victory
+
+
+def strength_of_schedule(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Average win percentage of every opponent played"""
+    return team.strength_of_schedule
+
+
+def combined_ranking_among_conference(
+    team: Team, _tied: list[Team], _context: StandingsContext
+) -> float:
+    """Best combined points scored and allowed ranking among conference teams"""
+    return -(team.offensive_rank_in_conference + team.defensive_rank_in_conference)
+
+
+def combined_ranking_among_all_teams(
+    team: Team, _tied: list[Team], _context: StandingsContext
+) -> float:
+    """Best combined points scored and allowed ranking among all teams"""
+    return -(team.offensive_rank + team.defensive_rank)
+
+
+def net_points_in_conference(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Net points in conference games"""
+    return team.points_for_in_conference_games - team.points_against_in_conference_games
+
+
+def net_points_all_games(team: Team, _tied: list[Team], _context: StandingsContext) -> float:
+    """Net points in all games"""
+    return team.point_differential
+
+
+def net_touchdowns_in_all_games(
+    team: Team, _tied: list[Team], _context: StandingsContext
+) -> float:
+    """Net touchdowns in all games"""
+    return team.net_touchdowns
+
+
+DIVISION_TIEBREAKERS: list[Tiebreaker] = [
+    head_to_head,
+    division_win_percentage,
+    common_games,
+    conference_win_percentage,
+    strength_of_victory,
+    strength_of_schedule,
+    combined_ranking_among_conference,
+    combined_ranking_among_all_teams,
+    net_points_in_conference,
+    net_points_all_games,
+    net_touchdowns_in_all_games,
+]
+
+CONFERENCE_TIEBREAKERS: list[Tiebreaker] = [
+    head_to_head_sweep,
+    conference_win_percentage,
+    common_games,
+    strength_of_victory,
+    strength_of_schedule,
+    combined_ranking_among_conference,
+    combined_ranking_among_all_teams,
+    net_points_in_conference,
+    net_points_all_games,
+    net_touchdowns_in_all_games,
+]
+
+
+def break_tie(
+    tied_teams: list[Team], tiebreakers: list[Tiebreaker], context: StandingsContext
+) -> Team:
+    """Pick the best of a group of teams tied on win percentage
+        - Whenever a tiebreaker drops some of the teams, the rest start again from the
+            first tiebreaker
+        - If every tiebreaker is tied, the coin toss is the team name
+
+    Args:
+        tied_teams (list[Team]): tied teams
+        tiebreakers (list[Tiebreaker]): tiebreakers in the order they're applied
+        context (StandingsContext): games and standings for the tiebreakers
+
+    Returns:
+        Team: the team that wins the tiebreak
+    """
+    while len(tied_teams) > 1:
+        for tiebreaker in tiebreakers:
+            values = [tiebreaker(team, tied_teams, context) for team in tied_teams]
+            if None in values:
+                continue
+
+            best_value = max(values)
+            remaining = [team for team, value in zip(tied_teams, values) if value == best_value]
+            if len(remaining) < len(tied_teams):
+                tied_teams = remaining
+                break
+        else:
+            return min(tied_teams, key=lambda team: team.full_name)
+
+    return tied_teams[0]
+
+
+def order_teams(
+    teams: list[Team],
+    tiebreakers: list[Tiebreaker],
+    context: StandingsContext,
+    one_team_per_division: bool = False,
+) -> list[Team]:
+    """Order teams by win percentage, then tiebreakers, picking the best team one at a time
+
+    Args:
+        teams (list[Team]): teams to order
+        tiebreakers (list[Tiebreaker]): tiebreakers in the order they're applied
+        context (StandingsContext): games and standings for the tiebreakers
+        one_team_per_division (bool, optional): only the best ranked team in a division is
+            compared against teams from other divisions (wild card rule). Defaults to False.
+
+    Returns:
+        list[Team]: teams, best first
+    """
+    remaining: list[Team] = list(teams)
+    ordered: list[Team] = []
+
+    while remaining:
+        best_win_percentage = max(team.win_percentage for team in remaining)
+        tied_teams = [team for team in remaining if team.win_percentage == best_win_percentage]
+
+        if one_team_per_division:
+            best_division_ranks: dict[str, int] = {}
+            for team in tied_teams:
+                best_division_ranks[team.division] = min(
+                    team.division_rank, best_division_ranks.get(team.division, team.division_rank)
+                )
+            tied_teams = [
+                team
+                for team in tied_teams
+                if team.division_rank == best_division_ranks[team.division]
+            ]
+
+        context.min_common_games = 4 if one_team_per_division else 1
+        best_team = break_tie(tied_teams, tiebreakers, context)
+
+        ordered.append(best_team)
+        remaining.remove(best_team)
+
+    return ordered
+
+
+def set_division_ranks(standings: dict[str, Team], context: StandingsContext) -> None:
+    """Rank the teams in each division"""
+    for division in {team.division for team in standings.values()}:
+        division_teams = [team for team in standings.values() if team.division == division]
+
+        for rank, team in enumerate(order_teams(division_teams, DIVISION_TIEBREAKERS, context), 1):
+            team.division_rank = rank
+
+
+def set_playoff_ranks(standings: dict[str, Team], context: StandingsContext) -> None:
+    """Rank the teams in each conference: division winners first, then everyone else"""
+    for conference in {team.conference for team in standings.values()}:
+        conference_teams = [team for team in standings.values() if team.conference == conference]
+        division_winners = [team for team in conference_teams if team.division_rank == 1]
+        other_teams = [team for team in conference_teams if team.division_rank > 1]
+
+        ordered = order_teams(division_winners, CONFERENCE_TIEBREAKERS, context) + order_teams(
+            other_teams, CONFERENCE_TIEBREAKERS, context, one_team_per_division=True
+        )
+        for rank, team in enumerate(ordered, 1):
+            team.playoff_rank = rank
+
+
+def set_clinch_types(
+    season_info: Season,
+    standings: dict[str, Team],
+    team_games: dict[str, list[TeamGame]],
+    scheduled_games: dict[str, int] = None,
+) -> None:
+    """Set clinches and eliminations by wins alone (a team clinches a spot once no team
+        behind it can reach its number of wins), so tiebreakers never decide a clinch early
+
+    Args:
+        season_info (Season): season information
+        standings (dict[str, Team]): team name mapped to its standings
+        team_games (dict[str, list[TeamGame]]): team name mapped to its games played
+        scheduled_games (dict[str, int], optional): regular season games on each team's
+            schedule. Defaults to the games played.
+    """
+    def max_wins(team: Team) -> float:
+        games_left = (scheduled_games or {}).get(team.full_name, 0) - len(
+            team_games[team.full_name]
+        )
+        return team.wins + team.ties * 0.5 + max(games_left, 0)
+
+    def wins(team: Team) -> float:
+        return team.wins + team.ties * 0.5
+
+    playoff_spots = season_info.playoff_teams // 2
+    season_over = scheduled_games is None or all(
+        len(team_games[name]) >= scheduled_games.get(name, 0) for name in standings
+    )
+
+    for conference in {team.conference for team in standings.values()}:
+        conference_teams = [team for team in standings.values() if team.conference == conference]
+
+        for team in conference_teams:
+            others = [other for other in conference_teams if other is not team]
+            division_rivals = [other for other in others if other.division == team.division]
+
+            if season_over:
+                clinched_top_seed = team.playoff_rank == 1
+                clinched_division = team.division_rank == 1
+                clinched_playoffs = team.playoff_rank <= playoff_spots
+            else:
+                catchable = [other for other in others if max_wins(other) >= wins(team)]
+                # every other division's winner is seeded ahead of a wild card, even if
+                #   no team in it can catch this team
+                uncatchable_divisions = {other.division for other in others} - {
+                    other.division for other in catchable
+                } - {team.division}
+                clinched_top_seed = not catchable
+                clinched_division = all(max_wins(other) < wins(team) for other in division_rivals)
+                clinched_playoffs = len(catchable) + len(uncatchable_divisions) < playoff_spots
+
+            ahead = [other for other in others if wins(other) > max_wins(team)]
+            division_ahead = [other for other in division_rivals if wins(other) > max_wins(team)]
+            eliminated = (
+                team.playoff_rank > playoff_spots
+                if season_over
+                else len(ahead) >= playoff_spots and bool(division_ahead)
+            )
+
+            if clinched_top_seed:
+                team.playoff_clinch_type = CLINCHED_TOP_SEED
+            elif clinched_division:
+                team.playoff_clinch_type = CLINCHED_DIVISION
+            elif clinched_playoffs:
+                team.playoff_clinch_type = CLINCHED_PLAYOFFS
+            elif eliminated:
+                team.playoff_clinch_type = ELIMINATED
+            else:
+                team.playoff_clinch_type = ''
@@ -0,0 +1,143 @@
+"""Columnar team-game stats (yards, turnovers, touchdowns) with per-season aggregates"""
+import numpy as np
+import pandas as pd
+
+# one row per team per game, the team's stats followed by its opponent's
+TEAM_GAME_STAT_COLUMNS: list[str] = [
+    'SeasonYear',
+    'Week',
+    'Team',
+    'Opponent',
+    'Yards',
+    'Turnovers',
+    'Touchdowns',
+    'OpponentYards',
+    'OpponentTurnovers',
+    'OpponentTouchdowns',
+]
+
+
+class TeamGameStats:
+    """
+    This module keeps team-game stats as column arrays and precomputes each team's season
+        totals, so yardage and turnover rankings and the net touchdowns tiebreaker are
+        lookups and array reductions rather than new queries
+
+    Import:
+        from data.team_game_stats import TeamGameStats
+
+    Example:
+        initialization:
+            team_game_stats = TeamGameStats(stats_df)
+
+        usage:
+            team_game_stats.rankings(2023, 'yards_for')
+            team_game_stats.net_touchdowns(2023)
+            team_game_stats.net_touchdowns(2023, weeks=range(1, 19))
+
+    Attributes:
+        columns (dict[str, np.ndarray]): column arrays, one entry per team per game
+        season_totals (dict[int, pd.DataFrame]): season year mapped to each team's totals
+    """
+
+    def __init__(self, stats_df: pd.DataFrame):
+        """Create column arrays and season totals from team-game rows
+
+        Args:
+            stats_df (pd.DataFrame): dataframe with the TEAM_GAME_STAT_COLUMNS columns
+        """
+        # missing stats (ie touchdowns in older seasons) are NaN so they drop out of sums
+        self.columns: dict[str, np.ndarray] = {
+            column: stats_df[column].to_numpy(
+                dtype=object if column in ('Team', 'Opponent') else np.float64
+            )
+            for column in TEAM_GAME_STAT_COLUMNS
+        }
+
+        self.season_totals: dict[int, pd.DataFrame] = {
+            int(year): self._team_totals(np.flatnonzero(self.columns['SeasonYear'] == year))
+            for year in np.unique(self.columns['SeasonYear'])
+        }
+
+    def _team_totals(self, row_indexes: np.ndarray) -> pd.DataFrame:
+        """Sum each team's stats over a set of rows
+
+        Args:
+            row_indexes (np.ndarray): indexes of the rows to total
+
+        Returns:
+            pd.DataFrame: one row per team (indexed by team name) with the totals
+        """
+        team_names, team_codes = np.unique(
+            self.columns['Team'][row_indexes], return_inverse=True
+        )
+
+        def total(column: str) -> np.ndarray:
+            values = self.columns[column][row_indexes]
+            return np.bincount(team_codes, weights=np.nan_to_num(values), minlength=len(team_names))
+
+        totals = pd.DataFrame(
+            {
+                'games': np.bincount(team_codes, minlength=len(team_names)),
+                'yards_for': total('Yards'),
+                'yards_against': total('OpponentYards'),
+                'giveaways': total('Turnovers'),
+                'takeaways': total('OpponentTurnovers'),
+                'touchdowns_for': total('Touchdowns'),
+                'touchdowns_against': total('OpponentTouchdowns'),
+            },
+            index=team_names,
+        )
+        totals['yard_differential'] = totals['yards_for'] - totals['yards_against']
+        totals['turnover_differential'] = totals['takeaways'] - totals['giveaways']
+        totals['net_touchdowns'] = totals['touchdowns_for'] - totals['touchdowns_against']
+
+        return totals
+
+    def rankings(self, season_year: int, stat: str, ascending: bool = False) -> pd.Series:
+        """Rank every team in a season by one of the season totals
+            - Tied teams share the best rank (1, 2, 2, 4)
+
+        Args:
+            season_year (int): season year
+            stat (str): season total column (ie 'yards_for', 'turnover_differential')
+            ascending (bool, optional): rank the lowest value first, for stats where less is
+                better (ie 'yards_against'). Defaults to False.
+
+        Returns:
+            pd.Series: team name mapped to rank, best team first
+        """
+        return (
+            self.season_totals[season_year][stat]
+            .rank(method='min', ascending=ascending)
+            .astype(int)
+            .sort_values()
+        )
+
+    def net_touchdowns(
+        self, season_year: int, team_names: list[str] = None, weeks: range = None
+    ) -> dict[str, int]:
+        """Net touchdowns (touchdowns scored - touchdowns allowed) for the net touchdowns in
+            all games tiebreaker
+
+        Args:
+            season_year (int): season year
+            team_names (list[str], optional): teams to include. Defaults to every team.
+            weeks (range, optional): only count these weeks (ie the regular season).
+                Defaults to the precomputed whole-season totals.
+
+        Returns:
+            dict[str, int]: team name mapped to net touchdowns
+        """
+        if weeks is None:
+            totals = self.season_totals[season_year]
+        else:
+            in_weeks = (self.columns['SeasonYear'] == season_year) & np.isin(
+                self.columns['Week'], list(weeks)
+            )
+            totals = self._team_totals(np.flatnonzero(in_weeks))
+
+        if team_names is not None:
+            totals = totals.reindex(team_names, fill_value=0)
+
+        return {team: int(value) for team, value in totals['net_touchdowns'].items()}
@@ -0,0 +1,198 @@
+"""Run many small lookup queries as multi-statement batches, a few round trips in all"""
+
+import re
+import time
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import DBAPIError
+from database.query_metrics import query_metrics
+
+# placed in the results for a query that failed, as the evaluator has always expected
+QUERY_ERROR = "error"
+
+# dialects whose driver returns every statement of a batch as its own result set
+BATCHING_DIALECTS = frozenset({"mssql"})
+
+# queries per batch, and bind parameters per batch (SQL Server allows 2100)
+DEFAULT_QUERIES_PER_BATCH = 100
+MAX_BATCH_PARAMETERS = 2000
+
+# the same bind parameter pattern text() uses
+_BIND_PARAMETER = re.compile(r"(?<![:\w\x5c]):(\w+)(?![:\w])")
+
+
+def prefix_parameters(query_string: str, parameters: dict, query_index: int) -> tuple[str, dict]:
+    """Prefix a query's bind parameters with its index, so queries in a batch can't clash
+
+    Args:
+        query_string (str): query with ":name" bind parameters
+        parameters (dict): the query's parameters
+        query_index (int): position of the query in the batch
+
+    Returns:
+        tuple[str, dict]: query and parameters with every name as "q{index}_{name}"
+    """
+    prefix = f"q{query_index}_"
+    prefixed_query = _BIND_PARAMETER.sub(lambda match: f":{prefix}{match[1]}", query_string)
+
+    return prefixed_query, {f"{prefix}{name}": value for name, value in parameters.items()}
+
+
+def split_batches(
+    queries: list[tuple[str, dict]], batch_size: int = DEFAULT_QUERIES_PER_BATCH
+) -> list[range]:
+    """Split the queries into batches of up to batch_size queries and MAX_BATCH_PARAMETERS
+        parameters
+
+    Args:
+        queries (list[tuple[str, dict]]): (query string, parameters) for each query
+        batch_size (int, optional): max queries per batch. Defaults to DEFAULT_QUERIES_PER_BATCH.
+
+    Returns:
+        list[range]: query indexes in each batch
+    """
+    batches: list[range] = []
+    batch_start = 0
+    batch_parameters = 0
+
+    for query_index, (query_string, parameters) in enumerate(queries):
+        # a parameter used twice is sent twice with positional parameters
+        parameter_count = len(_BIND_PARAMETER.findall(query_string)) or len(parameters)
+
+        if query_index > batch_start and (
+            query_index - batch_start >= batch_size
+            or batch_parameters + parameter_count > MAX_BATCH_PARAMETERS
+        ):
+            batches.append(range(batch_start, query_index))
+            batch_start = query_index
+            batch_parameters = 0
+
+        batch_parameters += parameter_count
+
+    if batch_start < len(queries):
+        batches.append(range(batch_start, len(queries)))
+
+    return batches
+
+
+def run_query_first_row(db: Connection, query_string: str, parameters: dict) -> tuple | str:
+    """Run one query on its own round trip and get its first row
+
+    Args:
+        db (Connection): database connection
+        query_string (str): query to run
+        parameters (dict): query parameters
+
+    Returns:
+        tuple | str: first row (None if there were no rows), or QUERY_ERROR if it failed
+    """
+    try:
+        row = db.execute(text(query_string), parameters).first()
+    except DBAPIError:
+        return QUERY_ERROR
+
+    return None if row is None else tuple(row)
+
+
+def run_batch_first_rows(db: Connection, queries: list[tuple[str, dict]]) -> list:
+    """Send the queries as one multi-statement batch and read the first row of each
+        result set
+        - Each query must return exactly one result set, like a SELECT lookup
+        - If a statement fails, the rows read before it are kept and the queries from
+            the failed one on are returned as missing, for the caller to run one at a time
+
+    Args:
+        db (Connection): database connection
+        queries (list[tuple[str, dict]]): (query string, parameters) for each query
+
+    Returns:
+        list: first row (or None) for each query that was read, in order
+    """
+    statements: list[str] = ["SET NOCOUNT ON"]
+    batch_parameters: dict = {}
+    for query_index, (query_string, parameters) in enumerate(queries):
+        prefixed_query, prefixed_parameters = prefix_parameters(
+            query_string.strip().rstrip(";"), parameters, query_index
+        )
+        statements.append(prefixed_query)
+        batch_parameters.update(prefixed_parameters)
+
+    # compile to the driver's paramstyle and run it on the raw cursor, since SQLAlchemy
+    #   results only read the first result set
+    compiled = text(";\n".join(statements)).compile(dialect=db.dialect)
+    batch_sql = str(compiled)
+    compiled_parameters = compiled.construct_params(batch_parameters)
+    if compiled.positiontup is not None:
+        compiled_parameters = [compiled_parameters[name] for name in compiled.positiontup]
+
+    first_rows: list = []
+    error = True
+    cursor = db.connection.cursor()
+    start_time = time.perf_counter()
+    try:
+        cursor.execute(batch_sql, compiled_parameters)
+        while True:
+            row = cursor.fetchone() if cursor.description is not None else None
+            first_rows.append(None if row is None else tuple(row))
+
+            if len(first_rows) == len(queries) or not cursor.nextset():
+                break
+        error = False
+    except db.dialect.loaded_dbapi.Error:
+        # the rows read before the failed statement are still good
+        pass
+    finally:
+        cursor.close()
+        # the raw cursor skips the engine's cursor events, so the batch is recorded here,
+        #   timed over every result set as the driver runs each statement on nextset
+        query_metrics.record(
+            db,
+            batch_sql,
+            compiled_parameters,
+            time.perf_counter() - start_time,
+            rows=sum(row is not None for row in first_rows),
+            error=error,
+        )
+
+    return first_rows
+
+
+def run_first_row_queries(
+    db: Connection,
+    queries: list[tuple[str, dict]],
+    batch_size: int = DEFAULT_QUERIES_PER_BATCH,
+) -> list:
+    """Run many small queries and get the first row of each
+        - On SQL Server the queries are sent as multi-statement batches of up to batch_size,
+            so hundreds of lookups take a handful of round trips
+        - A failed query only fails itself: the rest of its batch is rerun one at a time
+        - Other databases run the queries one at a time
+
+    Args:
+        db (Connection): database connection
+        queries (list[tuple[str, dict]]): (query string, parameters) for each query
+        batch_size (int, optional): max queries per batch. Defaults to DEFAULT_QUERIES_PER_BATCH.
+
+    Returns:
+        list: first row of each query as a tuple (None if it had no rows, QUERY_ERROR if it
+            failed), in the same order as queries
+    """
+    if db.dialect.name not in BATCHING_DIALECTS:
+        return [
+            run_query_first_row(db, query_string, parameters or {})
+            for query_string, parameters in queries
+        ]
+
+    query_results: list = []
+    for batch in split_batches(queries, batch_size):
+        batch_queries = [
+            (queries[query_index][0], queries[query_index][1] or {}) for query_index in batch
+        ]
+        first_rows = run_batch_first_rows(db, batch_queries)
+
+        # isolate the failure: run the failed query and the rest of the batch on their own
+        for query_string, parameters in batch_queries[len(first_rows):]:
+            first_rows.append(run_query_first_row(db, query_string, parameters))
+
+        query_results.extend(first_rows)
+
+    return query_results
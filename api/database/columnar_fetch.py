@@ -0,0 +1,249 @@
+"""Fetch query results straight into column arrays"""
+
+from typing import AsyncIterator, Iterator
+import numpy as np
+import pandas as pd
+from sqlalchemy import CursorResult
+from sqlalchemy.ext.asyncio import AsyncResult
+from database.query_metrics import query_metrics
+
+# rows pulled from the cursor at a time
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def batch_to_columns(
+    rows: list, column_names: list[str], dtypes: dict[str, np.dtype] = None
+) -> dict[str, np.ndarray]:
+    """Transpose a batch of rows into one array per column
+
+    Args:
+        rows (list): rows from the cursor
+        column_names (list[str]): column names, in the order of the row values
+        dtypes (dict[str, np.dtype], optional): dtype for some or all of the columns,
+            the rest are inferred. Defaults to None.
+
+    Returns:
+        dict[str, np.ndarray]: column name mapped to its values
+    """
+    dtypes = dtypes or {}
+    columns = zip(*rows) if rows else [()] * len(column_names)
+
+    return {
+        column_name: column_to_array(values, dtypes.get(column_name))
+        for column_name, values in zip(column_names, columns)
+    }
+
+
+def column_to_array(values: tuple, dtype: np.dtype = None) -> np.ndarray:
+    """Convert one column's values to an array, inferring its dtype like pandas
+        - Numbers become int64 or float64, and numbers with NULLs become float64 with NaN
+        - Anything else (strings, bytes, dates, booleans with NULLs) is kept as objects
+
+    Args:
+        values (tuple): the column's values
+        dtype (np.dtype, optional): dtype to convert to. Defaults to inferred.
+
+    Returns:
+        np.ndarray: the column's values
+    """
+    if dtype is not None:
+        return np.array(values, dtype=dtype)
+
+    non_null_values = [value for value in values if value is not None]
+    if not non_null_values:
+        return _object_array(values)
+
+    if all(_is_number(value) for value in non_null_values):
+        if len(non_null_values) < len(values):
+            # numpy converts None to NaN for float arrays
+            return np.array(values, dtype=np.float64)
+        column_array = np.array(values)
+    elif all(isinstance(value, (bool, np.bool_)) for value in values):
+        column_array = np.array(values, dtype=np.bool_)
+    else:
+        return _object_array(values)
+
+    # integers too large for int64 are kept as objects
+    return column_array if column_array.dtype.kind in 'biuf' else _object_array(values)
+
+
+def _is_number(value) -> bool:
+    """Whether a value is a number numpy can store natively, not counting booleans"""
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(
+        value, (bool, np.bool_)
+    )
+
+
+def _object_array(values) -> np.ndarray:
+    """Keep a column's values as Python objects, like pandas (strings, bytes, dates)"""
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def concatenate_columns(arrays: list[np.ndarray]) -> np.ndarray:
+    """Join a column's batches into one array of a single dtype
+        - Each batch infers its own dtype, so the dtype is settled across every batch
+            first and doesn't depend on how fetchmany split the rows: ints with a later
+            batch of NULLs or floats become float64, and a column with numbers in one
+            batch and strings in another becomes objects
+
+    Args:
+        arrays (list[np.ndarray]): the column's values, a batch at a time
+
+    Returns:
+        np.ndarray: the column's values
+    """
+    dtype = _settle_dtype(arrays)
+
+    return np.concatenate([_convert_batch(array, dtype) for array in arrays])
+
+
+def _settle_dtype(arrays: list[np.ndarray]) -> np.dtype:
+    """The dtype a column's batches all fit, ignoring batches of only NULLs"""
+    batch_dtypes = [array.dtype for array in arrays if not _is_null(array)]
+    if not batch_dtypes:
+        return np.dtype(object)
+
+    if all(batch_dtype.kind in 'iuf' for batch_dtype in batch_dtypes):
+        dtype = np.result_type(*batch_dtypes)
+        # a batch of only NULLs makes an int column nullable
+        return np.dtype(np.float64) if len(batch_dtypes) < len(arrays) else dtype
+
+    if len(set(batch_dtypes)) == 1 and len(batch_dtypes) == len(arrays):
+        return batch_dtypes[0]
+
+    return np.dtype(object)
+
+
+def _convert_batch(array: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Convert a batch of a column to the column's settled dtype"""
+    if array.dtype == dtype:
+        return array
+
+    if dtype.kind == 'f' and _is_null(array):
+        return np.full(len(array), np.nan)
+
+    if dtype == object:
+        # tolist gives Python values, as the other batches hold
+        return _object_array(array.tolist())
+
+    return array.astype(dtype)
+
+
+def _is_null(array: np.ndarray) -> bool:
+    """Whether a batch of a column only holds NULLs"""
+    return array.dtype == object and all(value is None for value in array)
+
+
+def result_to_columns(
+    result: CursorResult,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dtypes: dict[str, np.dtype] = None,
+    column_names: list[str] = None,
+) -> dict[str, np.ndarray]:
+    """Fetch every row of a result into column arrays
+        - Rows are pulled in fetchmany batches and transposed a batch at a time, so no
+            per-row objects (dataclasses, dicts) are built and each row tuple only lives
+            until its batch is copied into the arrays
+
+    Args:
+        result (CursorResult): result of an executed query
+        batch_size (int, optional): rows fetched at a time. Defaults to DEFAULT_BATCH_SIZE.
+        dtypes (dict[str, np.dtype], optional): dtype for some or all of the columns,
+            the rest are inferred. Defaults to None.
+        column_names (list[str], optional): names to use for the columns, ie when the
+            query selects two columns with the same name. Defaults to the query's names.
+
+    Returns:
+        dict[str, np.ndarray]: column name mapped to its values
+    """
+    column_names = column_names or list(result.keys())
+    batches: list[dict[str, np.ndarray]] = []
+
+    row_count = 0
+    while rows := result.fetchmany(batch_size):
+        row_count += len(rows)
+        batches.append(batch_to_columns(rows, column_names, dtypes))
+
+    query_metrics.record_rows(result, row_count)
+
+    if not batches:
+        return batch_to_columns([], column_names, dtypes)
+
+    if len(batches) == 1:
+        return batches[0]
+
+    return {
+        column_name: concatenate_columns([batch[column_name] for batch in batches])
+        for column_name in column_names
+    }
+
+
+def result_to_dataframe(
+    result: CursorResult,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dtypes: dict[str, np.dtype] = None,
+    column_names: list[str] = None,
+) -> pd.DataFrame:
+    """Fetch every row of a result into a dataframe built from column arrays
+
+    Args:
+        result (CursorResult): result of an executed query
+        batch_size (int, optional): rows fetched at a time. Defaults to DEFAULT_BATCH_SIZE.
+        dtypes (dict[str, np.dtype], optional): dtype for some or all of the columns,
+            the rest are inferred. Defaults to None.
+        column_names (list[str], optional): names to use for the columns. Defaults to the
+            query's names.
+
+    Returns:
+        pd.DataFrame: query results
+    """
+    return pd.DataFrame(
+        result_to_columns(result, batch_size, dtypes, column_names), copy=False
+    )
+
+
+def stream_dataframes(
+    result: CursorResult,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+    dtypes: dict[str, np.dtype] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield a result as dataframes of up to chunk_size rows
+        - Run the query with stream_results, so only one chunk is in memory at a time
+
+    Args:
+        result (CursorResult): result of a query executed with stream_results
+        chunk_size (int, optional): rows per dataframe. Defaults to DEFAULT_BATCH_SIZE.
+        dtypes (dict[str, np.dtype], optional): dtype for some or all of the columns,
+            the rest are inferred. Defaults to None.
+
+    Yields:
+        Iterator[pd.DataFrame]: query results, a chunk at a time
+    """
+    column_names: list[str] = list(result.keys())
+
+    for rows in result.partitions(chunk_size):
+        query_metrics.record_rows(result, len(rows))
+        yield pd.DataFrame(batch_to_columns(rows, column_names, dtypes), copy=False)
+
+
+async def async_stream_dataframes(
+    result: AsyncResult,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+    dtypes: dict[str, np.dtype] = None,
+) -> AsyncIterator[pd.DataFrame]:
+    """Yield a streamed async result as dataframes of up to chunk_size rows
+
+    Args:
+        result (AsyncResult): result from AsyncConnection.stream
+        chunk_size (int, optional): rows per dataframe. Defaults to DEFAULT_BATCH_SIZE.
+        dtypes (dict[str, np.dtype], optional): dtype for some or all of the columns,
+            the rest are inferred. Defaults to None.
+
+    Yields:
+        AsyncIterator[pd.DataFrame]: query results, a chunk at a time
+    """
+    column_names: list[str] = list(result.keys())
+
+    async for rows in result.partitions(chunk_size):
+        query_metrics.record_rows(result, len(rows))
+        yield pd.DataFrame(batch_to_columns(rows, column_names, dtypes), copy=False)
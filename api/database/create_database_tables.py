@@ -1,14 +1,40 @@
-"""Create NFL_Stats database tables"""
+"""Create NFL_Stats database tables
 
-from sqlalchemy import Engine, MetaData
-from db_tables import meta
-from database_helper import DatabaseEnvVariables, create_sql_server_engine
+Run from the api folder:
+    python -m database.create_database_tables
+"""
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Engine,
+    Executable,
+    Index,
+    Inspector,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.schema import AddConstraint, CreateColumn
+from database.db_tables import data_version, meta
+from database.database_helper import (
+    DatabaseEnvVariables,
+    DatabaseError,
+    create_sql_server_engine,
+)
 
 
 def create_database_tables(
     db_meta_object: MetaData, environment_variable: str
 ) -> None:
     """Create database tables
+        - Tables that already exist are migrated to the current columns, indexes and
+            constraints
 
     Args:
         db_meta_object (MetaData): MetaData object containing table information
@@ -17,6 +43,226 @@ def create_database_tables(
     engine: Engine = create_sql_server_engine(environment_variable, True)
     db_meta_object.create_all(engine)
 
+    for name in add_missing_columns(engine, db_meta_object):
+        print(f"Added {name}")
+
+    for name in add_missing_indexes(engine, db_meta_object):
+        print(f"Added {name}")
+
+    for name in add_missing_data_versions(engine, db_meta_object):
+        print(f"Added DataVersion row for {name}")
+
+
+def add_missing_data_versions(engine: Engine, db_meta_object: MetaData) -> list[str]:
+    """Add a DataVersion row for every table that doesn't have one yet
+        - Bumps only update rows, so a table needs its row before it is first written
+
+    Args:
+        engine (Engine): engine for the database to migrate
+        db_meta_object (MetaData): MetaData object containing table information
+
+    Returns:
+        list[str]: names of the tables given a row
+    """
+    with engine.begin() as db:
+        existing_names = set(db.execute(select(data_version.c.TableName)).scalars())
+        missing_names = [name for name in db_meta_object.tables if name not in existing_names]
+
+        if missing_names:
+            db.execute(
+                data_version.insert(),
+                [{"TableName": name, "Version": 0} for name in missing_names],
+            )
+
+    return missing_names
+
+
+def add_missing_columns(engine: Engine, db_meta_object: MetaData) -> list[str]:
+    """Add the columns in the metadata that an existing database's tables are missing,
+        in one transaction
+        - Safe to run more than once, columns that already exist are skipped
+
+    Args:
+        engine (Engine): engine for the database to migrate
+        db_meta_object (MetaData): MetaData object containing table information
+
+    Raises:
+        DatabaseError: a missing NOT NULL column has no server default to fill existing
+            rows with, nothing is changed
+
+    Returns:
+        list[str]: names of the columns added, as Table.Column
+    """
+    inspector: Inspector = inspect(engine)
+    existing_tables: set[str] = set(inspector.get_table_names())
+
+    missing_columns: list[Column] = []
+    for table in db_meta_object.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_names = {column["name"] for column in inspector.get_columns(table.name)}
+        missing_columns += [
+            column for column in table.columns if column.name not in existing_names
+        ]
+
+    unfillable = [
+        f"{column.table.name}.{column.name}"
+        for column in missing_columns
+        if not column.nullable and column.server_default is None
+    ]
+    if unfillable:
+        raise DatabaseError(
+            "Cannot add NOT NULL columns without a server default: " + ", ".join(unfillable)
+        )
+
+    added: list[str] = []
+    with engine.begin() as db:
+        preparer = db.dialect.identifier_preparer
+        for column in missing_columns:
+            db.execute(
+                text(
+                    f"ALTER TABLE {preparer.format_table(column.table)} "
+                    f"ADD {CreateColumn(column).compile(dialect=db.dialect)}"
+                )
+            )
+            added.append(f"{column.table.name}.{column.name}")
+
+    return added
+
+
+def add_missing_indexes(engine: Engine, db_meta_object: MetaData) -> list[str]:
+    """Add the indexes and unique constraints in the metadata that an existing database
+        is missing, in one transaction
+        - Safe to run more than once, anything that already exists is skipped
+
+    Args:
+        engine (Engine): engine for the database to migrate
+        db_meta_object (MetaData): MetaData object containing table information
+
+    Raises:
+        DatabaseError: existing rows break a unique constraint, nothing is changed
+
+    Returns:
+        list[str]: names of the indexes and constraints added
+    """
+    inspector: Inspector = inspect(engine)
+    existing_tables: set[str] = set(inspector.get_table_names())
+
+    missing_constraints: list[UniqueConstraint] = []
+    missing_indexes: list[Index] = []
+    for table in db_meta_object.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_names = {index["name"] for index in inspector.get_indexes(table.name)} | {
+            constraint["name"] for constraint in inspector.get_unique_constraints(table.name)
+        }
+        missing_constraints += [
+            constraint
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.name not in existing_names
+        ]
+        missing_indexes += [index for index in table.indexes if index.name not in existing_names]
+
+    added: list[str] = []
+    with engine.begin() as db:
+        duplicates = [
+            error
+            for constraint in missing_constraints
+            for error in find_duplicate_keys(db, constraint)
+        ]
+        if duplicates:
+            raise DatabaseError("Cannot add unique constraints: " + "; ".join(duplicates))
+
+        for constraint in missing_constraints:
+            widen_unbounded_columns(db, inspector, constraint.table, list(constraint.columns))
+            db.execute(unique_constraint_ddl(db, constraint))
+            added.append(constraint.name)
+
+        for index in missing_indexes:
+            index.create(db)
+            added.append(index.name)
+
+    return added
+
+
+def find_duplicate_keys(db: Connection, constraint: UniqueConstraint) -> list[str]:
+    """Find existing rows that would break a unique constraint
+
+    Args:
+        db (Connection): database connection
+        constraint (UniqueConstraint): constraint to check
+
+    Returns:
+        list[str]: a description of each duplicated key
+    """
+    columns = list(constraint.columns)
+    duplicate_select = (
+        select(*columns, func.count().label("Rows"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+    )
+
+    return [
+        f"{constraint.name} {tuple(row[:-1])} is in {row[-1]} rows"
+        for row in db.execute(duplicate_select)
+    ]
+
+
+def widen_unbounded_columns(
+    db: Connection, inspector: Inspector, table: Table, columns: list[Column]
+) -> None:
+    """Change unbounded string columns to their declared length, since SQL Server can't
+        index VARCHAR(max) columns
+
+    Args:
+        db (Connection): database connection
+        inspector (Inspector): inspector for the database
+        table (Table): table with the columns
+        columns (list[Column]): columns about to be indexed
+    """
+    if db.dialect.name != "mssql":
+        return
+
+    existing_columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+    preparer = db.dialect.identifier_preparer
+
+    for column in columns:
+        existing_type = existing_columns[column.name]["type"]
+        if isinstance(column.type, String) and getattr(existing_type, "length", 0) is None:
+            db.execute(
+                text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ALTER COLUMN {preparer.quote(column.name)} "
+                    f"{column.type.compile(dialect=db.dialect)}"
+                    f"{'' if column.nullable else ' NOT NULL'}"
+                )
+            )
+
+
+def unique_constraint_ddl(db: Connection, constraint: UniqueConstraint) -> Executable:
+    """DDL adding a unique constraint to an existing table
+        - SQLite can't add constraints to existing tables, so a unique index is used instead
+
+    Args:
+        db (Connection): database connection
+        constraint (UniqueConstraint): constraint to add
+
+    Returns:
+        Executable: statement adding the constraint
+    """
+    if db.dialect.name != "sqlite":
+        return AddConstraint(constraint)
+
+    preparer = db.dialect.identifier_preparer
+    column_names = ", ".join(preparer.quote(column.name) for column in constraint.columns)
+
+    return text(
+        f"CREATE UNIQUE INDEX {preparer.quote(constraint.name)} "
+        f"ON {preparer.format_table(constraint.table)} ({column_names})"
+    )
+
 
 if __name__ == "__main__":
     create_database_tables(
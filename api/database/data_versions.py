@@ -0,0 +1,151 @@
+"""Data version counters, used to invalidate cached season data and query results"""
+
+import threading
+from sqlalchemy import Connection, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+from database.database_helper import DatabaseError
+from database.db_tables import (
+    data_version,
+    division,
+    game,
+    game_result,
+    season,
+    standings,
+    team,
+    team_game_stat,
+)
+
+# tables written when a whole season is added (see season_write_transaction)
+SEASON_TABLES: tuple[str, ...] = tuple(
+    table.name
+    for table in (season, division, team, game, game_result, team_game_stat, standings)
+)
+
+# tables written when a season's game results change
+RESULT_TABLES: tuple[str, ...] = (game_result.name, standings.name)
+
+SEASON_VERSION_SELECT = select(season.c.DataVersion).where(
+    season.c.Year == bindparam("season_year")
+)
+
+SEASON_VERSION_BUMP = (
+    update(season)
+    .where(season.c.Year == bindparam("season_year"))
+    .values(DataVersion=season.c.DataVersion + 1)
+)
+
+TABLE_VERSIONS_SELECT = select(data_version.c.TableName, data_version.c.Version)
+
+TABLE_VERSIONS_BUMP = (
+    update(data_version)
+    .where(data_version.c.TableName.in_(bindparam("table_names", expanding=True)))
+    .values(Version=data_version.c.Version + 1)
+)
+
+
+class SeasonDataVersions:
+    """
+    This module counts writes to each season's data made by this process
+        - Writes from other processes are not seen, so this is only a fast path for
+            noticing this process's own writes. Season.DataVersion (see
+            read_season_version) is the version shared by every process
+
+    Import:
+        from database.data_versions import season_data_versions
+
+    Example:
+        usage:
+            version = season_data_versions.get(2023)
+            season_data_versions.bump(2023)
+
+    Attributes:
+        versions (dict[int, int]): season year mapped to its version
+    """
+
+    def __init__(self):
+        self.versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, season_year: int) -> int:
+        """Get the current version of a season's data
+
+        Args:
+            season_year (int): season year
+
+        Returns:
+            int: version, 0 if the season has not been written to
+        """
+        return self.versions.get(season_year, 0)
+
+    def bump(self, season_year: int) -> int:
+        """Record that a season's data has changed
+
+        Args:
+            season_year (int): season year
+
+        Returns:
+            int: the new version
+        """
+        with self._lock:
+            self.versions[season_year] = self.versions.get(season_year, 0) + 1
+            return self.versions[season_year]
+
+
+season_data_versions = SeasonDataVersions()
+
+
+async def read_season_version(db: AsyncConnection, season_year: int) -> int:
+    """Read a season's data version, shared by every process writing to the database
+
+    Args:
+        db (AsyncConnection): database connection
+        season_year (int): season year
+
+    Returns:
+        int: version, 0 if the season doesn't exist
+    """
+    return (await db.execute(SEASON_VERSION_SELECT, {"season_year": season_year})).scalar() or 0
+
+
+async def bump_season_version(db: AsyncConnection, season_year: int) -> None:
+    """Record that a season's data has changed, inside the transaction that changed it
+
+    Args:
+        db (AsyncConnection): database connection, inside the writing transaction
+        season_year (int): season year
+    """
+    await db.execute(SEASON_VERSION_BUMP, {"season_year": season_year})
+
+
+def read_table_versions(db: Connection) -> dict[str, int]:
+    """Read every table's data version in one query
+        - Versions are per table, not per season: any write to a table makes every
+            cached result reading from it stale
+
+    Args:
+        db (Connection): database connection
+
+    Returns:
+        dict[str, int]: table name mapped to its version
+    """
+    return dict(db.execute(TABLE_VERSIONS_SELECT).all())
+
+
+async def bump_table_versions(db: AsyncConnection, table_names: tuple[str, ...]) -> None:
+    """Record that tables have changed, inside the transaction that changed them
+        - Only updates rows, which were seeded when DataVersion was created, so writers
+            running at once just wait on each other's row locks
+
+    Args:
+        db (AsyncConnection): database connection, inside the writing transaction
+        table_names (tuple[str, ...]): tables written to
+
+    Raises:
+        DatabaseError: a table has no DataVersion row, the write is rolled back
+    """
+    result = await db.execute(TABLE_VERSIONS_BUMP, {"table_names": list(table_names)})
+    if result.rowcount != len(table_names):
+        raise DatabaseError(
+            f"DataVersion is missing a row for one of {', '.join(table_names)}, "
+            "run python -m database.create_database_tables"
+        )
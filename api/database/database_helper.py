@@ -1,23 +1,439 @@
 """Database helper functions"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping
 from dotenv import load_dotenv
-from sqlalchemy import URL, Engine, create_engine, engine
+from sqlalchemy import URL, Engine, create_engine, engine, event, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
     async_sessionmaker,
     AsyncSession,
 )
+from database.query_metrics import query_metrics
 
 
 @dataclass(frozen=True)
 class DatabaseEnvVariables:
-    """Database Connection class for NFL_Stats database ORM"""
+    """Database Connection class for NFL_Stats database ORM
+        - Each field is the name of the environment variable holding the setting
+        - The backend variable picks SQL Server ("mssql", the default) or an embedded
+            SQLite database ("sqlite") at the path in the sqlite_path variable
+    """
 
     server: str
     database: str
+    backend: str = "Database_Backend"
+    sqlite_path: str = "SQLite_Database"
+
+
+SQL_SERVER_BACKEND = "mssql"
+SQLITE_BACKEND = "sqlite"
+
+# set on every new SQLite connection: WAL lets readers run alongside the writer, and
+#   synchronous=NORMAL is safe with WAL while only syncing at checkpoints
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -64_000,
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+}
+
+
+@dataclass(frozen=True, eq=False)
+class ConnectionConfig:
+    """Connection settings from the environment and .env file, resolved once at startup"""
+
+    environment: Mapping[str, str]
+
+    def get(self, name: str) -> str | None:
+        """Get an environment variable's value
+
+        Args:
+            name (str): environment variable name
+
+        Returns:
+            str | None: value, or None if the variable is not set
+        """
+        return self.environment.get(name)
+
+
+_connection_config: ConnectionConfig = None
+_connection_config_reload_callbacks: list[Callable[[], None]] = []
+
+
+def load_connection_config() -> ConnectionConfig:
+    """Read the .env file and environment into a new, immutable ConnectionConfig
+
+    Returns:
+        ConnectionConfig: connection settings
+    """
+    load_dotenv()
+    return ConnectionConfig(MappingProxyType(dict(os.environ)))
+
+
+def get_connection_config() -> ConnectionConfig:
+    """Get the process-wide ConnectionConfig, loading it on first use
+
+    Returns:
+        ConnectionConfig: connection settings
+    """
+    global _connection_config  # pylint: disable=global-statement
+
+    if _connection_config is None:
+        _connection_config = load_connection_config()
+
+    return _connection_config
+
+
+def reload_connection_config() -> ConnectionConfig:
+    """Re-read the .env file and environment (ie after changing connection settings),
+        and clear everything built from the old settings
+
+    Returns:
+        ConnectionConfig: the new connection settings
+    """
+    global _connection_config  # pylint: disable=global-statement
+
+    _connection_config = load_connection_config()
+    create_sql_server_connection_string.cache_clear()
+
+    for callback in _connection_config_reload_callbacks:
+        callback()
+
+    return _connection_config
+
+
+def on_connection_config_reload(callback: Callable[[], None]) -> None:
+    """Call a function whenever reload_connection_config is called
+        - Used by modules that cache values built from the connection settings
+
+    Args:
+        callback (Callable[[], None]): function to call
+    """
+    _connection_config_reload_callbacks.append(callback)
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool settings for the engines handed out by the EngineRegistry"""
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+
+
+@dataclass(slots=True)
+class PoolMetrics:
+    """Checkout counts and wait times for one engine's connection pool"""
+
+    checkouts: int = field(default=0)
+    checkins: int = field(default=0)
+    connects: int = field(default=0)
+    invalidations: int = field(default=0)
+    total_wait_seconds: float = field(default=0.0)
+    max_wait_seconds: float = field(default=0.0)
+
+    def record_wait(self, seconds: float) -> None:
+        """Record how long a checkout waited for a connection
+
+        Args:
+            seconds (float): time from asking the pool for a connection to getting one
+        """
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+class _TimedPoolMixin:
+    """Times every checkout (waiting for a free connection, or opening a new one)"""
+
+    metrics: PoolMetrics = None
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, which should keep adding to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that records checkout wait times"""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait times"""
+
+
+class EngineRegistry:
+    """
+    This module hands out one shared engine (and so one connection pool) per database,
+        instead of a new engine, pool and set of ODBC connections for every call
+
+    Import:
+        from database.database_helper import engine_registry
+
+    Example:
+        usage:
+            engine = engine_registry.get_engine(environment_variables)
+            async_engine = engine_registry.get_async_engine(environment_variables)
+            engine_registry.metrics()
+
+    Attributes:
+        pool_settings (PoolSettings): pool settings for engines created from now on
+        engines (dict[tuple, Engine | AsyncEngine]): engines keyed by connection URL,
+            sync/async and echo
+        pool_metrics (dict[tuple, PoolMetrics]): pool metrics, keyed the same as engines
+    """
+
+    def __init__(self, pool_settings: PoolSettings = PoolSettings()):
+        self.pool_settings = pool_settings
+        self.engines: dict[tuple, Engine | AsyncEngine] = {}
+        self.pool_metrics: dict[tuple, PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pool_settings: PoolSettings) -> None:
+        """Set the pool settings for engines created after this call
+
+        Args:
+            pool_settings (PoolSettings): connection pool settings
+        """
+        self.pool_settings = pool_settings
+
+    def get_engine(
+        self, environment_variables: DatabaseEnvVariables, echo: bool = False
+    ) -> Engine:
+        """Get the shared engine for a database
+
+        Args:
+            environment_variables (DatabaseEnvVariables): The database environment variables.
+            echo (bool, optional): Whether to echo SQL statements to the console.
+                Defaults to False.
+
+        Returns:
+            Engine: The shared SQLAlchemy engine.
+        """
+        return self.get_engine_for_url(
+            create_sql_server_connection_string(environment_variables), False, echo
+        )
+
+    def get_async_engine(
+        self, environment_variables: DatabaseEnvVariables, echo: bool = False
+    ) -> AsyncEngine:
+        """Get the shared async engine for a database
+
+        Args:
+            environment_variables (DatabaseEnvVariables): The database environment variables.
+            echo (bool, optional): Whether to echo SQL statements to the console.
+                Defaults to False.
+
+        Returns:
+            AsyncEngine: The shared async SQLAlchemy engine.
+        """
+        return self.get_engine_for_url(
+            create_sql_server_connection_string(environment_variables, is_async=True),
+            True,
+            echo,
+        )
+
+    def get_engine_for_url(
+        self, connection_url: URL | str, is_async: bool, echo: bool = False
+    ) -> Engine | AsyncEngine:
+        """Get the shared engine for a connection URL, creating it on first use
+
+        Args:
+            connection_url (URL | str): database connection URL
+            is_async (bool): whether to create an async engine
+            echo (bool, optional): Whether to echo SQL statements to the console.
+                Defaults to False.
+
+        Returns:
+            Engine | AsyncEngine: The shared SQLAlchemy engine.
+        """
+        connection_url = make_url(connection_url)
+        key = (connection_url.render_as_string(hide_password=False), is_async, echo)
+
+        # fast path without the lock once the engine exists
+        if key in self.engines:
+            return self.engines[key]
+
+        with self._lock:
+            if key not in self.engines:
+                self.pool_metrics[key] = PoolMetrics()
+                self.engines[key] = self._create_engine(
+                    connection_url, is_async, echo, self.pool_metrics[key]
+                )
+
+        return self.engines[key]
+
+    def _create_engine(
+        self, connection_url: URL, is_async: bool, echo: bool, metrics: PoolMetrics
+    ) -> Engine | AsyncEngine:
+        """Create an engine with the registry's pool settings and attach pool metrics"""
+        settings = self.pool_settings
+        pool_arguments = {
+            "pool_size": settings.pool_size,
+            "max_overflow": settings.max_overflow,
+            "pool_timeout": settings.pool_timeout,
+            "pool_recycle": settings.pool_recycle,
+            "pool_pre_ping": settings.pool_pre_ping,
+        }
+
+        if is_async:
+            new_engine = create_async_engine(
+                connection_url, echo=echo, poolclass=TimedAsyncAdaptedQueuePool, **pool_arguments
+            )
+            sync_engine: Engine = new_engine.sync_engine
+        else:
+            new_engine = create_engine(
+                connection_url, echo=echo, poolclass=TimedQueuePool, **pool_arguments
+            )
+            sync_engine = new_engine
+
+        sync_engine.pool.metrics = metrics
+        query_metrics.instrument_engine(sync_engine)
+
+        if connection_url.get_backend_name() == SQLITE_BACKEND:
+            set_sqlite_pragmas_on_connect(sync_engine)
+
+        @event.listens_for(sync_engine, "connect")
+        def on_connect(*_):
+            metrics.connects += 1
+
+        @event.listens_for(sync_engine, "checkout")
+        def on_checkout(*_):
+            metrics.checkouts += 1
+
+        @event.listens_for(sync_engine, "checkin")
+        def on_checkin(*_):
+            metrics.checkins += 1
+
+        @event.listens_for(sync_engine, "invalidate")
+        def on_invalidate(*_):
+            metrics.invalidations += 1
+
+        return new_engine
+
+    def metrics(self) -> dict[str, dict]:
+        """Snapshot of every pool's checkout metrics and current state
+
+        Returns:
+            dict[str, dict]: engine name (URL without the password) mapped to its pool metrics
+        """
+        snapshot: dict[str, dict] = {}
+
+        for key, registered_engine in list(self.engines.items()):
+            url, is_async, echo = key
+            pool = registered_engine.sync_engine.pool if is_async else registered_engine.pool
+            metrics: PoolMetrics = self.pool_metrics[key]
+
+            engine_name = make_url(url).render_as_string(hide_password=True)
+            engine_name += " (async)" if is_async else ""
+            engine_name += " (echo)" if echo else ""
+
+            snapshot[engine_name] = {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "checkouts": metrics.checkouts,
+                "checkins": metrics.checkins,
+                "connects": metrics.connects,
+                "invalidations": metrics.invalidations,
+                "total_wait_seconds": round(metrics.total_wait_seconds, 6),
+                "max_wait_seconds": round(metrics.max_wait_seconds, 6),
+                "average_wait_seconds": (
+                    round(metrics.total_wait_seconds / metrics.checkouts, 6)
+                    if metrics.checkouts
+                    else 0.0
+                ),
+            }
+
+        return snapshot
+
+    def dispose(self) -> None:
+        """Close every pooled connection of the sync engines"""
+        for (_, is_async, _), registered_engine in list(self.engines.items()):
+            if not is_async:
+                registered_engine.dispose()
+
+    async def async_dispose(self) -> None:
+        """Close every pooled connection of all engines"""
+        for (_, is_async, _), registered_engine in list(self.engines.items()):
+            if is_async:
+                await registered_engine.dispose()
+            else:
+                registered_engine.dispose()
+
+
+engine_registry = EngineRegistry()
+
+
+def database_metrics() -> dict[str, object]:
+    """Snapshot of every pool's metrics, every statement's timings and the slow query log,
+        for the web layer to serve
+
+    Returns:
+        dict[str, object]: "pools", "queries" and "slow_queries"
+    """
+    return {"pools": engine_registry.metrics(), **query_metrics.snapshot()}
+
+
+def database_metrics_prometheus() -> str:
+    """The pool and statement metrics in the Prometheus text exposition format
+
+    Returns:
+        str: metrics text
+    """
+    return query_metrics.prometheus_text(engine_registry.metrics())
+
+
+def get_sql_server_engine(
+    environment_variables: DatabaseEnvVariables, echo: bool = False
+) -> Engine:
+    """Get the shared SQLAlchemy engine for a SQL Server database.
+
+    Args:
+        environment_variables (DatabaseEnvVariables): The database environment variables.
+        echo (bool, optional): Whether to echo SQL statements to the console. Defaults to False.
+
+    Returns:
+        Engine: The shared SQLAlchemy engine for the SQL Server database.
+    """
+    return engine_registry.get_engine(environment_variables, echo)
+
+
+def get_async_sql_server_engine(
+    environment_variables: DatabaseEnvVariables, echo: bool = False
+) -> AsyncEngine:
+    """Get the shared async SQLAlchemy engine for a SQL Server database.
+
+    Args:
+        environment_variables (DatabaseEnvVariables): The database environment variables.
+        echo (bool, optional): Whether to echo SQL statements to the console. Defaults to False.
+
+    Returns:
+        AsyncEngine: The shared async SQLAlchemy engine for the SQL Server database.
+    """
+    return engine_registry.get_async_engine(environment_variables, echo)
 
 
 async def async_create_session_engine(
@@ -32,9 +448,7 @@ async def async_create_session_engine(
     Returns:
         AsyncSession: The async SQLAlchemy engine for connecting to the SQL Server database.
     """
-    async_engine: AsyncEngine = await async_create_sql_server_engine(
-        environment_variables, echo
-    )
+    async_engine: AsyncEngine = get_async_sql_server_engine(environment_variables, echo)
     return async_sessionmaker(async_engine, expire_on_commit=True)
 
 
@@ -58,7 +472,12 @@ async def async_create_sql_server_engine(
         environment_variables, is_async=True
     )
 
-    return create_async_engine(connection_url, echo=echo)
+    new_engine = create_async_engine(connection_url, echo=echo)
+    query_metrics.instrument_engine(new_engine.sync_engine)
+    if connection_url.get_backend_name() == SQLITE_BACKEND:
+        set_sqlite_pragmas_on_connect(new_engine.sync_engine)
+
+    return new_engine
 
 
 def create_sql_server_engine(
@@ -79,25 +498,49 @@ def create_sql_server_engine(
     """
     connection_url: URL = create_sql_server_connection_string(environment_variables)
 
-    return create_engine(connection_url, echo=echo)
+    new_engine = create_engine(connection_url, echo=echo)
+    query_metrics.instrument_engine(new_engine)
+    if connection_url.get_backend_name() == SQLITE_BACKEND:
+        set_sqlite_pragmas_on_connect(new_engine)
+
+    return new_engine
 
 
+@lru_cache(maxsize=None)
 def create_sql_server_connection_string(
     environment_variables: DatabaseEnvVariables, is_async: bool = False
 ) -> URL:
-    """Create a connection string for a SQL Server database from an environment variable.
+    """Create a connection string for the database's backend from its environment variables.
+        - SQL Server unless the backend variable is "sqlite"
+        - Cached, since the connection settings only change with reload_connection_config
 
     Args:
-        environment_variable (str): The name of the environment variable containing the
-            SQL Server connection string.
+        environment_variables (DatabaseEnvVariables): The database environment variables.
+        is_async (bool, optional): Whether the URL is for an async engine. Defaults to False.
+
+    Raises:
+        DatabaseError: If the backend is unknown, or the SQLite path is not set.
 
     Returns:
-        str: The SQL Server connection string.
+        URL: The connection string.
     """
-    # Get the connection string from the environment variable
-    load_dotenv()
-    server = os.getenv(environment_variables.server)
-    database = os.getenv(environment_variables.database)
+    # Get the connection settings from the environment variables
+    config = get_connection_config()
+    backend = config.get(environment_variables.backend) or SQL_SERVER_BACKEND
+
+    if backend == SQLITE_BACKEND:
+        sqlite_path = config.get(environment_variables.sqlite_path)
+        if not sqlite_path:
+            raise DatabaseError(
+                f"{environment_variables.sqlite_path} must be set to use the SQLite backend"
+            )
+        return create_sqlite_connection_string(sqlite_path, is_async)
+
+    if backend != SQL_SERVER_BACKEND:
+        raise DatabaseError(f"Unknown database backend: {backend}")
+
+    server = config.get(environment_variables.server)
+    database = config.get(environment_variables.database)
 
     if is_async:
         driver_name = "mssql+aioodbc"
@@ -116,6 +559,37 @@ def create_sql_server_connection_string(
     )
 
 
+def create_sqlite_connection_string(sqlite_path: str, is_async: bool = False) -> URL:
+    """Create a connection string for an embedded SQLite database file.
+
+    Args:
+        sqlite_path (str): Path of the database file, created on first connect.
+        is_async (bool, optional): Whether the URL is for an async engine. Defaults to False.
+
+    Returns:
+        URL: The connection string.
+    """
+    return engine.URL.create(
+        drivername="sqlite+aiosqlite" if is_async else "sqlite+pysqlite",
+        database=os.path.abspath(sqlite_path),
+    )
+
+
+def set_sqlite_pragmas_on_connect(sync_engine: Engine) -> None:
+    """Set SQLITE_PRAGMAS on every connection the engine opens.
+
+    Args:
+        sync_engine (Engine): The engine, or an async engine's sync_engine.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+
 class DatabaseError(Exception):
     """An error occurred with the database."""
 
@@ -1,19 +1,44 @@
 """NFL_Stats database ORM Classes"""
 
+from dataclasses import fields
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
+    UniqueConstraint,
+    event,
 )
+from data import data
 
 meta = MetaData()
 
+# each table's write count, bumped in the transaction that writes it, so cached query
+#   results can tell whether the tables they read from have changed
+data_version = Table(
+    "DataVersion",
+    meta,
+    Column("TableName", String(100), primary_key=True, nullable=False),
+    Column("Version", Integer, nullable=False),
+)
+
+
+@event.listens_for(data_version, "after_create")
+def seed_data_versions(target: Table, connection, **_) -> None:
+    """Give every table its DataVersion row as soon as the table is created, so bumps
+        only ever update rows (tables added later get theirs from create_database_tables)"""
+    connection.execute(
+        target.insert(),
+        [{"TableName": table_name, "Version": 0} for table_name in target.metadata.tables],
+    )
+
+
 user = Table(
     "User",
     meta,
@@ -32,15 +57,21 @@ season = Table(
     Column("Year", Integer, nullable=False),
     Column("RegularSeasonWeekCount", Integer, nullable=False),
     Column("PlayoffTeams", Integer, nullable=False),
+    # bumped in every transaction that writes the season, so caches in any process can
+    #   tell their copy of the season is stale (see season_write_transaction)
+    Column("DataVersion", Integer, nullable=False, server_default="0"),
+    UniqueConstraint("Year", name="UQ_Season_Year"),
 )
 
 division = Table(
     "Division",
     meta,
     Column("Id", Integer, primary_key=True, autoincrement=True, nullable=False),
-    Column("Name", String, nullable=False),
+    Column("Name", String(100), nullable=False),
     Column("Conference", String, nullable=True),
     Column("SeasonId", Integer, ForeignKey("Season.Id"), nullable=False),
+    # also the index for looking up a season's divisions
+    UniqueConstraint("SeasonId", "Name", name="UQ_Division_SeasonId_Name"),
 )
 
 team = Table(
@@ -49,8 +80,10 @@ team = Table(
     Column("Id", Integer, primary_key=True, autoincrement=True, nullable=False),
     Column("Location", String, nullable=False),
     Column("Name", String, nullable=False),
-    Column("FullName", String, nullable=False),
+    Column("FullName", String(100), nullable=False),
     Column("DivisionId", Integer, ForeignKey("Division.Id"), nullable=False),
+    # also the index for looking up a division's teams
+    UniqueConstraint("DivisionId", "FullName", name="UQ_Team_DivisionId_FullName"),
 )
 
 game = Table(
@@ -63,6 +96,9 @@ game = Table(
     Column("StartTime", DateTime, nullable=True),
     Column("AwayTeamId", Integer, ForeignKey("Team.Id"), nullable=False),
     Column("HomeTeamId", Integer, ForeignKey("Team.Id"), nullable=False),
+    Index("IX_Game_SeasonId_Week", "SeasonId", "Week"),
+    Index("IX_Game_AwayTeamId", "AwayTeamId"),
+    Index("IX_Game_HomeTeamId", "HomeTeamId"),
 )
 
 game_result = Table(
@@ -73,8 +109,79 @@ game_result = Table(
     Column("AwayScore", Integer, nullable=False),
     Column("HomeScore", Integer, nullable=False),
     Column("Overtime", Boolean, nullable=False),
+    UniqueConstraint("GameId", name="UQ_GameResult_GameId"),
 )
 
+team_game_stat = Table(
+    "TeamGameStat",
+    meta,
+    Column("Id", Integer, primary_key=True, autoincrement=True, nullable=False),
+    Column("GameId", Integer, ForeignKey("Game.Id"), nullable=False),
+    Column("TeamId", Integer, ForeignKey("Team.Id"), nullable=False),
+    Column("Yards", Integer, nullable=True),
+    Column("Turnovers", Integer, nullable=True),
+    Column("Touchdowns", Integer, nullable=True),
+    UniqueConstraint("GameId", "TeamId", name="UQ_TeamGameStat_GameId_TeamId"),
+)
+
+# standings after each regular season week, refreshed whenever the season's results change
+#   (columns after TeamId are the data.data.Team standings fields, see STANDINGS_FIELD_COLUMNS)
+standings = Table(
+    "Standings",
+    meta,
+    Column("Id", Integer, primary_key=True, autoincrement=True, nullable=False),
+    Column("SeasonId", Integer, ForeignKey("Season.Id"), nullable=False),
+    Column("Week", Integer, nullable=False),
+    Column("TeamId", Integer, ForeignKey("Team.Id"), nullable=False),
+    Column("Wins", Integer, nullable=False),
+    Column("Losses", Integer, nullable=False),
+    Column("Ties", Integer, nullable=False),
+    Column("WinPercentage", Float, nullable=False),
+    Column("PointDifferential", Integer, nullable=False),
+    Column("PointsFor", Integer, nullable=False),
+    Column("PointsAgainst", Integer, nullable=False),
+    Column("DivisionWins", Integer, nullable=False),
+    Column("DivisionLosses", Integer, nullable=False),
+    Column("DivisionTies", Integer, nullable=False),
+    Column("DivisionWinPercentage", Float, nullable=False),
+    Column("ConferenceWins", Integer, nullable=False),
+    Column("ConferenceLosses", Integer, nullable=False),
+    Column("ConferenceTies", Integer, nullable=False),
+    Column("ConferenceWinPercentage", Float, nullable=False),
+    Column("StrengthOfVictory", Float, nullable=False),
+    Column("StrengthOfSchedule", Float, nullable=False),
+    Column("PointsForInConferenceGames", Integer, nullable=False),
+    Column("PointsAgainstInConferenceGames", Integer, nullable=False),
+    Column("NetTouchdowns", Integer, nullable=False),
+    Column("OffensiveRank", Integer, nullable=False),
+    Column("DefensiveRank", Integer, nullable=False),
+    Column("OffensiveRankInConference", Integer, nullable=False),
+    Column("DefensiveRankInConference", Integer, nullable=False),
+    Column("CombinedScoreRanking", Integer, nullable=False),
+    Column("CombinedScoreRankingInConference", Integer, nullable=False),
+    Column("PlayoffRank", Integer, nullable=False),
+    Column("DivisionRank", Integer, nullable=False),
+    Column("PlayoffClinchType", String(1), nullable=False),
+    # also the index for reading a week's standings
+    UniqueConstraint("SeasonId", "Week", "TeamId", name="UQ_Standings_SeasonId_Week_TeamId"),
+)
+
+# data.data.Team fields that aren't standings, the team and division are stored elsewhere
+_TEAM_INFO_FIELDS = {"location", "name", "full_name", "division", "conference"}
+
+# Team standings field mapped to its Standings column (ie win_percentage -> WinPercentage),
+#   in Team field order
+STANDINGS_FIELD_COLUMNS: dict[str, str] = {
+    team_field.name: "".join(part.capitalize() for part in team_field.name.split("_"))
+    for team_field in fields(data.Team)
+    if team_field.name not in _TEAM_INFO_FIELDS
+}
+
+# a field or column added on only one side would otherwise be silently dropped
+assert set(STANDINGS_FIELD_COLUMNS.values()) == {
+    column.name for column in standings.columns
+} - {"Id", "SeasonId", "Week", "TeamId"}, "Standings columns don't match the Team fields"
+
 game_line = Table(
     "GameLine",
     meta,
@@ -1,9 +1,20 @@
 """Handle databse insertions"""
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
 from data.excel_conversion import Season, Team, Division, Game
+from data.standings import calculate_standings
+from data.team_game_stats import TeamGameStats
+from database.data_versions import (
+    SEASON_TABLES,
+    bump_season_version,
+    bump_table_versions,
+    season_data_versions,
+)
 from database.database_helper import (
     DatabaseEnvVariables,
-    async_create_sql_server_engine,
+    get_async_sql_server_engine,
 )
 from database.insert.individual_inserts import (
     add_season,
@@ -11,6 +22,15 @@ from database.insert.individual_inserts import (
     add_teams,
     add_games,
     add_game_results,
+    add_team_game_stats,
+    replace_standings,
+)
+from database.select.db_select import (
+    get_games_for_season,
+    get_scheduled_game_counts,
+    get_season_info,
+    get_team_game_stats_for_seasons,
+    get_teams_for_season,
 )
 from database.select.select_foreign_keys import (
     get_season_id,
@@ -30,29 +50,127 @@ async def add_entire_season_to_database(
     """Adds an entire NFL season to the database.
 
     Args:
-        games (list[Game]): A list of games for the season.
-        teams (list[Team]): A list of teams in the season.
-        divisions (list[Division]): A list of divisions in the season.
         season_info (Season): A Season object containing information about the season.
+        divisions (list[Division]): A list of divisions in the season.
+        teams (list[Team]): A list of teams in the season.
+        games (list[Game]): A list of games for the season.
+        completed_season (bool): Whether the games have results to add.
     """
-    engine = await async_create_sql_server_engine(
+    engine = get_async_sql_server_engine(
         DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats"), True
     )
 
+    async with season_write_transaction(engine, season_info.year) as db:
+        await insert_entire_season(db, season_info, divisions, teams, games, completed_season)
+
+
+@asynccontextmanager
+async def season_write_transaction(
+    engine: AsyncEngine, season_year: int, table_names: tuple[str, ...] = SEASON_TABLES
+) -> AsyncIterator[AsyncConnection]:
+    """Begins a transaction for writing a season's data, and bumps the season's data
+        version once it commits so cached copies of the season are reloaded
+        - The version is bumped after the commit, so a load running during the
+            transaction can't be cached as the new version
+        - Season.DataVersion and the written tables' DataVersion rows are bumped inside
+            the transaction, so caches in any process see the write. Table versions are
+            not per season, so every cached Tables result reading those tables goes stale
+
+    Args:
+        engine (AsyncEngine): The engine to write through.
+        season_year (int): The year of the season being written.
+        table_names (tuple[str, ...], optional): The tables being written.
+            Defaults to SEASON_TABLES.
+
+    Yields:
+        AsyncConnection: The database connection, inside the transaction.
+    """
     async with engine.begin() as db:
-        await add_season(db, season_info)
-        season_id = await get_season_id(db, season_info.year)
+        yield db
+        await bump_season_version(db, season_year)
+        await bump_table_versions(db, table_names)
+
+    season_data_versions.bump(season_year)
+
+
+async def insert_entire_season(
+    db: AsyncConnection,
+    season_info: Season,
+    divisions: list[Division],
+    teams: list[Team],
+    games: list[Game],
+    completed_season: bool,
+) -> None:
+    """Inserts an entire NFL season using an open database connection.
+        - The caller owns the transaction, so the whole season is committed or rolled back
+            together
+
+    Args:
+        db (AsyncConnection): The database connection.
+        season_info (Season): A Season object containing information about the season.
+        divisions (list[Division]): A list of divisions in the season.
+        teams (list[Team]): A list of teams in the season.
+        games (list[Game]): A list of games for the season.
+        completed_season (bool): Whether the games have results to add.
+    """
+    await add_season(db, season_info)
+    season_id = await get_season_id(db, season_info.year)
 
-        await add_divisions(db, divisions, season_id)
-        division_ids = await get_division_ids(db, season_id)
+    await add_divisions(db, divisions, season_id)
+    division_ids = await get_division_ids(db, season_id)
 
-        await add_teams(db, teams, division_ids)
-        team_ids = await get_team_ids(db, season_id)
+    await add_teams(db, teams, division_ids)
+    team_ids = await get_team_ids(db, season_id)
 
-        await add_games(db, games, team_ids, season_id)
+    await add_games(db, games, team_ids, season_id)
+
+    if completed_season:
+        game_ids = await get_game_ids(db, season_id)
+        await add_game_results(db, games, game_ids)
+        await add_team_game_stats(db, games, game_ids, team_ids)
+        await refresh_standings(db, season_info.year)
+
+
+async def refresh_standings(db: AsyncConnection, season_year: int, first_week: int = 1) -> None:
+    """Recalculates the Standings table for a season from a week onward, since a result
+        changes the standings for its week and every week after it.
+        - Only weeks up to the last regular season week with a result are stored
+
+    Args:
+        db (AsyncConnection): The database connection.
+        season_year (int): The season year.
+        first_week (int, optional): The first week with a changed result. Defaults to 1.
+    """
+    season_info = await get_season_info(db, season_year)
+    if first_week > season_info.regular_season_week_count:
+        return
+
+    teams = await get_teams_for_season(db, season_year)
+    games = await get_games_for_season(db, season_year)
+    scheduled_games = await get_scheduled_game_counts(
+        db, season_year, season_info.regular_season_week_count
+    )
+    team_game_stats = TeamGameStats(await get_team_game_stats_for_seasons(db, [season_year]))
+
+    last_week = max(
+        (game.week for game in games if game.week <= season_info.regular_season_week_count),
+        default=0,
+    )
 
-        if completed_season:
-            game_ids = await get_game_ids(db, season_id)
-            await add_game_results(db, games, game_ids)
+    weekly_standings = {
+        week: calculate_standings(
+            season_info,
+            teams,
+            games,
+            week,
+            scheduled_games,
+            team_game_stats.net_touchdowns(season_year, weeks=range(1, week + 1))
+            if season_year in team_game_stats.season_totals
+            else None,
+        )
+        for week in range(first_week, last_week + 1)
+    }
 
-        db.commit()
+    season_id = await get_season_id(db, season_year)
+    team_ids = await get_team_ids(db, season_id)
+    await replace_standings(db, season_id, first_week, weekly_standings, team_ids)
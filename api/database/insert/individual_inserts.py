@@ -1,7 +1,17 @@
 """Handles adding data to individual tables"""
-from sqlalchemy import Connection, Insert, insert
+from sqlalchemy import Connection, Insert, Update, bindparam, delete, insert, update
+from data import data
 from data.excel_conversion import Season, Team, Division, Game
-from database.db_tables import season, division, team, game, game_result
+from database.db_tables import (
+    season,
+    division,
+    team,
+    game,
+    game_result,
+    team_game_stat,
+    standings,
+    STANDINGS_FIELD_COLUMNS,
+)
 
 
 async def add_season(db: Connection, season_info: Season) -> None:
@@ -123,4 +133,113 @@ async def add_game_results(
 
     game_result_insert: Insert = game_result.insert().values(game_result_values)
 
-    await db.execute(game_result_insert)
\ No newline at end of file
+    await db.execute(game_result_insert)
+
+
+async def add_team_game_stats(
+    db: Connection, games: list[Game], game_ids: list[int], team_ids: dict[str, int]
+) -> None:
+    """Adds the yards, turnovers and touchdowns of both teams in a list of games.
+
+    Args:
+        db (Connection): The database connection.
+        games (list[Game]): A list of games with their team stats.
+        game_ids (list[int]): A list of game IDs, in the same order as the games.
+        team_ids (dict[str, int]): A dictionary of team full names and their IDs.
+    """
+    team_game_stat_values = [
+        {
+            "GameId": game_ids[i],
+            "TeamId": team_ids[team_name],
+            "Yards": yards,
+            "Turnovers": turnovers,
+            "Touchdowns": touchdowns,
+        }
+        for i, g in enumerate(games)
+        for team_name, yards, turnovers, touchdowns in (
+            (g.away_team, g.away_yards, g.away_turnovers, g.away_touchdowns),
+            (g.home_team, g.home_yards, g.home_turnovers, g.home_touchdowns),
+        )
+    ]
+
+    await db.execute(team_game_stat.insert(), team_game_stat_values)
+
+
+async def upsert_game_results(
+    db: Connection,
+    game_results: dict[int, tuple[int, int, bool]],
+    existing_game_ids: set[int],
+) -> None:
+    """Adds new game results and updates changed ones, one batched statement for each.
+
+    Args:
+        db (Connection): The database connection.
+        game_results (dict[int, tuple[int, int, bool]]): Game IDs mapped to their
+            (away score, home score, overtime) to write.
+        existing_game_ids (set[int]): IDs of the games that already have a result row.
+    """
+    new_results = [
+        {"GameId": game_id, "AwayScore": away, "HomeScore": home, "Overtime": overtime}
+        for game_id, (away, home, overtime) in game_results.items()
+        if game_id not in existing_game_ids
+    ]
+    changed_results = [
+        {"b_GameId": game_id, "AwayScore": away, "HomeScore": home, "Overtime": overtime}
+        for game_id, (away, home, overtime) in game_results.items()
+        if game_id in existing_game_ids
+    ]
+
+    if new_results:
+        await db.execute(game_result.insert(), new_results)
+
+    if changed_results:
+        game_result_update: Update = (
+            update(game_result)
+            .where(game_result.columns.GameId == bindparam("b_GameId"))
+            .values(
+                AwayScore=bindparam("AwayScore"),
+                HomeScore=bindparam("HomeScore"),
+                Overtime=bindparam("Overtime"),
+            )
+        )
+        await db.execute(game_result_update, changed_results)
+
+
+async def replace_standings(
+    db: Connection,
+    season_id: int,
+    first_week: int,
+    weekly_standings: dict[int, list[data.Team]],
+    team_ids: dict[str, int],
+) -> None:
+    """Replaces a season's standings from a week onward, one batched insert for every week.
+
+    Args:
+        db (Connection): The database connection.
+        season_id (int): The ID of the season.
+        first_week (int): The first week to replace, later weeks are replaced too.
+        weekly_standings (dict[int, list[data.Team]]): Week mapped to the standings after it.
+        team_ids (dict[str, int]): A dictionary mapping team names to their IDs.
+    """
+    await db.execute(
+        delete(standings).where(
+            (standings.columns.SeasonId == season_id) & (standings.columns.Week >= first_week)
+        )
+    )
+
+    standings_values: list[dict] = [
+        {
+            "SeasonId": season_id,
+            "Week": week,
+            "TeamId": team_ids[team_standings.full_name],
+            **{
+                column_name: getattr(team_standings, field_name)
+                for field_name, column_name in STANDINGS_FIELD_COLUMNS.items()
+            },
+        }
+        for week, week_standings in weekly_standings.items()
+        for team_standings in week_standings
+    ]
+
+    if standings_values:
+        await db.execute(standings.insert(), standings_values)
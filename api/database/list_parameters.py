@@ -0,0 +1,229 @@
+"""List parameters for IN clauses: expanding binds for short lists, temp tables for long ones"""
+
+import logging
+import re
+import pandas as pd
+from sqlalchemy import (
+    Column,
+    Connection,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    TextClause,
+    bindparam,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection
+from database.columnar_fetch import result_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+# lists longer than this are joined through a temp table, and lists are also moved to temp
+#   tables while a query's padded lists and other binds add up to more than
+#   MAX_BIND_PARAMETERS (SQL Server allows 2100)
+EXPANDING_LIST_LIMIT = 1000
+MAX_BIND_PARAMETERS = 2000
+
+
+def padded_list_size(item_count: int) -> int:
+    """Size to pad a list to, so lists of similar lengths share one statement and plan
+
+    Args:
+        item_count (int): items in the list
+
+    Returns:
+        int: next power of two, at least 1
+    """
+    return 1 << max(item_count - 1, 0).bit_length()
+
+
+def pad_list(items: list) -> list:
+    """Pad a list to padded_list_size by repeating its last item, which doesn't change
+        the result of an IN clause
+
+    Args:
+        items (list): list items
+
+    Returns:
+        list: padded list
+    """
+    if not items:
+        return items
+
+    return items + [items[-1]] * (padded_list_size(len(items)) - len(items))
+
+
+def bind_count(query_string: str, name: str) -> int:
+    """Number of bind parameters a parameter is sent as, once per place it's used
+
+    Args:
+        query_string (str): query with ":name" where the parameter goes
+        name (str): parameter name
+
+    Returns:
+        int: places the parameter is used, at least 1
+    """
+    return max(len(re.findall(rf":{name}\b", query_string)), 1)
+
+
+def list_table_names(
+    query_string: str, list_parameters: dict[str, list], parameters: dict
+) -> set[str]:
+    """Choose the lists to join through temp tables rather than send as expanding binds
+        - Lists longer than EXPANDING_LIST_LIMIT always go to temp tables
+        - The rest are counted at their padded size, and the largest are moved to temp
+            tables until the query's binds fit in MAX_BIND_PARAMETERS
+
+    Args:
+        query_string (str): query with ":name" where each list goes
+        list_parameters (dict[str, list]): list parameter name mapped to its items
+        parameters (dict): other SQL parameters
+
+    Returns:
+        set[str]: names of the lists to load into temp tables
+    """
+    table_names = {
+        name for name, items in list_parameters.items() if len(items) > EXPANDING_LIST_LIMIT
+    }
+
+    list_bind_counts = {
+        name: padded_list_size(len(items)) * bind_count(query_string, name)
+        for name, items in list_parameters.items()
+        if name not in table_names
+    }
+    total_binds = sum(bind_count(query_string, name) for name in parameters) + sum(
+        list_bind_counts.values()
+    )
+
+    for name in sorted(list_bind_counts, key=list_bind_counts.get, reverse=True):
+        if total_binds <= MAX_BIND_PARAMETERS:
+            break
+        table_names.add(name)
+        total_binds -= list_bind_counts[name]
+
+    return table_names
+
+
+def list_value_type(items: list):
+    """SQL type for a temp table holding the list items
+
+    Args:
+        items (list): list items
+
+    Returns:
+        TypeEngine: column type
+    """
+    if all(isinstance(item, int) for item in items):
+        return Integer()
+    if all(isinstance(item, (int, float)) for item in items):
+        return Float()
+    return String(max(1, *(len(str(item)) for item in items)))
+
+
+def create_list_table(db: Connection, name: str, items: list) -> Table:
+    """Create a temp table with one Value column and bulk load the list into it
+
+    Args:
+        db (Connection): database connection
+        name (str): list parameter name
+        items (list): list items
+
+    Returns:
+        Table: the temp table, drop it when the query is done
+    """
+    # temp tables are only visible to their connection, so the name can be the same every
+    #   time, which keeps the query text (and its plan) the same too
+    if db.dialect.name == "mssql":
+        # '#' makes a SQL Server temp table
+        list_table = Table(f"#list_{name}", MetaData(), Column("Value", list_value_type(items)))
+    else:
+        list_table = Table(
+            f"list_{name}",
+            MetaData(),
+            Column("Value", list_value_type(items)),
+            prefixes=["TEMPORARY"],
+        )
+
+    list_table.create(db)
+    db.execute(list_table.insert(), [{"Value": item} for item in dict.fromkeys(items)])
+
+    return list_table
+
+
+def run_list_query(
+    db: Connection,
+    query_string: str,
+    list_parameters: dict[str, list],
+    parameters: dict = None,
+) -> pd.DataFrame:
+    """Run a query with list parameters (ie "WHERE Id IN :ids")
+        - Lists up to EXPANDING_LIST_LIMIT items are sent as expanding bind parameters,
+            padded to a power of two so the statement (and its plan) is reused
+        - Longer lists, and the largest lists while the query would need more than
+            MAX_BIND_PARAMETERS binds, are loaded into a temp table, and ":name" is
+            replaced with a subquery on it
+
+    Args:
+        db (Connection): database connection
+        query_string (str): query with ":name" where each list goes
+        list_parameters (dict[str, list]): list parameter name mapped to its items
+        parameters (dict, optional): other SQL parameters. Defaults to None.
+
+    Returns:
+        pd.DataFrame: query results
+    """
+    bind_parameters: dict = dict(parameters or {})
+    list_parameters = {name: list(items) for name, items in list_parameters.items()}
+    table_names = list_table_names(query_string, list_parameters, bind_parameters)
+    expanding_names: list[str] = []
+    list_tables: list[Table] = []
+
+    try:
+        for name, items in list_parameters.items():
+            if name not in table_names:
+                expanding_names.append(name)
+                bind_parameters[name] = pad_list(items)
+                continue
+
+            list_table = create_list_table(db, name, items)
+            list_tables.append(list_table)
+            subquery = str(select(list_table.columns.Value).compile(dialect=db.dialect))
+            query_string = re.sub(rf":{name}\b", lambda _: f"({subquery})", query_string)
+
+        statement: TextClause = text(query_string).bindparams(
+            *[bindparam(name, expanding=True) for name in expanding_names]
+        )
+        result = db.execute(statement, bind_parameters)
+
+        return result_to_dataframe(result)
+    finally:
+        for list_table in list_tables:
+            # after a failed query the transaction may be aborted, so the drop can fail too,
+            #   and its error must not replace the query's (temp tables go with the session)
+            try:
+                list_table.drop(db)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.warning("Could not drop list table %s", list_table.name, exc_info=True)
+
+
+async def async_run_list_query(
+    db: AsyncConnection,
+    query_string: str,
+    list_parameters: dict[str, list],
+    parameters: dict = None,
+) -> pd.DataFrame:
+    """Run a query with list parameters on an async connection (see run_list_query)
+
+    Args:
+        db (AsyncConnection): database connection
+        query_string (str): query with ":name" where each list goes
+        list_parameters (dict[str, list]): list parameter name mapped to its items
+        parameters (dict, optional): other SQL parameters. Defaults to None.
+
+    Returns:
+        pd.DataFrame: query results
+    """
+    return await db.run_sync(run_list_query, query_string, list_parameters, parameters)
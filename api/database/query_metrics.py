@@ -0,0 +1,401 @@
+"""Time every statement the engines run, keyed by a normalized statement fingerprint"""
+
+from bisect import bisect_left
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import logging
+import re
+import threading
+import time
+from sqlalchemy import URL, Connection, CursorResult, Engine, event
+from sqlalchemy.ext.asyncio import AsyncResult
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# slow query parameters are logged up to this many characters
+MAX_LOGGED_PARAMETERS_LENGTH = 1000
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|(?<![:\w]):\w+|\$\d+|\?")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so every run of the same query has the same fingerprint
+        - Literals and bind parameters become ?, and IN lists of any length (?+)
+
+    Args:
+        statement (str): SQL statement, as sent to the driver
+
+    Returns:
+        str: normalized statement
+    """
+    normalized = _COMMENT.sub(" ", statement)
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _PARAMETER_LIST.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+@lru_cache(maxsize=None)
+def engine_name(url: URL, is_async: bool) -> str:
+    """Name an engine by its URL without the password
+
+    Args:
+        url (URL): engine URL
+        is_async (bool): whether the engine is async
+
+    Returns:
+        str: engine name
+    """
+    return url.render_as_string(hide_password=True) + (" (async)" if is_async else "")
+
+
+def connection_engine_name(conn: Connection) -> str:
+    """Name of the engine a connection belongs to"""
+    return engine_name(conn.engine.url, conn.dialect.is_async)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Latency histogram, rows and errors for one statement fingerprint on one engine"""
+
+    statement: str
+    bucket_counts: list[int]
+    count: int = field(default=0)
+    total_seconds: float = field(default=0.0)
+    max_seconds: float = field(default=0.0)
+    rows: int = field(default=0)
+    errors: int = field(default=0)
+
+
+@dataclass(slots=True, frozen=True)
+class SlowQuery:
+    """A statement that took longer than the slow query threshold"""
+
+    engine: str
+    statement: str
+    parameters: str
+    seconds: float
+    started_at: datetime
+
+
+class QueryMetrics:
+    """
+    This module times every statement run by the engines it instruments, with a latency
+        histogram, rows and errors per statement fingerprint and a log of slow queries
+        - Rows are rows affected for DML (Core or text()), and rows fetched for selects
+            read through record_rows (ie columnar_fetch, the season loaders and Tables)
+
+    Import:
+        from database.query_metrics import query_metrics
+
+    Example:
+        usage:
+            query_metrics.instrument_engine(engine)
+            query_metrics.snapshot()
+            query_metrics.prometheus_text()
+
+    Attributes:
+        slow_query_seconds (float): statements slower than this are logged with parameters
+        slow_queries (deque[SlowQuery]): most recent slow queries
+        stats (dict[tuple[str, str], QueryStats]): (engine, fingerprint) mapped to its stats
+    """
+
+    def __init__(self, slow_query_seconds: float = 0.5, slow_query_log_size: int = 100):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_queries: deque[SlowQuery] = deque(maxlen=slow_query_log_size)
+        self.stats: dict[tuple[str, str], QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def instrument_engine(self, sync_engine: Engine) -> None:
+        """Time every statement an engine runs
+
+        Args:
+            sync_engine (Engine): the engine, or an async engine's sync_engine
+        """
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn: Connection, *_) -> None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn: Connection, cursor, statement: str, parameters, context, executemany: bool
+    ) -> None:
+        seconds = time.perf_counter() - conn.info["query_start_times"].pop()
+
+        # rows affected by any DML, text() statements included. Statements returning rows
+        #   are left to record_rows, as most drivers report -1 for them until fetched
+        rows = 0
+        if (
+            not context.isddl
+            and cursor.rowcount != -1
+            and (
+                cursor.description is None
+                or context.isinsert
+                or context.isupdate
+                or context.isdelete
+            )
+        ):
+            rows = cursor.rowcount
+
+        self.record(conn, statement, parameters, seconds, rows, executemany)
+
+    def _handle_error(self, exception_context) -> None:
+        conn: Connection = exception_context.connection
+        start_times: list[float] = conn.info.get("query_start_times") if conn else None
+        if not start_times or exception_context.statement is None:
+            return
+
+        seconds = time.perf_counter() - start_times.pop()
+        self.record(
+            conn,
+            exception_context.statement,
+            exception_context.parameters,
+            seconds,
+            error=True,
+        )
+
+    def record(
+        self,
+        conn: Connection,
+        statement: str,
+        parameters,
+        seconds: float,
+        rows: int = 0,
+        executemany: bool = False,
+        error: bool = False,
+    ) -> None:
+        """Add one run of a statement to its stats, and log it if it was slow
+
+        Args:
+            conn (Connection): connection the statement ran on
+            statement (str): SQL statement
+            parameters: statement parameters
+            seconds (float): time the driver took
+            rows (int, optional): rows affected. Defaults to 0.
+            executemany (bool, optional): parameters is a list of parameter sets.
+                Defaults to False.
+            error (bool, optional): the statement failed. Defaults to False.
+        """
+        name = connection_engine_name(conn)
+        statement_fingerprint = fingerprint(statement)
+        # the first bucket whose upper bound is at least seconds, or the +Inf bucket
+        bucket_index = bisect_left(LATENCY_BUCKETS, seconds)
+
+        with self._lock:
+            stats = self.stats.get((name, statement_fingerprint))
+            if stats is None:
+                stats = self.stats[(name, statement_fingerprint)] = QueryStats(
+                    statement_fingerprint, [0] * (len(LATENCY_BUCKETS) + 1)
+                )
+
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.bucket_counts[bucket_index] += 1
+            stats.rows += rows
+            stats.errors += error
+
+        if seconds >= self.slow_query_seconds:
+            self._log_slow_query(name, statement, parameters, seconds, executemany)
+
+    def _log_slow_query(
+        self, name: str, statement: str, parameters, seconds: float, executemany: bool
+    ) -> None:
+        """Keep and log a slow statement with its parameters"""
+        if executemany and parameters:
+            logged_parameters = f"{len(parameters)} parameter sets, first: {parameters[0]!r}"
+        else:
+            logged_parameters = repr(parameters)
+
+        slow_query = SlowQuery(
+            name,
+            statement,
+            logged_parameters[:MAX_LOGGED_PARAMETERS_LENGTH],
+            seconds,
+            datetime.now(),
+        )
+        self.slow_queries.append(slow_query)
+
+        logger.warning(
+            "Slow query (%.3f s) on %s: %s parameters: %s",
+            seconds, name, statement, slow_query.parameters,
+        )
+
+    def record_rows(self, result: CursorResult | AsyncResult, rows: int) -> None:
+        """Add the rows fetched from a select's result to its statement's stats
+
+        Args:
+            result (CursorResult | AsyncResult): result the rows were fetched from
+            rows (int): rows fetched
+        """
+        # a streamed AsyncResult wraps the CursorResult holding the execution context
+        result = getattr(result, "_real_result", result)
+        context = getattr(result, "context", None)
+        if context is None or context.root_connection is None:
+            return
+
+        key = (connection_engine_name(context.root_connection), fingerprint(context.statement))
+        with self._lock:
+            if key in self.stats:
+                self.stats[key].rows += rows
+
+    def total_seconds(self) -> float:
+        """Time spent running statements on every engine so far
+
+        Returns:
+            float: seconds
+        """
+        with self._lock:
+            return sum(stats.total_seconds for stats in self.stats.values())
+
+    def reset(self) -> None:
+        """Clear every statement's stats and the slow query log"""
+        with self._lock:
+            self.stats.clear()
+            self.slow_queries.clear()
+
+    def snapshot(self) -> dict[str, object]:
+        """Snapshot of every statement's stats and the slow query log
+
+        Returns:
+            dict[str, object]: "queries" (engine mapped to fingerprint mapped to stats) and
+                "slow_queries" (most recent last)
+        """
+        queries: dict[str, dict[str, dict]] = {}
+
+        with self._lock:
+            for (name, statement_fingerprint), stats in self.stats.items():
+                cumulative_count = 0
+                buckets: dict[str, int] = {}
+                for bound, bucket_count in zip(
+                    (*LATENCY_BUCKETS, float("inf")), stats.bucket_counts
+                ):
+                    cumulative_count += bucket_count
+                    buckets[str(bound)] = cumulative_count
+
+                queries.setdefault(name, {})[statement_fingerprint] = {
+                    "count": stats.count,
+                    "total_seconds": round(stats.total_seconds, 6),
+                    "average_seconds": round(stats.total_seconds / stats.count, 6),
+                    "max_seconds": round(stats.max_seconds, 6),
+                    "rows": stats.rows,
+                    "errors": stats.errors,
+                    "buckets": buckets,
+                }
+
+            slow_queries = [asdict(slow_query) for slow_query in self.slow_queries]
+
+        return {"queries": queries, "slow_queries": slow_queries}
+
+    def prometheus_text(self, pool_metrics: dict[str, dict] = None) -> str:
+        """Every statement's stats (and optionally pool metrics) in the Prometheus text
+            exposition format
+            - Statements are labelled by a short hash of their fingerprint, with the
+                fingerprint itself in nfl_stats_query_info
+
+        Args:
+            pool_metrics (dict[str, dict], optional): EngineRegistry.metrics(). Defaults to
+                None.
+
+        Returns:
+            str: metrics text
+        """
+        lines: list[str] = [
+            "# HELP nfl_stats_query_info Statement fingerprint for each query label",
+            "# TYPE nfl_stats_query_info gauge",
+        ]
+        histogram_lines: list[str] = [
+            "# HELP nfl_stats_query_duration_seconds Time the driver took to run a statement",
+            "# TYPE nfl_stats_query_duration_seconds histogram",
+        ]
+        rows_lines = [
+            "# HELP nfl_stats_query_rows_total Rows fetched or affected",
+            "# TYPE nfl_stats_query_rows_total counter",
+        ]
+        errors_lines = [
+            "# HELP nfl_stats_query_errors_total Statements that failed",
+            "# TYPE nfl_stats_query_errors_total counter",
+        ]
+
+        with self._lock:
+            for (name, statement_fingerprint), stats in sorted(self.stats.items()):
+                query_id = hashlib.sha1(statement_fingerprint.encode()).hexdigest()[:12]
+                labels = f'engine="{_escape(name)}",query="{query_id}"'
+
+                lines.append(
+                    f'nfl_stats_query_info{{{labels},'
+                    f'statement="{_escape(statement_fingerprint[:500])}"}} 1'
+                )
+
+                cumulative_count = 0
+                for bound, bucket_count in zip(
+                    (*LATENCY_BUCKETS, float("inf")), stats.bucket_counts
+                ):
+                    cumulative_count += bucket_count
+                    bound_label = "+Inf" if bound == float("inf") else repr(bound)
+                    histogram_lines.append(
+                        f'nfl_stats_query_duration_seconds_bucket{{{labels},'
+                        f'le="{bound_label}"}} {cumulative_count}'
+                    )
+                histogram_lines.append(
+                    f"nfl_stats_query_duration_seconds_sum{{{labels}}} {stats.total_seconds}"
+                )
+                histogram_lines.append(
+                    f"nfl_stats_query_duration_seconds_count{{{labels}}} {stats.count}"
+                )
+                rows_lines.append(f"nfl_stats_query_rows_total{{{labels}}} {stats.rows}")
+                errors_lines.append(f"nfl_stats_query_errors_total{{{labels}}} {stats.errors}")
+
+        lines += histogram_lines + rows_lines + errors_lines
+
+        for metric, metric_type, pool_key, help_text in (
+            ("nfl_stats_pool_checked_out", "gauge", "checked_out", "Connections in use"),
+            ("nfl_stats_pool_checkouts_total", "counter", "checkouts", "Connection checkouts"),
+            (
+                "nfl_stats_pool_wait_seconds_total",
+                "counter",
+                "total_wait_seconds",
+                "Time spent waiting for a pooled connection",
+            ),
+            (
+                "nfl_stats_pool_wait_seconds_max",
+                "gauge",
+                "max_wait_seconds",
+                "Longest wait for a pooled connection",
+            ),
+        ):
+            if not pool_metrics:
+                break
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines += [
+                f'{metric}{{engine="{_escape(name)}"}} {metrics[pool_key]}'
+                for name, metrics in sorted(pool_metrics.items())
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label_value: str) -> str:
+    """Escape a Prometheus label value"""
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+query_metrics = QueryMetrics()
@@ -0,0 +1,233 @@
+"""SQL queries from the queries folder, loaded and checked once at startup"""
+
+from dataclasses import dataclass, field
+import hashlib
+import os
+import re
+import threading
+import warnings
+from sqlalchemy import MetaData, TextClause, text
+from database.db_tables import meta
+from helper.file_reader import read_file
+
+# api/queries, wherever the process was started from
+QUERIES_DIRECTORY: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "queries")
+
+# table names after FROM/JOIN, with optional [database].[schema]. prefixes
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+((?:\[?\w+\]?\.){0,2}\[?\w+\]?)", re.IGNORECASE)
+
+
+class QueryRegistryError(Exception):
+    """A query is missing, invalid or was given the wrong parameters"""
+
+
+@dataclass(slots=True)
+class RegisteredQuery:
+    """A query file, ready to execute"""
+    name: str
+    path: str
+    sql: str
+    statement: TextClause
+    parameters: frozenset[str]
+    tables: frozenset[str]
+    sql_hash: str
+    modified_time: float
+    problems: list[str] = field(default_factory=list)
+
+
+def find_query_tables(sql: str) -> frozenset[str]:
+    """Names of the tables a query reads from, without [database].[schema]. prefixes
+
+    Args:
+        sql (str): query text
+
+    Returns:
+        frozenset[str]: table names
+    """
+    return frozenset(
+        table_reference.split(".")[-1].strip("[]")
+        for table_reference in _TABLE_REFERENCE.findall(sql)
+    )
+
+
+def find_query_problems(sql: str, db_meta_object: MetaData) -> list[str]:
+    """Check the tables a query reads from exist in the NFL_Stats metadata
+
+    Args:
+        sql (str): query text
+        db_meta_object (MetaData): MetaData object containing table information
+
+    Returns:
+        list[str]: every problem found, empty if the query looks valid
+    """
+    problems: list[str] = []
+
+    for table_reference in _TABLE_REFERENCE.findall(sql):
+        name_parts = [part.strip("[]") for part in table_reference.split(".")]
+
+        # database-qualified names (ie [NflProjections].[dbo].[Games]) bypass the connection
+        if len(name_parts) == 3:
+            problems.append(f"{table_reference} names a database, use the connection's database")
+
+        if name_parts[-1] not in db_meta_object.tables:
+            problems.append(f"table {name_parts[-1]} does not exist")
+
+    return problems
+
+
+class QueryRegistry:
+    """
+    This module loads every .sql file under the queries folder once, wrapped in text()
+        with its bind parameters and tables checked, so looking up a query is a dict hit
+        - Query names are file paths relative to the folder, without .sql (ie 'games')
+        - auto_reload re-reads files whose modified time changed, for development
+
+    Import:
+        from database.query_registry import query_registry
+
+    Example:
+        usage:
+            query_registry.get('games').statement
+            db.execute(*query_registry.bind('games', {'season_year': 2023}))
+
+    Attributes:
+        directory (str): folder the queries are loaded from
+        db_meta_object (MetaData): tables the queries are checked against
+        auto_reload (bool): check for changed files on every lookup
+        strict (bool): raise instead of warning when a query has problems
+        queries (dict[str, RegisteredQuery]): query name mapped to the query
+    """
+
+    def __init__(
+        self,
+        directory: str = QUERIES_DIRECTORY,
+        db_meta_object: MetaData = meta,
+        auto_reload: bool = False,
+        strict: bool = False,
+    ):
+        self.directory = directory
+        self.db_meta_object = db_meta_object
+        self.auto_reload = auto_reload
+        self.strict = strict
+
+        self.queries: dict[str, RegisteredQuery] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, RegisteredQuery]:
+        """Load (or reload) every query file
+
+        Raises:
+            QueryRegistryError: a query has problems and strict is set
+
+        Returns:
+            dict[str, RegisteredQuery]: query name mapped to the query
+        """
+        queries: dict[str, RegisteredQuery] = {}
+
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in sorted(file_names):
+                if file_name.endswith(".sql"):
+                    query = self._load_file(os.path.join(root, file_name))
+                    queries[query.name] = query
+
+        with self._lock:
+            self.queries = queries
+
+        return queries
+
+    def _load_file(self, path: str) -> RegisteredQuery:
+        """Read, wrap and check one query file"""
+        relative_path = os.path.relpath(path, self.directory)
+        name = relative_path[: -len(".sql")].replace(os.sep, "/")
+
+        sql = read_file(path)
+        statement = text(sql)
+        query = RegisteredQuery(
+            name=name,
+            path=path,
+            sql=sql,
+            statement=statement,
+            parameters=frozenset(statement._bindparams),  # pylint: disable=protected-access
+            tables=find_query_tables(sql),
+            sql_hash=hashlib.sha256(sql.encode()).hexdigest(),
+            modified_time=os.path.getmtime(path),
+            problems=find_query_problems(sql, self.db_meta_object),
+        )
+
+        if query.problems:
+            message = f"Query {name} ({relative_path}): " + "; ".join(query.problems)
+            if self.strict:
+                raise QueryRegistryError(message)
+            warnings.warn(message, stacklevel=2)
+
+        return query
+
+    def _reload_changed(self) -> None:
+        """Reload the files that were added, changed or removed since they were loaded"""
+        current_paths = {
+            os.path.join(root, file_name)
+            for root, _, file_names in os.walk(self.directory)
+            for file_name in file_names
+            if file_name.endswith(".sql")
+        }
+        loaded = {query.path: query for query in self.queries.values()}
+
+        if current_paths != set(loaded) or any(
+            os.path.getmtime(path) != loaded[path].modified_time for path in current_paths
+        ):
+            self.load()
+
+    def get(self, name: str) -> RegisteredQuery:
+        """Get a query by name
+
+        Args:
+            name (str): query name, with or without .sql (ie 'games' or 'games.sql')
+
+        Raises:
+            QueryRegistryError: there is no query with that name, or it has problems
+
+        Returns:
+            RegisteredQuery: the query
+        """
+        if name.endswith(".sql"):
+            name = name[: -len(".sql")]
+
+        if self.auto_reload:
+            self._reload_changed()
+
+        query = self.queries.get(name)
+        if query is None:
+            raise QueryRegistryError(f"No query named {name} in {self.directory}")
+        if query.problems:
+            raise QueryRegistryError(f"Query {name} is invalid: " + "; ".join(query.problems))
+
+        return query
+
+    def bind(self, name: str, parameters: dict = None) -> tuple[TextClause, dict]:
+        """Get a query and check it was given exactly its bind parameters
+
+        Args:
+            name (str): query name
+            parameters (dict, optional): bind parameter values. Defaults to None.
+
+        Raises:
+            QueryRegistryError: parameters are missing or not used by the query
+
+        Returns:
+            tuple[TextClause, dict]: statement and parameters, ready for db.execute
+        """
+        query = self.get(name)
+        parameters = parameters or {}
+
+        missing = query.parameters - set(parameters)
+        unused = set(parameters) - query.parameters
+        if missing or unused:
+            raise QueryRegistryError(
+                f"Query {name} parameters: missing {sorted(missing)}, unused {sorted(unused)}"
+            )
+
+        return query.statement, parameters
+
+
+query_registry = QueryRegistry()
+query_registry.load()
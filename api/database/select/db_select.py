@@ -1,18 +1,176 @@
 """Handles """
 
+import asyncio
 import pandas as pd
-from sqlalchemy import Connection, CursorResult, Select, select
+from sqlalchemy import (
+    Connection,
+    CursorResult,
+    Select,
+    bindparam,
+    func,
+    select,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
 from data.data import Game, Season, Team
-from database.db_tables import season, division, team, game, game_result
+from data.team_game_stats import TEAM_GAME_STAT_COLUMNS, TeamGameStats
+from database.columnar_fetch import result_to_columns, result_to_dataframe
+from database.data_versions import read_season_version
+from database.query_metrics import query_metrics
+from database.db_tables import (
+    season,
+    division,
+    team,
+    game,
+    game_result,
+    team_game_stat,
+    standings,
+    STANDINGS_FIELD_COLUMNS,
+)
 from database.database_helper import (
     DatabaseEnvVariables,
-    async_create_sql_server_engine,
+    get_async_sql_server_engine,
+)
+
+
+# The statements are built once, with bind parameters for the season year and week, so
+#   each call only binds values and SQLAlchemy's compiled cache is always hit
+
+# the Id, then the Season dataclass fields in order
+SEASON_INFO_SELECT: Select = (
+    select(
+        season.c.Id,
+        season.c.Name,
+        season.c.Year,
+        season.c.RegularSeasonWeekCount,
+        season.c.PlayoffTeams,
+    )
+    .where(season.c.Year == bindparam('season_year'))
+    .limit(1)
+)
+
+# the Team dataclass fields, in order
+TEAMS_FOR_SEASON_SELECT: Select = (
+    select(
+        team.columns.Location,
+        team.columns.Name,
+        team.columns.FullName,
+        division.columns.Name.label('Division'),
+        division.columns.Conference,
+    )
+    .join(division, onclause=division.columns.Id == team.columns.DivisionId)
+    .join(season)
+    .where(season.c.Year == bindparam('season_year'))
+)
+
+_away_team = team.alias('away_team')
+_home_team = team.alias('home_team')
+
+# games with results, with the Game dataclass fields in order, joined to the season
+GAMES_SELECT: Select = (
+    select(
+        game.columns.Id,
+        game.columns.Week,
+        game.columns.WeekName,
+        game.columns.StartTime,
+        _away_team.columns.FullName.label("AwayTeam"),
+        _home_team.columns.FullName.label("HomeTeam"),
+        game_result.columns.AwayScore,
+        game_result.columns.HomeScore,
+        game_result.columns.Overtime,
+    )
+    .join(_away_team, onclause=_away_team.columns.Id == game.columns.AwayTeamId)
+    .join(_home_team, onclause=_home_team.columns.Id == game.columns.HomeTeamId)
+    .join(game_result)
+    .join(season)
+)
+
+GAMES_FOR_SEASON_SELECT: Select = GAMES_SELECT.where(season.c.Year == bindparam('season_year'))
+
+GAMES_FOR_SEASONS_SELECT: Select = (
+    GAMES_SELECT
+    .add_columns(season.columns.Year.label("SeasonYear"))
+    .where(season.columns.Year.in_(bindparam('season_years', expanding=True)))
+)
+
+_opponent_stat = team_game_stat.alias('opponent_stat')
+_stat_team = team.alias('stat_team')
+_opponent_team = team.alias('opponent_team')
+
+# one row per team per game, with the TEAM_GAME_STAT_COLUMNS columns
+TEAM_GAME_STATS_SELECT: Select = (
+    select(
+        season.columns.Year,
+        game.columns.Week,
+        _stat_team.columns.FullName,
+        _opponent_team.columns.FullName,
+        team_game_stat.columns.Yards,
+        team_game_stat.columns.Turnovers,
+        team_game_stat.columns.Touchdowns,
+        _opponent_stat.columns.Yards,
+        _opponent_stat.columns.Turnovers,
+        _opponent_stat.columns.Touchdowns,
+    )
+    .select_from(team_game_stat)
+    .join(game, onclause=game.columns.Id == team_game_stat.columns.GameId)
+    .join(season, onclause=season.columns.Id == game.columns.SeasonId)
+    .join(
+        _opponent_stat,
+        onclause=(_opponent_stat.columns.GameId == team_game_stat.columns.GameId)
+        & (_opponent_stat.columns.TeamId != team_game_stat.columns.TeamId),
+    )
+    .join(_stat_team, onclause=_stat_team.columns.Id == team_game_stat.columns.TeamId)
+    .join(_opponent_team, onclause=_opponent_team.columns.Id == _opponent_stat.columns.TeamId)
+    .where(season.columns.Year.in_(bindparam('season_years', expanding=True)))
+)
+
+STANDINGS_FOR_WEEK_SELECT: Select = (
+    select(
+        team.columns.Location,
+        team.columns.Name,
+        team.columns.FullName,
+        division.columns.Name.label('Division'),
+        division.columns.Conference,
+        # the standings fields, in Team dataclass order
+        *[standings.columns[column_name] for column_name in STANDINGS_FIELD_COLUMNS.values()],
+    )
+    .join(team, onclause=team.columns.Id == standings.columns.TeamId)
+    .join(division, onclause=division.columns.Id == team.columns.DivisionId)
+    .join(season, onclause=season.columns.Id == standings.columns.SeasonId)
+    .where(
+        (season.columns.Year == bindparam('season_year'))
+        & (standings.columns.Week == bindparam('week'))
+    )
+    .order_by(division.columns.Conference, standings.columns.PlayoffRank)
+)
+
+_team_games = union_all(
+    *[
+        select(team_id_column.label('TeamId'))
+        .join(season, onclause=season.columns.Id == game.columns.SeasonId)
+        .where(
+            (season.columns.Year == bindparam('season_year'))
+            & (game.columns.Week <= bindparam('regular_season_week_count'))
+        )
+        for team_id_column in (game.columns.AwayTeamId, game.columns.HomeTeamId)
+    ]
+).subquery()
+
+SCHEDULED_GAME_COUNTS_SELECT: Select = (
+    select(team.columns.FullName, func.count())
+    .join(_team_games, onclause=_team_games.columns.TeamId == team.columns.Id)
+    .group_by(team.columns.FullName)
 )
 
 
 async def get_entire_season(season_year: int) -> tuple[Season, list[Team], list[Game]]:
     """
-    Adds an entire NFL season to the database.
+    Gets an entire NFL season from the database.
+        - The season info, teams and games are queried at the same time, each on its own
+            pooled connection, so loading a season takes one round trip instead of three
+        - The three reads are not one snapshot: a season write committing between them
+            can give teams and games from either side of it. The write bumps the season's
+            data version, so SeasonCache reloads the season on its next get
 
     Args:
         season_year (int): The season year for which the games are required.
@@ -21,19 +179,82 @@ async def get_entire_season(season_year: int) -> tuple[Season, list[Team], list[
         tuple[Season, list[Team], list[Game]]: A tuple containing season information,
             teams, and games.
     """
-    engine = await async_create_sql_server_engine(
-        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats"), False
+    engine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
     )
 
-    async with engine.begin() as db:
-        season_info: Season = await get_season_info(db, season_year)
-        teams: list[Team] = await get_teams_for_season(db, season_year)
-        games: list[Game] = await get_games_for_season(db, season_year)
+    season_row, team_columns, game_columns = await asyncio.gather(
+        fetch_one_row(engine, SEASON_INFO_SELECT, {'season_year': season_year}),
+        fetch_columns(engine, TEAMS_FOR_SEASON_SELECT, {'season_year': season_year}),
+        fetch_columns(engine, GAMES_FOR_SEASON_SELECT, {'season_year': season_year}),
+    )
 
-    await engine.dispose()
+    # build the dataclasses straight from the column arrays
+    season_info = Season(*season_row[1:])
+    teams: list[Team] = list(map(Team, *team_columns))
+    games: list[Game] = list(map(Game, *game_columns))
 
     return season_info, teams, games
 
+
+async def get_season_data_version(season_year: int) -> int:
+    """
+    Gets the data version of a season, bumped by every write to the season from any process.
+
+    Args:
+        season_year (int): The season year.
+
+    Returns:
+        int: The season's data version, 0 if the season doesn't exist.
+    """
+    engine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    async with engine.connect() as db:
+        return await read_season_version(db, season_year)
+
+
+async def fetch_one_row(engine: AsyncEngine, statement: Select, parameters: dict) -> tuple:
+    """
+    Runs a query that returns exactly one row on its own pooled connection.
+
+    Args:
+        engine (AsyncEngine): The engine to take a connection from.
+        statement (Select): The query.
+        parameters (dict): The query's bind parameter values.
+
+    Returns:
+        tuple: The row.
+    """
+    async with engine.connect() as db:
+        result: CursorResult = await db.execute(statement, parameters)
+        row = tuple(result.one())
+        query_metrics.record_rows(result, 1)
+
+    return row
+
+
+async def fetch_columns(engine: AsyncEngine, statement: Select, parameters: dict) -> list[list]:
+    """
+    Runs a query on its own pooled connection and returns the results as columns.
+
+    Args:
+        engine (AsyncEngine): The engine to take a connection from.
+        statement (Select): The query.
+        parameters (dict): The query's bind parameter values.
+
+    Returns:
+        list[list]: The values of each selected column, as Python values (int, not
+            np.int64), so they can go straight into dataclasses.
+    """
+    async with engine.connect() as db:
+        result: CursorResult = await db.execute(statement, parameters)
+        column_arrays = result_to_columns(result)
+
+    return [column_array.tolist() for column_array in column_arrays.values()]
+
+
 async def get_season_info(db: Connection, season_year: int) -> Season:
     """
     This function retrieves the season information for a given season from the database.
@@ -45,9 +266,7 @@ async def get_season_info(db: Connection, season_year: int) -> Season:
     Returns:
         Season: The season information for the given season.
     """
-    season_select: Select = season.select().where(season.c.Year == season_year).limit(1)
-
-    result: CursorResult = await db.execute(season_select)
+    result: CursorResult = await db.execute(SEASON_INFO_SELECT, {'season_year': season_year})
 
     return Season(*result.one()[1:])
 
@@ -63,21 +282,10 @@ async def get_teams_for_season(db: Connection, season_year: int) -> list[Team]:
     Returns:
         pd.DataFrame: A pandas dataframe containing the team information.
     """
-    teams_select: Select = (
-        select(
-            team.columns.Location,
-            team.columns.Name,
-            team.columns.FullName,
-            division.columns.Name.label('Division'),
-            division.columns.Conference,
-        )
-        .join(division, onclause=division.columns.Id == team.columns.DivisionId)
-        .join(season)
-        .where(season.c.Year == season_year)
+    result: CursorResult = await db.execute(
+        TEAMS_FOR_SEASON_SELECT, {'season_year': season_year}
     )
 
-    result: CursorResult = await db.execute(teams_select)
-
     # Fetch all rows from the cursor
     rows = result.fetchall()
 
@@ -96,32 +304,135 @@ async def get_games_for_season(db: Connection, season_year: int) -> list[Game]:
     Returns:
         pd.DataFrame: A pandas dataframe containing the game details.
     """
-    away_team = team.alias('away_team')
-    home_team = team.alias('home_team')
-
-    games_select: Select = (
-        select(
-            game.columns.Id,
-            game.columns.Week,
-            game.columns.WeekName,
-            game.columns.StartTime,
-            away_team.columns.FullName.label("AwayTeam"),
-            home_team.columns.FullName.label("HomeTeam"),
-            game_result.columns.AwayScore,
-            game_result.columns.HomeScore,
-            game_result.columns.Overtime,
-        )
-        .join(away_team, onclause=away_team.columns.Id == game.columns.AwayTeamId)
-        .join(home_team, onclause=home_team.columns.Id == game.columns.HomeTeamId)
-        .join(game_result)
-        .join(season)
-        .where(season.c.Year == season_year)
+    result: CursorResult = await db.execute(
+        GAMES_FOR_SEASON_SELECT, {'season_year': season_year}
     )
 
-    result: CursorResult = await db.execute(games_select)
-
     # Fetch all rows from the cursor
     rows = result.fetchall()
 
     # Create a list of dataclasses
     return [Game(*row) for row in rows]
+
+
+async def get_games_for_seasons(db: Connection, season_years: list[int]) -> pd.DataFrame:
+    """
+    This function retrieves every game in the given seasons as columns, for history
+        queries over many seasons.
+
+    Args:
+        db (Connection): The database connection.
+        season_years (list[int]): The season years.
+
+    Returns:
+        pd.DataFrame: One row per game, with the GAMES_SELECT columns and SeasonYear.
+    """
+    result: CursorResult = await db.execute(
+        GAMES_FOR_SEASONS_SELECT, {'season_years': season_years}
+    )
+
+    return result_to_dataframe(result)
+
+
+async def get_team_game_stats(season_years: list[int]) -> TeamGameStats:
+    """
+    Loads the yards, turnovers and touchdowns for every team-game in the given seasons.
+
+    Args:
+        season_years (list[int]): The season years to load.
+
+    Returns:
+        TeamGameStats: Columnar team-game stats with per-season totals.
+    """
+    engine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    async with engine.begin() as db:
+        stats_df: pd.DataFrame = await get_team_game_stats_for_seasons(db, season_years)
+
+    return TeamGameStats(stats_df)
+
+
+async def get_team_game_stats_for_seasons(
+    db: Connection, season_years: list[int]
+) -> pd.DataFrame:
+    """
+    This function retrieves each team's stats and its opponent's stats for every game
+        in the given seasons.
+
+    Args:
+        db (Connection): The database connection.
+        season_years (list[int]): The season years.
+
+    Returns:
+        pd.DataFrame: One row per team per game, with the TEAM_GAME_STAT_COLUMNS columns.
+    """
+    result: CursorResult = await db.execute(
+        TEAM_GAME_STATS_SELECT, {'season_years': season_years}
+    )
+
+    return result_to_dataframe(result, column_names=TEAM_GAME_STAT_COLUMNS)
+
+
+async def get_standings(season_year: int, week: int) -> list[Team]:
+    """
+    Gets the standings after a week of a season from the Standings table.
+
+    Args:
+        season_year (int): The season year.
+        week (int): The regular season week.
+
+    Returns:
+        list[Team]: The teams with their standings, in playoff order for each conference.
+    """
+    engine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    async with engine.connect() as db:
+        return await get_standings_for_week(db, season_year, week)
+
+
+async def get_standings_for_week(db: Connection, season_year: int, week: int) -> list[Team]:
+    """
+    This function retrieves the standings after a week of a season.
+
+    Args:
+        db (Connection): The database connection.
+        season_year (int): The season year.
+        week (int): The regular season week.
+
+    Returns:
+        list[Team]: The teams with their standings, in playoff order for each conference.
+    """
+    result: CursorResult = await db.execute(
+        STANDINGS_FOR_WEEK_SELECT, {'season_year': season_year, 'week': week}
+    )
+
+    return [Team(*row) for row in result.fetchall()]
+
+
+async def get_scheduled_game_counts(
+    db: Connection, season_year: int, regular_season_week_count: int
+) -> dict[str, int]:
+    """
+    This function counts the regular season games on each team's schedule, played or not.
+
+    Args:
+        db (Connection): The database connection.
+        season_year (int): The season year.
+        regular_season_week_count (int): The number of weeks in the regular season.
+
+    Returns:
+        dict[str, int]: Team full name mapped to its number of regular season games.
+    """
+    result: CursorResult = await db.execute(
+        SCHEDULED_GAME_COUNTS_SELECT,
+        {
+            'season_year': season_year,
+            'regular_season_week_count': regular_season_week_count,
+        },
+    )
+
+    return {row[0]: row[1] for row in result}
@@ -0,0 +1,260 @@
+"""Read-through cache of loaded seasons"""
+
+import asyncio
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass, fields
+import sys
+import time
+from typing import Awaitable, Callable
+from data.data import Game, Season, Team
+from database.data_versions import SeasonDataVersions, season_data_versions
+from database.select.db_select import get_entire_season, get_season_data_version
+
+SeasonData = tuple[Season, list[Team], list[Game]]
+
+
+@dataclass(slots=True)
+class CachedSeason:
+    """A loaded season and the data version it was loaded at"""
+    version: int
+    season_data: SeasonData
+    size_bytes: int
+
+
+@dataclass(slots=True)
+class CheckedVersion:
+    """A season's database data version, and when and at what in-process version it was read"""
+    database_version: int
+    local_version: int
+    read_at: float
+
+
+def estimate_season_size(season_data: SeasonData) -> int:
+    """Estimate the memory used by a loaded season
+
+    Args:
+        season_data (SeasonData): season info, teams and games
+
+    Returns:
+        int: approximate size in bytes
+    """
+    season_info, teams, games = season_data
+
+    def object_size(obj) -> int:
+        return sys.getsizeof(obj) + sum(
+            sys.getsizeof(getattr(obj, obj_field.name)) for obj_field in fields(obj)
+        )
+
+    return (
+        object_size(season_info)
+        + sys.getsizeof(teams)
+        + sum(object_size(team) for team in teams)
+        + sys.getsizeof(games)
+        + sum(object_size(game) for game in games)
+    )
+
+
+def copy_season(season_data: SeasonData) -> SeasonData:
+    """Copy a season's objects, since standings calculations update the teams in place
+
+    Args:
+        season_data (SeasonData): season info, teams and games
+
+    Returns:
+        SeasonData: copies of the season info, teams and games
+    """
+    season_info, teams, games = season_data
+
+    return copy(season_info), [copy(team) for team in teams], [copy(game) for game in games]
+
+
+class SeasonCache:
+    """
+    This module keeps recently loaded seasons in memory, so only the first request for a
+        season after it changes queries the database
+        - Entries are keyed by season year and checked against the season's data version
+            in the database, which every write bumps (see season_write_transaction), so
+            writes from other processes are seen within revalidate_seconds
+        - Writes from this process bump the in-process version too, which makes the next
+            get read the database version straight away
+        - The least recently used seasons are evicted once max_bytes is exceeded
+        - Concurrent requests for a season that isn't cached share one load
+
+    Import:
+        from database.select.season_cache import season_cache
+
+    Example:
+        usage:
+            season_info, teams, games = await season_cache.get(2023)
+            season_cache.metrics()
+
+    Attributes:
+        loader (Callable[[int], Awaitable[SeasonData]]): loads a season from the database
+        version_loader (Callable[[int], Awaitable[int]]): reads a season's data version
+            from the database
+        max_bytes (int): memory budget for cached seasons
+        data_versions (SeasonDataVersions): in-process season data version counters
+        revalidate_seconds (float): how long a database version read is trusted
+        entries (OrderedDict[int, CachedSeason]): cached seasons, least recently used first
+        total_bytes (int): memory used by the cached seasons
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[int], Awaitable[SeasonData]] = get_entire_season,
+        max_bytes: int = 64 * 1024 * 1024,
+        data_versions: SeasonDataVersions = season_data_versions,
+        version_loader: Callable[[int], Awaitable[int]] = get_season_data_version,
+        revalidate_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.data_versions = data_versions
+        self.version_loader = version_loader
+        self.revalidate_seconds = revalidate_seconds
+        self.clock = clock
+
+        self.entries: OrderedDict[int, CachedSeason] = OrderedDict()
+        self.total_bytes: int = 0
+        self._loading: dict[tuple[int, int], asyncio.Task] = {}
+        self._checked_versions: dict[int, CheckedVersion] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.shared_loads: int = 0
+        self.evictions: int = 0
+
+    async def get(self, season_year: int) -> SeasonData:
+        """Get a season, loading it from the database if it isn't cached or has changed
+
+        Args:
+            season_year (int): season year
+
+        Returns:
+            SeasonData: copies of the season info, teams and games
+        """
+        version = await self.current_version(season_year)
+
+        cached_season = self.entries.get(season_year)
+        if cached_season is not None and cached_season.version == version:
+            self.entries.move_to_end(season_year)
+            self.hits += 1
+            return copy_season(cached_season.season_data)
+
+        self.misses += 1
+
+        load_key = (season_year, version)
+        load_task = self._loading.get(load_key)
+        if load_task is None:
+            load_task = asyncio.ensure_future(self._load(season_year, version))
+            self._loading[load_key] = load_task
+            load_task.add_done_callback(lambda _: self._loading.pop(load_key, None))
+        else:
+            self.shared_loads += 1
+
+        # shield so a cancelled request doesn't cancel the load other requests are sharing
+        return copy_season(await asyncio.shield(load_task))
+
+    async def current_version(self, season_year: int) -> int:
+        """A season's database data version, read again once revalidate_seconds have
+            passed or this process has written to the season
+
+        Args:
+            season_year (int): season year
+
+        Returns:
+            int: the season's data version
+        """
+        local_version = self.data_versions.get(season_year)
+        checked_version = self._checked_versions.get(season_year)
+
+        if (
+            checked_version is not None
+            and checked_version.local_version == local_version
+            and self.clock() - checked_version.read_at < self.revalidate_seconds
+        ):
+            return checked_version.database_version
+
+        database_version = await self.version_loader(season_year)
+        self._checked_versions[season_year] = CheckedVersion(
+            database_version, local_version, self.clock()
+        )
+
+        return database_version
+
+    async def _load(self, season_year: int, version: int) -> SeasonData:
+        """Load a season and cache it at the version it was requested at"""
+        season_data = await self.loader(season_year)
+
+        self._store(
+            season_year, CachedSeason(version, season_data, estimate_season_size(season_data))
+        )
+
+        return season_data
+
+    def _store(self, season_year: int, cached_season: CachedSeason) -> None:
+        """Add a season to the cache, evicting the least recently used seasons over budget"""
+        # a season larger than the whole budget is returned but not kept
+        if cached_season.size_bytes > self.max_bytes:
+            return
+
+        replaced_season = self.entries.pop(season_year, None)
+        if replaced_season is not None:
+            self.total_bytes -= replaced_season.size_bytes
+
+        self.entries[season_year] = cached_season
+        self.total_bytes += cached_season.size_bytes
+
+        while self.total_bytes > self.max_bytes:
+            _, evicted_season = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_season.size_bytes
+            self.evictions += 1
+
+    def invalidate(self, season_year: int = None) -> None:
+        """Drop a season from the cache, or every season
+
+        Args:
+            season_year (int, optional): season year. Defaults to every season.
+        """
+        if season_year is None:
+            self.entries.clear()
+            self.total_bytes = 0
+        elif (cached_season := self.entries.pop(season_year, None)) is not None:
+            self.total_bytes -= cached_season.size_bytes
+
+    def metrics(self) -> dict[str, int | float]:
+        """Snapshot of the cache counters
+
+        Returns:
+            dict[str, int | float]: hits, misses, shared loads, evictions, hit rate,
+                cached seasons and memory used
+        """
+        requests = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_loads': self.shared_loads,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / requests, 4) if requests else 0.0,
+            'seasons': len(self.entries),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+season_cache = SeasonCache()
+
+
+async def get_cached_season(season_year: int) -> SeasonData:
+    """Get an entire NFL season through the shared season cache
+
+    Args:
+        season_year (int): season year
+
+    Returns:
+        SeasonData: season information, teams and games
+    """
+    return await season_cache.get(season_year)
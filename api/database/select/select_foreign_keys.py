@@ -1,6 +1,58 @@
 """Handles getting Foreign keys""" 
-from sqlalchemy import Connection, CursorResult, Select, select
-from database.db_tables import season, division, team, game
+from sqlalchemy import Connection, CursorResult, Select, bindparam, select
+from database.db_tables import season, division, team, game, game_result
+
+# The statements are built once, with bind parameters for the season year or id, so each
+#   call only binds values and SQLAlchemy's compiled cache is always hit
+
+SEASON_ID_SELECT: Select = (
+    select(season.columns.Id).where(season.columns.Year == bindparam('year')).limit(1)
+)
+
+SEASON_YEARS_SELECT: Select = select(season.columns.Year)
+
+DIVISION_IDS_SELECT: Select = select(division.columns.Name, division.columns.Id).where(
+    division.columns.SeasonId == bindparam('season_id')
+)
+
+TEAM_IDS_SELECT: Select = (
+    select(team.columns.FullName, team.columns.Id)
+    .join(division)
+    .where(division.columns.SeasonId == bindparam('season_id'))
+)
+
+# in insert order, so the ids line up with the games list they were inserted from
+GAME_IDS_SELECT: Select = (
+    select(game.columns.Id)
+    .where(game.columns.SeasonId == bindparam('season_id'))
+    .order_by(game.columns.Id)
+)
+
+_away_team = team.alias("away_team")
+_home_team = team.alias("home_team")
+
+GAME_KEYS_SELECT: Select = (
+    select(
+        game.columns.Week,
+        _away_team.columns.FullName,
+        _home_team.columns.FullName,
+        game.columns.Id,
+    )
+    .join(_away_team, onclause=_away_team.columns.Id == game.columns.AwayTeamId)
+    .join(_home_team, onclause=_home_team.columns.Id == game.columns.HomeTeamId)
+    .where(game.columns.SeasonId == bindparam('season_id'))
+)
+
+GAME_RESULTS_SELECT: Select = (
+    select(
+        game_result.columns.GameId,
+        game_result.columns.AwayScore,
+        game_result.columns.HomeScore,
+        game_result.columns.Overtime,
+    )
+    .join(game)
+    .where(game.columns.SeasonId == bindparam('season_id'))
+)
 
 
 async def get_season_id(db: Connection, year: int) -> int:
@@ -15,15 +67,25 @@ async def get_season_id(db: Connection, year: int) -> int:
         int: The id of the season with the given year,
             or None if no season exists with the given year.
     """
-    select_new_season_id: Select = (
-        select(season.columns.Id).where(season.columns.Year == year).limit(1)
-    )
-
-    result: CursorResult = await db.execute(select_new_season_id)
+    result: CursorResult = await db.execute(SEASON_ID_SELECT, {'year': year})
     season_id: int = result.scalar()
     return season_id
 
 
+async def get_season_years(db: Connection) -> set[int]:
+    """Returns the years of every season already in the database.
+
+    Args:
+        db (Connection): The database connection.
+
+    Returns:
+        set[int]: The years of every season in the database.
+    """
+    result: CursorResult = await db.execute(SEASON_YEARS_SELECT)
+    season_years: set[int] = {row[0] for row in result}
+    return season_years
+
+
 async def get_division_ids(db: Connection, new_season_id: int) -> dict[str, int]:
     """Returns a dictionary of division names and their IDs for the given season.
 
@@ -34,11 +96,9 @@ async def get_division_ids(db: Connection, new_season_id: int) -> dict[str, int]
     Returns:
         dict[str, int]: A dictionary of division names and their IDs for the given season.
     """
-    select_division_ids: Select = select(
-        division.columns.Name, division.columns.Id
-    ).where(division.columns.SeasonId == new_season_id)
-
-    result: CursorResult = await db.execute(select_division_ids)
+    result: CursorResult = await db.execute(
+        DIVISION_IDS_SELECT, {'season_id': new_season_id}
+    )
     division_ids: dict[str, int] = {row[0]: row[1] for row in result}
     return division_ids
 
@@ -55,16 +115,7 @@ async def get_team_ids(db: Connection, new_season_id: int) -> dict[str, int]:
         dict[str, int]: A dictionary of team full names and their IDs for the given season and
             divisions.
     """
-    select_team_id: Select = (
-        select(team.columns.FullName, team.columns.Id)
-        .join(division)
-        .where(
-            team.columns.DivisionId == division.columns.Id
-            and division.columns.SeasonId == new_season_id
-        )
-    )
-
-    result: CursorResult = await db.execute(select_team_id)
+    result: CursorResult = await db.execute(TEAM_IDS_SELECT, {'season_id': new_season_id})
     team_ids: dict[str, int] = {row[0]: row[1] for row in result}
     return team_ids
 
@@ -78,13 +129,52 @@ async def get_game_ids(db: Connection, new_season_id: int) -> list[int]:
         new_season_id (int): The ID of the season for which to retrieve the game IDs.
 
     Returns:
-        list[int]: A list of game IDs for the given season.
+        list[int]: A list of game IDs for the given season, in the order they were inserted.
 
     """
-    select_game_ids: Select = select(game.columns.Id).where(
-        game.columns.SeasonId == new_season_id
-    )
-
-    result: CursorResult = await db.execute(select_game_ids)
+    result: CursorResult = await db.execute(GAME_IDS_SELECT, {'season_id': new_season_id})
     game_ids: list[int] = [row[0] for row in result]
-    return game_ids
\ No newline at end of file
+    return game_ids
+
+
+async def get_game_keys(db: Connection, season_id: int) -> dict[tuple[int, str, str], int]:
+    """
+    Returns a dictionary of each game's (week, away team, home team) and its ID for the
+        given season.
+
+    Args:
+        db (Connection): The database connection.
+        season_id (int): The ID of the season for which to retrieve the games.
+
+    Returns:
+        dict[tuple[int, str, str], int]: (week, away team full name, home team full name)
+            mapped to the game ID.
+    """
+    result: CursorResult = await db.execute(GAME_KEYS_SELECT, {'season_id': season_id})
+    game_keys: dict[tuple[int, str, str], int] = {
+        (row[0], row[1], row[2]): row[3] for row in result
+    }
+    return game_keys
+
+
+async def get_game_results(
+    db: Connection, season_id: int
+) -> dict[int, tuple[int, int, bool]]:
+    """
+    Returns the result of every game with a result in the given season.
+
+    Args:
+        db (Connection): The database connection.
+        season_id (int): The ID of the season for which to retrieve the results.
+
+    Returns:
+        dict[int, tuple[int, int, bool]]: Game IDs mapped to their
+            (away score, home score, overtime).
+    """
+    result: CursorResult = await db.execute(
+        GAME_RESULTS_SELECT, {'season_id': season_id}
+    )
+    game_results: dict[int, tuple[int, int, bool]] = {
+        row[0]: (row[1], row[2], bool(row[3])) for row in result
+    }
+    return game_results
@@ -1,6 +1,263 @@
+"""Add live game results to the database from CSV snapshots."""
+import asyncio
+import inspect
+import logging
+import os
+from typing import Awaitable, Callable
+import numpy as np
 import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncEngine
+from database.data_versions import RESULT_TABLES
+from database.database_helper import (
+    DatabaseEnvVariables,
+    get_async_sql_server_engine,
+)
+from database.insert.db_insert import refresh_standings, season_write_transaction
+from database.insert.individual_inserts import upsert_game_results
+from database.select.db_select import get_season_info
+from database.select.select_foreign_keys import (
+    get_season_id,
+    get_game_keys,
+    get_game_results,
+)
+from helper.file_reader import get_file_names_in_folder_with_filetype
+
+logger = logging.getLogger(__name__)
 
 
 def read_games_from_excel(path: str) -> pd.DataFrame:
+    """Reads the games from a CSV export of the season games sheet.
+
+    Args:
+        path (str): The path to the CSV file.
+
+    Returns:
+        pd.DataFrame: The games, without rows that have no game data.
+    """
     games_df: pd.DataFrame = pd.read_csv(path)
-    games_df = games_df[games_df['Week'].notna()]
\ No newline at end of file
+    games_df = games_df[games_df['Week'].notna()]
+    # unnamed '@' column, named the same way as read_season_from_excel
+    games_df = games_df.rename(columns={'Unnamed: 5': 'At'})
+
+    return games_df
+
+
+def normalize_game_results(
+    games_df: pd.DataFrame, regular_season_week_count: int
+) -> pd.DataFrame:
+    """Converts the Winner/Loser columns of the games sheet to away/home results.
+        - Games that have not been played yet (no points) are left out
+
+    Args:
+        games_df (pd.DataFrame): games from read_games_from_excel
+        regular_season_week_count (int): The number of weeks in the regular season.
+
+    Returns:
+        pd.DataFrame: week, away_team, home_team, away_score, home_score and overtime
+            for each played game
+    """
+    playoff_week_numbers = {
+        'WildCard': regular_season_week_count + 1,
+        'Division': regular_season_week_count + 2,
+        'ConfChamp': regular_season_week_count + 3,
+        'SuperBowl': regular_season_week_count + 4,
+    }
+
+    played_df = games_df[games_df['PtsW'].notna() & games_df['PtsL'].notna()]
+
+    # regular season weeks are numbers, playoff weeks are round names
+    weeks = pd.to_numeric(played_df['Week'], errors='coerce')
+    weeks = weeks.fillna(played_df['Week'].map(playoff_week_numbers))
+
+    # '@' means the Loser/Tie team is the home team, and PtsW is the home team's score
+    winner_is_away = (played_df['At'] == '@').to_numpy()
+
+    winners, losers = played_df['Winner/tie'], played_df['Loser/tie']
+    winner_points, loser_points = played_df['PtsW'], played_df['PtsL']
+
+    return pd.DataFrame(
+        {
+            'week': weeks.astype(int).to_numpy(),
+            'away_team': np.where(winner_is_away, winners, losers),
+            'home_team': np.where(winner_is_away, losers, winners),
+            'away_score': np.where(winner_is_away, winner_points, loser_points).astype(int),
+            'home_score': np.where(winner_is_away, loser_points, winner_points).astype(int),
+            'overtime': False,
+        }
+    )
+
+
+class LiveResultsIngester:
+    """
+    This module watches a drop folder for CSV snapshots of a season's games and writes
+        only the results that are new or have changed since the last snapshot
+
+    Example:
+        initialization:
+            ingester = LiveResultsIngester(engine, 2024)
+            ingester.subscribe(lambda game_ids: ...)
+
+        usage:
+            changed_game_ids = await ingester.ingest_snapshot('live_results/week_1.csv')
+            await ingester.watch('live_results', poll_seconds=5)
+
+    Attributes:
+        engine (AsyncEngine): engine results are written through
+        season_year (int): season the snapshots are for
+        known_results (dict[int, tuple[int, int, bool]]): last written result for each game
+        game_ids (dict[tuple[int, str, str], int]): (week, away team, home team) mapped to
+            the game id
+        game_weeks (dict[int, int]): game id mapped to its week
+        unknown_games (set[tuple[int, str, str]]): snapshot games with no matching game
+    """
+
+    def __init__(self, engine: AsyncEngine, season_year: int):
+        self.engine = engine
+        self.season_year = season_year
+
+        self.season_id: int = None
+        self.regular_season_week_count: int = None
+        self.known_results: dict[int, tuple[int, int, bool]] = {}
+        self.game_ids: dict[tuple[int, str, str], int] = {}
+        self.game_weeks: dict[int, int] = {}
+        self.unknown_games: set[tuple[int, str, str]] = set()
+
+        self.subscribers: list[Callable[[list[int]], None | Awaitable[None]]] = []
+        self.last_snapshot_mtime: float = 0.0
+        self.failed_snapshot_mtime: float = 0.0
+
+    def subscribe(self, callback: Callable[[list[int]], None | Awaitable[None]]) -> None:
+        """Call a function with the changed game ids after each snapshot that changes results
+            - A subscriber that raises is logged, and doesn't stop the other subscribers
+
+        Args:
+            callback (Callable[[list[int]], None | Awaitable[None]]): function or coroutine
+                function taking the changed game ids
+        """
+        self.subscribers.append(callback)
+
+    async def load_state(self) -> None:
+        """Load the season's games and current results from the database"""
+        async with self.engine.connect() as db:
+            self.season_id = await get_season_id(db, self.season_year)
+            self.regular_season_week_count = (
+                await get_season_info(db, self.season_year)
+            ).regular_season_week_count
+            self.game_ids = await get_game_keys(db, self.season_id)
+            self.game_weeks = {game_id: week for (week, _, _), game_id in self.game_ids.items()}
+            self.known_results = await get_game_results(db, self.season_id)
+
+    async def ingest_snapshot(self, path: str) -> list[int]:
+        """Write the results in a snapshot that differ from the last known results
+
+        Args:
+            path (str): path to the CSV snapshot
+
+        Returns:
+            list[int]: ids of the games whose results were added or changed
+        """
+        if self.season_id is None:
+            await self.load_state()
+
+        results_df = normalize_game_results(
+            read_games_from_excel(path), self.regular_season_week_count
+        )
+
+        # diff the snapshot against the last known results, keyed by game
+        #   (tolist() gives Python values, which the database driver accepts)
+        changed_results: dict[int, tuple[int, int, bool]] = {}
+        snapshot_rows = zip(*[results_df[column].tolist() for column in results_df.columns])
+        for week, away_team, home_team, away_score, home_score, overtime in snapshot_rows:
+            game_id = self.game_ids.get((week, away_team, home_team))
+
+            if game_id is None:
+                self.unknown_games.add((week, away_team, home_team))
+                continue
+
+            result = (away_score, home_score, overtime)
+            if self.known_results.get(game_id) != result:
+                changed_results[game_id] = result
+
+        if not changed_results:
+            return []
+
+        # the standings change from the earliest week with a changed result onward
+        first_changed_week = min(self.game_weeks[game_id] for game_id in changed_results)
+
+        async with season_write_transaction(
+            self.engine, self.season_year, RESULT_TABLES
+        ) as db:
+            await upsert_game_results(db, changed_results, set(self.known_results))
+            await refresh_standings(db, self.season_year, first_changed_week)
+
+        # the results are committed, so they are known whether or not subscribers succeed
+        self.known_results.update(changed_results)
+
+        changed_game_ids = list(changed_results)
+        for callback in self.subscribers:
+            # a failing subscriber is logged on its own, so the others still get the ids
+            #   (a retry of the snapshot would find no changes to deliver)
+            try:
+                callback_result = callback(changed_game_ids)
+                if inspect.isawaitable(callback_result):
+                    await callback_result
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception(
+                    'Subscriber %r failed for changed games %s', callback, changed_game_ids
+                )
+
+        return changed_game_ids
+
+    async def watch(self, directory: str, poll_seconds: float = 2.0) -> None:
+        """Ingest the newest CSV snapshot in a folder whenever a new one is dropped in
+            - Snapshots hold every game, so older snapshots that were missed are skipped
+            - A snapshot that fails (ie half-written, or a bad row) is logged and retried on
+                the next poll, without stopping the watcher
+
+        Args:
+            directory (str): drop folder for CSV snapshots
+            poll_seconds (float, optional): seconds between checks. Defaults to 2.0.
+        """
+        while True:
+            newest_path, newest_mtime = None, 0.0
+            try:
+                snapshot_paths = [
+                    os.path.join(directory, file_name)
+                    for file_name in get_file_names_in_folder_with_filetype(directory, 'csv')
+                ]
+                newest_path = max(snapshot_paths, key=os.path.getmtime, default=None)
+                newest_mtime = os.path.getmtime(newest_path) if newest_path else 0.0
+
+                if newest_mtime > self.last_snapshot_mtime:
+                    changed_game_ids = await self.ingest_snapshot(newest_path)
+                    # only marked as read once ingested, so a failed snapshot is retried
+                    self.last_snapshot_mtime = newest_mtime
+                    print(
+                        f'{os.path.basename(newest_path)}: {len(changed_game_ids)} results changed'
+                    )
+            # a bad snapshot should not stop the watcher on a game day
+            except Exception:  # pylint: disable=broad-exception-caught
+                # log each failing snapshot once, not on every retry
+                if newest_mtime != self.failed_snapshot_mtime:
+                    self.failed_snapshot_mtime = newest_mtime
+                    logger.exception('Could not ingest live results snapshot %s', newest_path)
+
+            await asyncio.sleep(poll_seconds)
+
+
+async def watch_live_results(season_year: int, directory: str = 'live_results') -> None:
+    """Watch a drop folder and write live results for a season to the database
+
+    Args:
+        season_year (int): season the snapshots are for
+        directory (str, optional): drop folder for CSV snapshots. Defaults to 'live_results'.
+    """
+    engine: AsyncEngine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    await LiveResultsIngester(engine, season_year).watch(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(watch_live_results(2024))
@@ -1,40 +1,135 @@
 import asyncio
-from contextlib import _GeneratorContextManager
+from typing import AsyncIterator
 import pandas as pd
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncConnection
-from database_handler import create_sql_server_connection_string
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+from database.columnar_fetch import (
+    DEFAULT_BATCH_SIZE,
+    async_stream_dataframes,
+    result_to_dataframe,
+)
+from database.database_helper import engine_registry
+from helper.database_handler import DatabaseError, create_sql_server_connection_string
 
 async def async_run_multiple_select_queries(
     environment_variable: str,
     query_info_list: list[tuple[str, dict]],
-    echo=False
+    echo=False,
+    max_concurrent_queries: int = 5,
+    query_timeout: float | None = 30.0,
 ) -> list[pd.DataFrame]:
     """Run multiple SELECT SQL queries concurrently
+        - Each query runs on its own pooled connection, so a page that needs several
+            independent queries waits for the slowest one rather than the sum of them
+        - max_concurrent_queries should not be above the pool size plus overflow, or
+            queries wait on the pool instead of the semaphore
 
     Args:
         environment_variable (str): environment variable containing a connection string
-        query_info_list (list[tuple[str, dict]]): query info
-        echo (bool, optional): _description_. Defaults to False.
+        query_info_list (list[tuple[str, dict]]): (query string, parameters) for each query
+        echo (bool, optional): log the SQL statements. Defaults to False.
+        max_concurrent_queries (int, optional): max queries running at once. Defaults to 5.
+        query_timeout (float | None, optional): seconds each query may take, None for no
+            limit. Defaults to 30.0.
+
+    Raises:
+        DatabaseError: a query took longer than query_timeout
 
     Returns:
-        _type_: _description_
+        list[pd.DataFrame]: results of each query, in the same order as query_info_list
     """
-    # create SQL engine using connection string and create database connection
-    engine: AsyncEngine = await create_async_engine(
-        create_sql_server_connection_string(environment_variable),
-        echo=echo
+    # get the shared async SQL engine for the connection string
+    engine: AsyncEngine = engine_registry.get_engine_for_url(
+        create_sql_server_connection_string(environment_variable), True, echo
     )
 
-    async with engine.begin() as db:
-        results = await asyncio.gather(*[async_run_single_select_query(db, query_string, parameters) for query_string, parameters in query_info_list])
-        
-        dataframe_results = [pd.DataFrame(result) for result in results]
-        
-        return dataframe_results
-    
-async def async_run_single_select_query(db: AsyncConnection, query_string: str, parameters: dict):
+    query_slots = asyncio.Semaphore(max_concurrent_queries)
+
+    async def run_query(query_index: int, query_string: str, parameters: dict) -> pd.DataFrame:
+        async with query_slots:
+            try:
+                # the timeout covers waiting for a pooled connection as well as the query
+                return await asyncio.wait_for(
+                    async_run_pooled_select_query(engine, query_string, parameters),
+                    query_timeout,
+                )
+            except asyncio.TimeoutError as error:
+                raise DatabaseError(
+                    f"Query {query_index} did not finish within {query_timeout} seconds"
+                ) from error
+
+    # gather returns results in the order the queries were passed in
+    return await asyncio.gather(
+        *[
+            run_query(query_index, query_string, parameters)
+            for query_index, (query_string, parameters) in enumerate(query_info_list)
+        ]
+    )
+
+async def async_run_pooled_select_query(
+    engine: AsyncEngine, query_string: str, parameters: dict
+) -> pd.DataFrame:
+    """Run a SELECT SQL query on its own connection from the engine's pool
+
+    Args:
+        engine (AsyncEngine): engine to take a connection from
+        query_string (str): query to run
+        parameters (dict): query parameters
+
+    Returns:
+        pd.DataFrame: query results
+    """
+    async with engine.connect() as db:
+        return await async_run_single_select_query(db, query_string, parameters)
+
+async def async_run_single_select_query(
+    db: AsyncConnection, query_string: str, parameters: dict
+) -> pd.DataFrame:
+    """Run a SELECT SQL query on a connection
+
+    Args:
+        db (AsyncConnection): database connection
+        query_string (str): query to run
+        parameters (dict): query parameters
+
+    Returns:
+        pd.DataFrame: query results, with the query's column names
+    """
     result = await db.execute(text(query_string), parameters)
-    
+
     # execute query and get results as a dataframe
-    return result.fetchall()
\ No newline at end of file
+    return result_to_dataframe(result)
+
+async def async_stream_select_query(
+    environment_variable: str,
+    query_string: str,
+    parameters: dict = None,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+    echo=False,
+) -> AsyncIterator[pd.DataFrame]:
+    """Run a SELECT SQL query with a server-side cursor and yield the results in chunks
+        - Only one chunk is held in memory, for exports and analytics over all games
+        - The connection is held until the generator is finished or closed
+
+    Args:
+        environment_variable (str): environment variable containing a connection string
+        query_string (str): query to run
+        parameters (dict, optional): query parameters. Defaults to None.
+        chunk_size (int, optional): rows per dataframe. Defaults to DEFAULT_BATCH_SIZE.
+        echo (bool, optional): log the SQL statements. Defaults to False.
+
+    Yields:
+        AsyncIterator[pd.DataFrame]: dataframes with up to chunk_size rows of query results
+    """
+    # get the shared async SQL engine for the connection string
+    engine: AsyncEngine = engine_registry.get_engine_for_url(
+        create_sql_server_connection_string(environment_variable), True, echo
+    )
+
+    async with engine.connect() as db:
+        result = await db.stream(
+            text(query_string), parameters, execution_options={'yield_per': chunk_size}
+        )
+
+        async for chunk in async_stream_dataframes(result, chunk_size):
+            yield chunk
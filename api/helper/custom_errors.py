@@ -174,3 +174,21 @@ class NotFoundInDatabaseError(Exception):
     # __str__ is to print() the value
     def __str__(self):
         return repr(self.value)
+
+
+class SeasonValidationError(Exception):
+    """Error for season data that failed validation before being added to the database
+
+    Args:
+        Exception (Exception): season validation error
+    """
+
+    # Constructor or Initializer
+    def __init__(self, year: int, errors: list[str]):
+        self.year = year
+        self.errors = errors
+        self.value = f"Season {year} failed validation with {len(errors)} errors: {errors}"
+
+    # __str__ is to print() the value
+    def __str__(self):
+        return repr(self.value)
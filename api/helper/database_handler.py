@@ -1,15 +1,30 @@
 """Handles synchronous database interactions"""
 
-import os
-from dotenv import load_dotenv
+from functools import cache, lru_cache
+from typing import Iterator
 from pandas import DataFrame
 from pyodbc import drivers
-from sqlalchemy import Engine, text, create_engine
-from helper.file_reader import read_file
+from sqlalchemy import Engine, make_url, text
+from database.columnar_fetch import (
+    DEFAULT_BATCH_SIZE,
+    result_to_dataframe,
+    stream_dataframes,
+)
+from database.list_parameters import run_list_query
+from database.database_helper import (
+    engine_registry,
+    get_connection_config,
+    on_connection_config_reload,
+)
+from database.query_registry import query_registry
 
 
 def run_select_query(
-    environment_variable: str, query_string: str, parameters: dict = None, echo=False
+    environment_variable: str,
+    query_string: str,
+    parameters: dict = None,
+    echo=False,
+    list_parameters: dict[str, list] = None,
 ) -> DataFrame:
     """Run a SELECT query
 
@@ -18,27 +33,68 @@ def run_select_query(
         query_string (str): query string
         parameters (dict, optional): SQL parameters. Defaults to None.
         echo (bool, optional): echo SQL calls. Defaults to False.
+        list_parameters (dict[str, list], optional): lists for IN clauses, written as
+            "IN :name" in the query (see database.list_parameters). Defaults to None.
 
     Returns:
         DataFrame: Dataframe with query results
     """
-    # create SQL engine using connection string and create database connection
-    engine: Engine = create_engine(
-        create_sql_server_connection_string(environment_variable), echo=echo
+    # get the shared SQL engine for the connection string
+    engine: Engine = engine_registry.get_engine_for_url(
+        create_sql_server_connection_string(environment_variable), False, echo
     )
 
     # connect to the database and run the query in the connection
     with engine.connect() as db:
+        if list_parameters:
+            return run_list_query(db, query_string, list_parameters, parameters)
+
         # execute query
         result = db.execute(text(query_string), parameters)
 
-        # create a dataframe from results
-        return DataFrame(result.fetchall())
+        # create a dataframe from the result columns
+        return result_to_dataframe(result)
     
 
+def stream_select_query(
+    environment_variable: str,
+    query_string: str,
+    parameters: dict = None,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+    echo=False,
+) -> Iterator[DataFrame]:
+    """Run a SELECT query with a server-side cursor and yield the results in chunks
+        - Only one chunk is held in memory, for exports and analytics over all games
+        - The connection is held until the generator is finished or closed
+
+    Args:
+        environment_variable (str): environment variable with connection string
+        query_string (str): query string
+        parameters (dict, optional): SQL parameters. Defaults to None.
+        chunk_size (int, optional): rows per dataframe. Defaults to DEFAULT_BATCH_SIZE.
+        echo (bool, optional): echo SQL calls. Defaults to False.
+
+    Yields:
+        Iterator[DataFrame]: Dataframes with up to chunk_size rows of query results
+    """
+    # get the shared SQL engine for the connection string
+    engine: Engine = engine_registry.get_engine_for_url(
+        create_sql_server_connection_string(environment_variable), False, echo
+    )
+
+    with engine.connect() as db:
+        result = db.execution_options(stream_results=True, yield_per=chunk_size).execute(
+            text(query_string), parameters
+        )
+
+        yield from stream_dataframes(result, chunk_size)
+
+
+@lru_cache(maxsize=None)
 def create_sql_server_connection_string(environment_variable: str) -> str:
     """Create a connection string from an environment variable containing a connection string
         and a SQL Server driver
+        - Cached until the connection settings are reloaded
 
     Args:
         environment_variable (str): environment variable with connection string
@@ -47,8 +103,11 @@ def create_sql_server_connection_string(environment_variable: str) -> str:
         str: SQL Server connection string
     """
     # get connection string from environment variable
-    load_dotenv()
-    connection_string = os.getenv(environment_variable)
+    connection_string = get_connection_config().get(environment_variable)
+
+    # only SQL Server connection strings need an ODBC driver (not ie the SQLite backend)
+    if make_url(connection_string).get_backend_name() != "mssql":
+        return connection_string
 
     driver_name = get_sql_server_driver_name()
 
@@ -58,8 +117,13 @@ def create_sql_server_connection_string(environment_variable: str) -> str:
     return connection_string
 
 
+on_connection_config_reload(create_sql_server_connection_string.cache_clear)
+
+
+@cache
 def get_sql_server_driver_name() -> str:
     """Get a SQL Server driver name
+        - Drivers are only enumerated once per process, the result is cached
 
     Raises:
         DatabaseError: No suitable driver found. Cannot connect to database.
@@ -67,6 +131,7 @@ def get_sql_server_driver_name() -> str:
     Returns:
         str: first valid SQL Server driver
     """
+    driver_name = ""
     # get list of SQL Server drivers available
     driver_names = [x for x in drivers() if x.endswith(" for SQL Server")]
 
@@ -82,51 +147,23 @@ def get_sql_server_driver_name() -> str:
 
 def get_query_from_file(query_file_name: str) -> str:
     """Get SQL query from .sql file in queries folder
+        - Queries are loaded once at startup by the query registry, not read per call
 
     Args:
-        query_file_name (str): file name with SQL query
+        query_file_name (str): file name with SQL query, with or without .sql
 
     Raises:
-        Exception: invalid file extension, only accepts .sql
+        ValueError: invalid file extension, only accepts .sql
+        QueryRegistryError: no query with that name, or it references missing tables
 
     Returns:
         str: query string
     """
-    # only .sql files are accepted
-    if query_file_name.endswith(".sql"):
-        # if no .SQL file extension (just the file name), append it to file name
-        if ".sql" not in query_file_name:
-            query_file_name += ".sql"
-
-        # read .SQL file and return contents
-        return read_file(f"queries/{query_file_name}")
-    # throw error if not a .sql file
-    else:
+    # only .sql files (or names without an extension) are accepted
+    if "." in query_file_name and not query_file_name.endswith(".sql"):
         raise ValueError("Invalid file extension. Only .sql files are accepted")
 
-
-def populate_lists_in_query(query_string: str, list_parameters: list[list]) -> str:
-    """Put a lists in a query
-        - Replace ":listN" with "(item1, item2, item3...)"
-
-    Args:
-        query_string (str): query string with ":list" in it
-        parameter_list (list): list of
-
-    Returns:
-        str: query with lists replaces for "in" statements
-    """
-    for i, list_parameter in enumerate(list_parameters):
-        # if more than one item in list that will be after the "in" condition
-        if len(list_parameter) > 1:
-            query_string = query_string.replace(f":list{i}", str(tuple(list_parameter)))
-        # if only one item in list that will be after the "in" condition
-        else:
-            query_string = query_string.replace(
-                f":list{i}", f"('{next(iter(list_parameter))}')"
-            )  # next(iter()) able to handle 0 items in list
-
-    return query_string
+    return query_registry.get(query_file_name).sql
 
 
 class DatabaseError(Exception):
@@ -1,12 +1,19 @@
 """Handles database interactions
 """
 
-import os
-from dotenv import load_dotenv
+from typing import Iterator
 import pandas as pd
-import pyodbc
 import sqlalchemy as sal
-from helper.file_reader import read_file
+from database.batch_queries import run_first_row_queries
+from database.columnar_fetch import stream_dataframes
+from database.database_helper import get_connection_config
+from database.query_metrics import query_metrics
+from database.list_parameters import run_list_query
+from helper.database_handler import (
+    DatabaseError,
+    get_query_from_file,
+    get_sql_server_driver_name,
+)
 
 class DatabaseHandler:
     """
@@ -56,8 +63,7 @@ class DatabaseHandler:
             create_connection (bool, optional): creates database connection if True.
                 Defaults to True.
         """
-        load_dotenv()
-        connection_string = os.getenv(environment_variable)
+        connection_string = get_connection_config().get(environment_variable)
 
         if create_connection:
             self.create_db_connection(connection_string)
@@ -72,47 +78,33 @@ class DatabaseHandler:
         Raises:
             Exception: if driver could not be found
         """
-        driver_name = ""
-        # get list of SQL Server drivers available
-        driver_names = [x for x in pyodbc.drivers() if x.endswith(" for SQL Server")]
-
-        # if there were valid driver_names returned, use first one
-        if driver_names:
-            driver_name = driver_names[0]
-        # if driver was found
-        if driver_name:
-            full_connection_string = connection_string + f"&driver={driver_name}"
-
-            # create sal engine using connection string and create database connection
-            self.engine = sal.create_engine(full_connection_string)
-            self.conn = self.engine.connect()
-        else:
+        try:
+            # driver lookup is cached, so drivers are only enumerated once per process
+            driver_name = get_sql_server_driver_name()
+        except DatabaseError:
             print("(No suitable driver found. Cannot connect to database.)")
-            raise DatabaseError("No suitable driver found. Cannot connect to database.")
+            raise
+
+        full_connection_string = connection_string + f"&driver={driver_name}"
+
+        # create sal engine using connection string and create database connection
+        self.engine = sal.create_engine(full_connection_string)
+        query_metrics.instrument_engine(self.engine)
+        self.conn = self.engine.connect()
 
     def get_query(self, query_file_name: str) -> str:
         """Get SQL query from .sql file in queries folder
 
         Args:
-            query_file_name (str): file name with SQL query
+            query_file_name (str): file name with SQL query, with or without .sql
 
         Raises:
-            Exception: invalid file extension, only accepts .sql
+            ValueError: invalid file extension, only accepts .sql
 
         Returns:
-            str: _description_
+            str: query string
         """
-        # only .sql files are accepted
-        if query_file_name.endswith(".sql"):
-            # if no .SQL file extension (just the file name), append it to file name
-            if ".sql" not in query_file_name:
-                query_file_name += ".sql"
-
-            # read .SQL file and return contents
-            return read_file(f"queries/{query_file_name}")
-        # throw error if not a .sql file
-        else:
-            raise ValueError("Invalid file extension (only .sql)")
+        return get_query_from_file(query_file_name)
 
     def run_query(self, query_string_or_file: str, is_file_name=False) -> pd.DataFrame:
         """Run a straight SQL query to current connection and returns result as a dataframe
@@ -141,6 +133,40 @@ class DatabaseHandler:
 
         return pd.DataFrame(sql_query)
 
+    def run_query_chunks(
+        self, query_string_or_file: str, chunk_size: int = 10_000, is_file_name=False
+    ) -> Iterator[pd.DataFrame]:
+        """Run a straight SQL query with a server-side cursor and yield the result in
+            dataframe chunks, so only one chunk is held in memory
+            Accepts:
+                - A straight query string
+                - A .sql file with query string
+
+        Args:
+            query_string_or_file (string): query string for file with
+                query string in queries/ folder
+            chunk_size (int, optional): rows per dataframe. Defaults to 10_000.
+            is_file_name (bool, optional): manual check if a .sql file is being based in
+                instead of a query string. Defaults to False.
+
+        Yields:
+            Iterator[pd.DataFrame]: result from database query, a chunk at a time
+        """
+        # if query is in a .sql file, read and extract it from the file
+        if query_string_or_file.endswith(".sql") or is_file_name:
+            query_string = self.get_query(query_string_or_file)
+        # if an entire query was passes in
+        else:
+            query_string = query_string_or_file
+
+        # stream on a separate connection so self.conn stays free for other queries
+        with self.engine.connect() as stream_connection:
+            result = stream_connection.execution_options(
+                stream_results=True, yield_per=chunk_size
+            ).execute(sal.sql.text(query_string))
+
+            yield from stream_dataframes(result, chunk_size)
+
     def run_query_parameterized(
         self, query_string_or_file: str, parameters: dict, is_file_name=False
     ) -> pd.DataFrame:
@@ -183,29 +209,19 @@ class DatabaseHandler:
         """Used for the SQL_Evaluator object to run multiple SQL queries at once to reduce time
             it takes to run a batch of SQL queries. This makes many assumptions becaus
             Experlogix queries are being run:
-
+            - The queries are sent as multi-statement batches, so hundreds of small lookups
+                take a handful of round trips
+            - A query that fails is "error" in the results, without failing the others
 
         Args:
             query_string_or_file (list): query strings or file with query strings in queries/ folder
             parameters (list): list parameter mappings: { parameter: parameter_value }
 
         Returns:
-            list: list of results (sqlalchemny "Row" objects)
+            list: first row of each query as a tuple (None if it had no rows, "error" if it
+                failed)
         """
-        query_results_list = [None] * len(query_strings)
-
-        for i, query_string in enumerate(query_strings):
-            try:
-                # set query statement and SQL parameters
-                stmt = sal.sql.text(query_string)
-                result = self.conn.execute(stmt, parameters[i])
-
-                # execute query and get results as a dataframe
-                query_results_list[i] = result.first()
-            except DatabaseError:
-                query_results_list[i] = "error"
-
-        return query_results_list
+        return run_first_row_queries(self.conn, list(zip(query_strings, parameters)))
 
     def run_query_in_list(
         self, query_string_or_file: str, parameter_list: list, is_file_name=False
@@ -218,7 +234,8 @@ class DatabaseHandler:
                 - A .sql file with query string
 
             Note:
-                - Put ":list" in query to replace that with the list
+                - Put ":list" in query where the list goes (ie "WHERE Id IN :list")
+                - Short lists are sent as bind parameters, long lists through a temp table
 
         Args:
             query_string_or_file (string): query string for file with query string
@@ -236,20 +253,9 @@ class DatabaseHandler:
         # if an entire query was passes in
         else:
             query_string = query_string_or_file
-        # if more than one item in list that will be after the "in" condition
-        if len(parameter_list) > 1:
-            query_string = query_string.replace(":list", str(tuple(parameter_list)))
-        # if only one item in list that will be after the "in" condition
-        else:
-            #
-            query_string = query_string.replace(
-                ":list", "('" + next(iter(parameter_list)) + "')"
-            )  # able to handle 0 items in list
 
         # execute query and get results as a dataframe
-        sql_query = pd.read_sql_query(query_string, self.engine)
-
-        return pd.DataFrame(sql_query)
+        return run_list_query(self.conn, query_string, {"list": parameter_list})
 
     def close(self):
         """Close database connection"""
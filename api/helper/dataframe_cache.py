@@ -0,0 +1,175 @@
+"""Memory-budgeted LRU cache of dataframes"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+from typing import Callable
+import pandas as pd
+
+
+@dataclass(slots=True)
+class CachedDataFrame:
+    """A cached dataframe, its memory use and when it was cached"""
+    df: pd.DataFrame
+    size_bytes: int
+    stored_at: float
+
+
+def dataframe_size(df: pd.DataFrame) -> int:
+    """Memory used by a dataframe, including the strings in object columns
+
+    Args:
+        df (pd.DataFrame): dataframe
+
+    Returns:
+        int: size in bytes
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DataFrameCache:
+    """
+    This module keeps recently used dataframes in memory within a byte budget
+        - The least recently used dataframes are evicted once max_bytes is exceeded
+        - A dataframe older than its TTL is dropped on its next get, so it is reread
+
+    Import:
+        from helper.dataframe_cache import DataFrameCache
+
+    Example:
+        usage:
+            cache = DataFrameCache(max_bytes=256 * 1024 * 1024, ttl_seconds={'games': 300})
+            cache.put('games', df)
+            cache.get('games')
+            cache.metrics()
+
+    Attributes:
+        max_bytes (int): memory budget for cached dataframes
+        default_ttl_seconds (float | None): TTL for names without their own, None for no TTL
+        ttl_seconds (dict[str, float]): name mapped to its TTL
+        entries (OrderedDict[str, CachedDataFrame]): cached dataframes, least recently
+            used first
+        total_bytes (int): memory used by the cached dataframes
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        default_ttl_seconds: float | None = None,
+        ttl_seconds: dict[str, float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.default_ttl_seconds = default_ttl_seconds
+        self.ttl_seconds: dict[str, float] = dict(ttl_seconds or {})
+        self.clock = clock
+
+        self.entries: OrderedDict[str, CachedDataFrame] = OrderedDict()
+        self.total_bytes: int = 0
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def ttl(self, name: str) -> float | None:
+        """TTL for a name
+
+        Args:
+            name (str): cache key
+
+        Returns:
+            float | None: seconds a dataframe stays fresh, None if it never expires
+        """
+        return self.ttl_seconds.get(name, self.default_ttl_seconds)
+
+    def get(self, name: str) -> pd.DataFrame | None:
+        """Get a cached dataframe
+
+        Args:
+            name (str): cache key
+
+        Returns:
+            pd.DataFrame | None: the dataframe, or None if it isn't cached or has expired
+        """
+        with self._lock:
+            cached_df = self.entries.get(name)
+
+            if cached_df is not None:
+                ttl = self.ttl(name)
+                if ttl is not None and self.clock() - cached_df.stored_at > ttl:
+                    self._remove(name)
+                    self.expirations += 1
+                    cached_df = None
+
+            if cached_df is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(name)
+            self.hits += 1
+            return cached_df.df
+
+    def put(self, name: str, df: pd.DataFrame) -> None:
+        """Cache a dataframe, evicting the least recently used dataframes over budget
+
+        Args:
+            name (str): cache key
+            df (pd.DataFrame): dataframe
+        """
+        size_bytes = dataframe_size(df)
+
+        with self._lock:
+            self._remove(name)
+
+            # a dataframe larger than the whole budget is returned but not kept
+            if size_bytes > self.max_bytes:
+                return
+
+            self.entries[name] = CachedDataFrame(df, size_bytes, self.clock())
+            self.total_bytes += size_bytes
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted_df = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_df.size_bytes
+                self.evictions += 1
+
+    def _remove(self, name: str) -> None:
+        """Drop a dataframe, with the lock held"""
+        if (cached_df := self.entries.pop(name, None)) is not None:
+            self.total_bytes -= cached_df.size_bytes
+
+    def invalidate(self, name: str = None) -> None:
+        """Drop a dataframe from the cache, or every dataframe
+
+        Args:
+            name (str, optional): cache key. Defaults to every dataframe.
+        """
+        with self._lock:
+            if name is None:
+                self.entries.clear()
+                self.total_bytes = 0
+            else:
+                self._remove(name)
+
+    def metrics(self) -> dict[str, int | float]:
+        """Snapshot of the cache counters
+
+        Returns:
+            dict[str, int | float]: hits, misses, evictions, expirations, hit rate,
+                cached dataframes and memory used
+        """
+        requests = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / requests, 4) if requests else 0.0,
+            'dataframes': len(self.entries),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,118 @@
+"""Query results cached as Arrow IPC (Feather v2) files, memory-mapped on read"""
+
+from contextlib import suppress
+import json
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+
+RESULT_FILE_EXTENSION = ".arrow"
+
+# schema metadata key the cache metadata (ie query hash, data version) is stored under
+METADATA_KEY = b"nfl_stats"
+
+
+def deduplicate_column_names(column_names: list[str]) -> list[str]:
+    """Rename repeated column names the way pd.read_csv does (ie Name, Name.1, Name.2)
+
+    Args:
+        column_names (list[str]): column names, possibly repeated
+
+    Returns:
+        list[str]: unique column names, the first of each kept as is
+    """
+    used_names: set[str] = set(map(str, column_names))
+    seen_names: set[str] = set()
+    unique_names: list[str] = []
+
+    for column_name in map(str, column_names):
+        unique_name = column_name
+        suffix = 0
+        # a renamed column also skips names other columns already have
+        while unique_name in seen_names or (suffix and unique_name in used_names):
+            suffix += 1
+            unique_name = f"{column_name}.{suffix}"
+        seen_names.add(unique_name)
+        unique_names.append(unique_name)
+
+    return unique_names
+
+
+def write_cached_result(path: str, df: pd.DataFrame, metadata: dict = None) -> None:
+    """Write a query result to an uncompressed Arrow IPC file, so it can be memory-mapped
+        - Written to a temp file in the same folder and renamed over the old file, so other
+            processes only ever see the old file or the whole new one
+        - Arrow needs unique column names, so repeated names (ie two unaliased Name
+            columns from a join) are renamed Name, Name.1, ...
+
+    Args:
+        path (str): cached result file
+        df (pd.DataFrame): query result
+        metadata (dict, optional): JSON-serializable metadata stored with the result.
+            Defaults to None.
+    """
+    if df.columns.has_duplicates:
+        df = df.set_axis(deduplicate_column_names(list(df.columns)), axis=1)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata).encode()}
+        )
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            with pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+
+def read_cached_result(path: str, columns: list[str] = None) -> pd.DataFrame:
+    """Read a cached query result through a memory map
+        - Only the requested columns are converted to pandas, the rest are never read
+
+    Args:
+        path (str): cached result file
+        columns (list[str], optional): columns to read. Defaults to every column.
+
+    Returns:
+        pd.DataFrame: query result
+    """
+    # the table's buffers keep the memory map open until they're released
+    table: pa.Table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    if columns is not None:
+        table = table.select(columns)
+
+    return table.to_pandas()
+
+
+def read_cached_metadata(path: str) -> dict | None:
+    """Read the metadata stored with a cached query result, without reading the result
+
+    Args:
+        path (str): cached result file
+
+    Returns:
+        dict | None: metadata, or None if the file is missing or has no metadata
+    """
+    if not os.path.isfile(path):
+        return None
+
+    schema_metadata = pa.ipc.open_file(pa.memory_map(path)).schema.metadata or {}
+    if METADATA_KEY not in schema_metadata:
+        return None
+
+    return json.loads(schema_metadata[METADATA_KEY])
@@ -1,13 +1,49 @@
-"""Store tables and get .pkl from files
+"""Store tables and get cached query results from files
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
 import os
 import time
 import pandas as pd
 
+from database.data_versions import read_table_versions
+from database.query_metrics import query_metrics
+from database.query_registry import RegisteredQuery, query_registry
 from helper.database_handler_old import DatabaseHandler
 from console_writer import ConsoleWriter
-from helper.file_reader import get_files_in_folder_with_filetype
+from helper.dataframe_cache import DataFrameCache
+from helper.result_cache import (
+    RESULT_FILE_EXTENSION,
+    read_cached_metadata,
+    read_cached_result,
+    write_cached_result,
+)
+
+# folder the cached query results are saved in
+RESULTS_DIRECTORY = "saved_query_results"
+
+# memory the dataframes kept in memory may use before the least recently used are evicted
+DEFAULT_MEMORY_BUDGET_BYTES = 512 * 1024 * 1024
+
+# queries refreshed at once, the engine's pool size so no refresh waits for a connection
+DEFAULT_MAX_CONCURRENT_QUERIES = 5
+
+# how long get_table trusts the data versions it last read before reading them again
+DEFAULT_REVALIDATE_SECONDS = 5.0
+
+
+def parameters_key(parameters: dict = None) -> str:
+    """Canonical JSON of a query's parameters, the same for equal parameters in any order
+
+    Args:
+        parameters (dict, optional): bind parameter values. Defaults to None.
+
+    Returns:
+        str: JSON with sorted keys, values that aren't JSON types (ie dates) as strings
+    """
+    return json.dumps(parameters or {}, sort_keys=True, default=str)
 
 
 class Tables:
@@ -21,8 +57,17 @@ class Tables:
 
         usage:
             tables.get_table('CatProp')
+            tables.get_table('CatProp', columns=['Id', 'Name'])
+            tables.get_table('games_for_season', parameters={'season_year': 2023})
+            tables.cache_metrics()
 
     Attributes:
+        dataframes (DataFrameCache): whole tables kept in memory, least recently used
+            evicted past memory_budget_bytes and each reread once older than its TTL
+        revalidate_seconds (float | None): seconds between get_table's data version reads,
+            None to never revalidate cached results
+        validated_metadata (dict[str, dict]): result name mapped to the metadata it was
+            last found fresh at
 
     @Author: Bradley Knorr
     @Date: 1/22/2024
@@ -33,6 +78,10 @@ class Tables:
         db: DatabaseHandler = None,
         console_writer: ConsoleWriter = None,
         store_in_memory=True,
+        memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+        default_ttl_seconds: float | None = None,
+        table_ttl_seconds: dict[str, float] = None,
+        revalidate_seconds: float | None = DEFAULT_REVALIDATE_SECONDS,
     ):
         if DatabaseHandler is None:
             self.db = DatabaseHandler()
@@ -42,9 +91,16 @@ class Tables:
         self.console_writer = console_writer
         self.store_in_memory = store_in_memory
 
-        self.dataframes = dict()
+        self.dataframes = DataFrameCache(
+            memory_budget_bytes, default_ttl_seconds, table_ttl_seconds
+        )
         self.queries_list = dict()
 
+        self.revalidate_seconds = revalidate_seconds
+        self.validated_metadata: dict[str, dict] = {}
+        self._table_versions: dict[str, int] | None = None
+        self._table_versions_read_at: float = 0.0
+
         self.table_collections: dict = {
             "properties": [
                 "category_extension_queries",
@@ -65,20 +121,32 @@ class Tables:
             ]
         }
 
-    def update_tables(self, tables: str | list):
-        """Update .pkl files with current SQL query results through one of three methods:
+    def update_tables(
+        self,
+        tables: str | list,
+        force: bool = False,
+        max_concurrent_queries: int = DEFAULT_MAX_CONCURRENT_QUERIES,
+    ):
+        """Update cached result files with current SQL query results through one of three methods:
             1. Run a list of pre-defined queries in the table_collections
             2. Run list of queries passed in
             3. Run a single query passed in
+            - Queries run at once on pooled connections, each result written as it lands
+            - A result is skipped if its query text and source tables' data versions
+                haven't changed since it was written
 
         Args:
             tables (str | list): query collection name, query name, or list of query names
+            force (bool, optional): rerun every query, even unchanged ones. Defaults to False.
+            max_concurrent_queries (int, optional): queries running at once.
+                Defaults to DEFAULT_MAX_CONCURRENT_QUERIES.
 
         Raises:
             TypeError: str or list was not passed in
         """
-        # start stopwatch
-        start = time.time()
+        # start stopwatch, and note the database time so far to report this update's share
+        start = time.perf_counter()
+        database_start = query_metrics.total_seconds()
 
         ## get list of files to run SQL query and save results for ##
 
@@ -86,8 +154,7 @@ class Tables:
         if isinstance(tables, str):
             # run all queries in folder
             if tables.lower() == "all":
-                files = get_files_in_folder_with_filetype("queries", "sql")
-                queries_to_run = [x[:-4] for x in files]
+                queries_to_run = sorted(query_registry.queries)
             # if collection name, set list to all queries in collection
             elif tables in self.table_collections:
                 queries_to_run = self.table_collections[tables]
@@ -102,54 +169,243 @@ class Tables:
                 f"set_tables() does not accept parameter of type {type(tables)} ({tables})"
             )
 
-        # run each SQL query and save results to .pkl file
-        for query_name in queries_to_run:
-            self.db.run_query(f"{query_name}.sql").to_pickle(
-                f"saved_query_results/{query_name}.pkl"
-            )
+        # a query listed twice would have two threads writing the same file
+        queries_to_run = list(dict.fromkeys(queries_to_run))
+
+        # read the data versions before the queries run, so a write landing during the
+        #   refresh leaves the results it might have missed marked stale
+        table_versions = self.table_versions()
+
+        stale_queries = [
+            query_name
+            for query_name in queries_to_run
+            if force or self.is_stale(query_name, table_versions)
+        ]
+
+        # run each stale SQL query and save results to its cached result file
+        with ThreadPoolExecutor(max_workers=max_concurrent_queries) as executor:
+            refreshes = [
+                executor.submit(self.refresh_table, query_name, table_versions)
+                for query_name in stale_queries
+            ]
+            for refresh in as_completed(refreshes):
+                refresh.result()
 
         # stop stopwatch
-        end = time.time()
+        end = time.perf_counter()
+        database_seconds = round(query_metrics.total_seconds() - database_start, 4)
 
         # print how long it took to run and save all queries
         if self.console_writer is not None:
             self.console_writer.print(
                 1,
-                f"Query and Extension Query .pkl files updated in {round(end - start, 4)} seconds",
+                f"{len(stale_queries)} of {len(queries_to_run)} Query and Extension Query"
+                f" results updated in {round(end - start, 4)} seconds"
+                f" ({database_seconds} seconds in the database)",
             )
         else:
-            print(f"Query .pkl files updated in {round(end - start, 4)} seconds")
+            print(
+                f"{len(stale_queries)} of {len(queries_to_run)} query results updated in"
+                f" {round(end - start, 4)} seconds ({database_seconds} seconds in the database)"
+            )
+
+    def refresh_table(
+        self, query_name: str, table_versions: dict[str, int], parameters: dict = None
+    ) -> None:
+        """Run a query on its own pooled connection and write its cached result file
+
+        Args:
+            query_name (str): query file name in queries folder
+            table_versions (dict[str, int]): data versions read before the query ran
+            parameters (dict, optional): bind parameter values. Defaults to None.
+        """
+        statement, parameters = query_registry.bind(query_name, parameters)
+
+        with self.db.engine.connect() as connection:
+            result = connection.execute(statement, parameters)
+            # built the same way as pd.read_sql_query, but the rows are recorded in the metrics
+            df = pd.DataFrame.from_records(
+                result.fetchall(), columns=list(result.keys()), coerce_float=True
+            )
+            query_metrics.record_rows(result, len(df))
+
+        write_cached_result(
+            self.result_path(query_name, parameters),
+            df,
+            self.result_metadata(query_registry.get(query_name), table_versions, parameters),
+        )
+        # drop the old result from memory, so the next get_table reads the new file
+        self.dataframes.invalidate(self.result_name(query_name, parameters))
+
+    def table_versions(self) -> dict[str, int]:
+        """Every table's data version, in one query
+
+        Returns:
+            dict[str, int]: table name mapped to its version
+        """
+        with self.db.engine.connect() as connection:
+            table_versions = read_table_versions(connection)
+
+        self._table_versions = table_versions
+        self._table_versions_read_at = time.monotonic()
+        return table_versions
+
+    def current_table_versions(self) -> dict[str, int]:
+        """Every table's data version, read again only once revalidate_seconds have passed
+
+        Returns:
+            dict[str, int]: table name mapped to its version
+        """
+        if (
+            self._table_versions is None
+            or time.monotonic() - self._table_versions_read_at >= self.revalidate_seconds
+        ):
+            return self.table_versions()
+
+        return self._table_versions
+
+    def result_metadata(
+        self, query: RegisteredQuery, table_versions: dict[str, int], parameters: dict = None
+    ) -> dict:
+        """Metadata stored with a cached result, to tell later whether it is stale
+
+        Args:
+            query (RegisteredQuery): query the result is from
+            table_versions (dict[str, int]): every table's data version
+            parameters (dict, optional): bind parameter values. Defaults to None.
+
+        Returns:
+            dict: hash of the query text, its parameters and the data version of each
+                table it reads from
+        """
+        return {
+            "query_hash": query.sql_hash,
+            "parameters": json.loads(parameters_key(parameters)),
+            "data_version": {
+                table_name: table_versions.get(table_name, 0)
+                for table_name in sorted(query.tables)
+            },
+        }
+
+    def is_stale(
+        self, query_name: str, table_versions: dict[str, int], parameters: dict = None
+    ) -> bool:
+        """Whether a query's cached result is missing, or its query or source data changed
+
+        Args:
+            query_name (str): query file name in queries folder
+            table_versions (dict[str, int]): every table's data version
+            parameters (dict, optional): bind parameter values. Defaults to None.
+
+        Returns:
+            bool: True if the query needs to be rerun
+        """
+        return read_cached_metadata(
+            self.result_path(query_name, parameters)
+        ) != self.result_metadata(query_registry.get(query_name), table_versions, parameters)
+
+    def revalidate(self, query_name: str, parameters: dict = None) -> None:
+        """Rerun a query if its cached result is stale
+            - The data versions are read with one small query at most every
+                revalidate_seconds, and a result already found fresh at those versions
+                isn't checked again
+
+        Args:
+            query_name (str): query file name in queries folder
+            parameters (dict, optional): bind parameter values. Defaults to None.
+        """
+        table_versions = self.current_table_versions()
+        result_name = self.result_name(query_name, parameters)
+        metadata = self.result_metadata(
+            query_registry.get(query_name), table_versions, parameters
+        )
+
+        if self.validated_metadata.get(result_name) == metadata:
+            return
+
+        # the copy in memory may be from before another process rewrote the file
+        self.dataframes.invalidate(result_name)
+
+        if read_cached_metadata(self.result_path(query_name, parameters)) != metadata:
+            self.refresh_table(query_name, table_versions, parameters)
+
+        self.validated_metadata[result_name] = metadata
+
+    def result_name(self, query_name: str, parameters: dict = None) -> str:
+        """Name of a query's cached result, with a hash of its parameters if it has any
+
+        Args:
+            query_name (str): query file name in queries folder
+            parameters (dict, optional): bind parameter values. Defaults to None.
+
+        Returns:
+            str: result name (ie 'games' or 'games_for_season.3f1c9a0b2e7d4c61')
+        """
+        if not parameters:
+            return query_name
+
+        parameters_hash = hashlib.sha256(parameters_key(parameters).encode()).hexdigest()
+        return f"{query_name}.{parameters_hash[:16]}"
+
+    def result_path(self, query_name: str, parameters: dict = None) -> str:
+        """Cached result file for a query
+
+        Args:
+            query_name (str): query file name in queries folder
+            parameters (dict, optional): bind parameter values. Defaults to None.
+
+        Returns:
+            str: path of the Arrow IPC file in saved_query_results/
+        """
+        return os.path.join(
+            RESULTS_DIRECTORY, f"{self.result_name(query_name, parameters)}{RESULT_FILE_EXTENSION}"
+        )
 
     ###############################################
-    # Get SQL tables from .pkl files
+    # Get SQL tables from cached result files
     ###############################################
-    def get_table(self, query_name: str) -> pd.DataFrame:
+    def get_table(
+        self, query_name: str, columns: list[str] = None, parameters: dict = None
+    ) -> pd.DataFrame:
         """Gets table from database with sales codes and static properties
+            - Cached results are memory-mapped, so only the columns asked for are read
+            - Results of queries in the queries folder are rerun if the query, its
+                parameters or the data in its tables changed since they were cached
 
         Args:
             query_name (str): query file name in queries folder to run
+            columns (list[str], optional): columns to get. Defaults to every column.
+            parameters (dict, optional): bind parameter values. Defaults to None.
 
         Returns:
-            Dataframe: dataframe in .pkl file
+            Dataframe: dataframe in the cached result file
         """
-        # if query results are already stored in memory
-        if query_name in self.dataframes:
-            return self.dataframes[query_name]
+        result_name = self.result_name(query_name, parameters)
 
-        # attempt to get query result from .pkl file
+        # rerun the query if its cached result is missing or stale
+        if query_name in query_registry.queries:
+            if self.revalidate_seconds is not None:
+                self.revalidate(query_name, parameters)
+            elif not os.path.isfile(self.result_path(query_name, parameters)):
+                self.refresh_table(query_name, self.table_versions(), parameters)
 
-        # if there is a .sql file in queries/, but no .pkl file in
-        #   saved_query_results/, create the .pkl file
-        if not os.path.isfile(
-            f"saved_query_results/{query_name}.pkl"
-        ) and os.path.isfile(f"queries/{query_name}.sql"):
-            self.update_tables(query_name)
+        # if query results are already stored in memory
+        if self.store_in_memory and (df := self.dataframes.get(result_name)) is not None:
+            return df if columns is None else df[columns]
 
-        # if there is a stored .pkl file for this query in saved_query_results
-        df = pd.read_pickle(f"saved_query_results/{query_name}.pkl")
+        # read the stored result for this query in saved_query_results
+        df = read_cached_result(self.result_path(query_name, parameters), columns)
 
-        # if storing tables in memory, set the dictionary value
-        if self.store_in_memory:
-            self.dataframes[query_name] = df
+        # if storing tables in memory, set the dictionary value (only whole tables)
+        if self.store_in_memory and columns is None:
+            self.dataframes.put(result_name, df)
 
         return df
+
+    def cache_metrics(self) -> dict[str, int | float]:
+        """Hits, misses, evictions and memory use of the dataframes kept in memory
+
+        Returns:
+            dict[str, int | float]: cache counters
+        """
+        return self.dataframes.metrics()
@@ -1,9 +1,9 @@
 SELECT g.[Id]
-      ,[SeasonId]
-      ,[Week]
-      ,[StartTime]
+      ,g.[SeasonId]
+      ,g.[Week]
+      ,g.[StartTime]
       ,t_away.[FullName] as AwayTeam
       ,t_home.[FullName] as HomeTeam
-  FROM [NflProjections].[dbo].[Games] g
-  JOIN Teams t_away on t_away.Id = g.AwayTeamId
-  JOIN Teams t_home on t_home.Id = g.HomeTeamId
\ No newline at end of file
+  FROM [dbo].[Game] g
+  JOIN [dbo].[Team] t_away on t_away.Id = g.AwayTeamId
+  JOIN [dbo].[Team] t_home on t_home.Id = g.HomeTeamId
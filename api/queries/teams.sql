@@ -1,9 +1,8 @@
 SELECT t.[Id]
-      ,[Location]
+      ,t.[Location]
       ,t.[Name]
-      ,[FullName]
+      ,t.[FullName]
       ,d.[Name] as Division
-	  ,c.[Name] as Conference
-  FROM [NflProjections].[dbo].[Teams] t
-  JOIN Divisions d on d.Id = t.DivisionId
-  JOIN Conferences c on c.Id = d.ConferenceId
\ No newline at end of file
+      ,d.[Conference]
+  FROM [dbo].[Team] t
+  JOIN [dbo].[Division] d on d.Id = t.DivisionId
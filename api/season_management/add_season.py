@@ -3,6 +3,8 @@ from datetime import datetime
 import pandas as pd
 from data.excel_conversion import Team, Division, Game, Season
 from database.insert.db_insert import add_entire_season_to_database
+from helper.custom_errors import SeasonValidationError
+from season_management.season_validation import validate_season
 
 async def add_completed_season_to_database_from_excel(
     file_path: str, year: int, playoff_teams: int, regular_season_week_count: int
@@ -15,6 +17,50 @@ async def add_completed_season_to_database_from_excel(
         name (str): Season name (ie '2023-2024').
         playoff_teams (int): The number of playoff teams.
         regular_season_week_count (int): The number of weeks in the regular season.
+
+    Raises:
+        SeasonValidationError: The season data is invalid, nothing was added.
+    """
+    # create the games and teams dataframes from the Excel file
+    games_df, teams_df = read_season_from_excel(file_path)
+
+    season, divisions, teams, games = create_season_objects(
+        games_df, teams_df, year, playoff_teams, regular_season_week_count
+    )
+
+    # check the whole season before any of it reaches the database
+    errors = validate_season(divisions, teams, games, regular_season_week_count)
+    if errors:
+        raise SeasonValidationError(year, errors)
+
+    # add season to the database
+    await add_entire_season_to_database(
+        season_info=season,
+        divisions=divisions,
+        teams=teams,
+        games=games,
+        completed_season=True,
+    )
+
+def create_season_objects(
+    games_df: pd.DataFrame,
+    teams_df: pd.DataFrame,
+    year: int,
+    playoff_teams: int,
+    regular_season_week_count: int
+) -> tuple[Season, list[Division], list[Team], list[Game]]:
+    """Creates the Season, Division, Team and Game objects from the season dataframes.
+
+    Args:
+        games_df (pd.DataFrame): The games dataframe from read_season_from_excel.
+        teams_df (pd.DataFrame): The teams dataframe from read_season_from_excel.
+        year (int): Season year.
+        playoff_teams (int): The number of playoff teams.
+        regular_season_week_count (int): The number of weeks in the regular season.
+
+    Returns:
+        tuple[Season, list[Division], list[Team], list[Game]]: The season information,
+            divisions, teams and games.
     """
     # initiate constant variables based on the parameters passed in
     name = f'{year}-{year+1}'
@@ -26,9 +72,6 @@ async def add_completed_season_to_database_from_excel(
         'SuperBowl': regular_season_week_count + 4,
     }
 
-    # create the games and teams dataframes from the Excel file
-    games_df, teams_df = read_season_from_excel(file_path)
-
     # create Game objects from the games dataframe
     games_df['Game'] = games_df.apply(
         create_game,
@@ -43,15 +86,15 @@ async def add_completed_season_to_database_from_excel(
     # create object lists from the games and teams dataframes
     games: list[Game] = games_df['Game'].to_list()
     teams: list[Team] = teams_df['Team'].to_list()
-    divisions: list[Division] = teams_df['Division'].to_list()
+    # every team row creates its division, so only keep one of each
+    divisions: list[Division] = list(dict.fromkeys(teams_df['Division']))
     season: Season = Season(year=year,
         name=name,
         playoff_teams=playoff_teams,
         regular_season_week_count=regular_season_week_count
     )
 
-    # add season to the database
-    await add_entire_season_to_database(season, games, teams, divisions, True)
+    return season, divisions, teams, games
 
 def read_season_from_excel(path: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Reads the NFL season data from the given Excel file.
@@ -64,8 +107,8 @@ def read_season_from_excel(path: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     games_df: pd.DataFrame = pd.read_excel(path, 'Games')
 
-    # drop unnecessary columns
-    games_df.drop(columns=['Day', 'Unnamed: 7', 'YdsW', 'TOW', 'YdsL', 'TOL'], axis=1, inplace=True)
+    # drop unnecessary columns (yards, turnovers and touchdowns are kept for TeamGameStat)
+    games_df.drop(columns=['Day', 'Unnamed: 7'], axis=1, inplace=True)
     # rename unnamed columns
     games_df.rename(columns={'Unnamed: 5': 'At'}, inplace=True)
     # drop rows with no game data
@@ -77,6 +120,48 @@ def read_season_from_excel(path: str) -> tuple[pd.DataFrame, pd.DataFrame]:
 
     return games_df, teams_df
 
+def parse_completed_season_workbook(
+    file_path: str, year: int
+) -> tuple[Season, list[Division], list[Team], list[Game]]:
+    """Parses a completed season workbook into objects ready to insert.
+        - The playoff team and regular season week counts are inferred from the games
+        - Only takes and returns picklable values, so it can run in a worker process
+
+    Args:
+        file_path (str): The path to the Excel file.
+        year (int): Season year.
+
+    Returns:
+        tuple[Season, list[Division], list[Team], list[Game]]: The season information,
+            divisions, teams and games.
+    """
+    games_df, teams_df = read_season_from_excel(file_path)
+    playoff_teams, regular_season_week_count = infer_season_format(games_df)
+
+    return create_season_objects(
+        games_df, teams_df, year, playoff_teams, regular_season_week_count
+    )
+
+def infer_season_format(games_df: pd.DataFrame) -> tuple[int, int]:
+    """Works out the number of playoff teams and regular season weeks from the games played.
+
+    Args:
+        games_df (pd.DataFrame): The games dataframe from read_season_from_excel.
+
+    Returns:
+        tuple[int, int]: The number of playoff teams and the number of weeks in the
+            regular season.
+    """
+    # regular season weeks are numbers, playoff weeks are round names (ie 'WildCard')
+    week_numbers: pd.Series = pd.to_numeric(games_df['Week'], errors='coerce')
+    regular_season_week_count = int(week_numbers.max())
+
+    # every playoff team plays at least one playoff game
+    playoff_games_df: pd.DataFrame = games_df[week_numbers.isna()]
+    playoff_teams = len(set(playoff_games_df['Winner/tie']) | set(playoff_games_df['Loser/tie']))
+
+    return playoff_teams, regular_season_week_count
+
 def create_game(
     row: pd.Series,
     regular_season_week_count: int,
@@ -103,7 +188,7 @@ def create_game(
     # regular season games have a week number
     if isinstance(row['Week'], int):
         week: int = row['Week']
-        week_name: str = f'Week {row['Week']}'
+        week_name: str = f"Week {row['Week']}"
     # playoff games
     else:
         week: int = playoff_name_conversions[row['Week']]
@@ -115,11 +200,13 @@ def create_game(
         home_team = row['Loser/tie']
         away_score = row['PtsW']
         home_score = row['PtsL']
+        away_stats, home_stats = 'W', 'L'
     else:
         away_team = row['Loser/tie']
         home_team = row['Winner/tie']
         away_score = row['PtsL']
         home_score = row['PtsW']
+        away_stats, home_stats = 'L', 'W'
 
     return Game(
         week=week,
@@ -129,9 +216,33 @@ def create_game(
         away_score=away_score,
         home_score=home_score,
         start_time=start_time,
-        overtime=False
+        overtime=False,
+        away_yards=optional_stat(row, f'Yds{away_stats}'),
+        away_turnovers=optional_stat(row, f'TO{away_stats}'),
+        away_touchdowns=optional_stat(row, f'TD{away_stats}'),
+        home_yards=optional_stat(row, f'Yds{home_stats}'),
+        home_turnovers=optional_stat(row, f'TO{home_stats}'),
+        home_touchdowns=optional_stat(row, f'TD{home_stats}'),
     )
 
+def optional_stat(row: pd.Series, column_name: str) -> int | None:
+    """Gets a team stat from a game row, if the column exists and has a value.
+        - Older workbooks have no touchdown columns, and some games have no yardage
+
+    Parameters:
+        row (pd.Series): A pandas series containing the game data.
+        column_name (str): The stat column (ie 'YdsW').
+
+    Returns:
+        int | None: The stat, or None if it is not available.
+    """
+    value = row.get(column_name)
+
+    if value is None or pd.isna(value):
+        return None
+
+    return int(value)
+
 def create_teams_and_divisions(row: pd.Series) -> pd.Series:
     """Creates a Team and Division object from a pandas series representing a NFL team.
 
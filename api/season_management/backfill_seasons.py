@@ -0,0 +1,160 @@
+"""Backfill historical seasons into the database from a folder of season workbooks."""
+import argparse
+import asyncio
+import os
+import re
+import time
+from sqlalchemy.ext.asyncio import AsyncEngine
+from database.database_helper import (
+    DatabaseEnvVariables,
+    get_async_sql_server_engine,
+)
+from database.select.select_foreign_keys import get_season_years
+from helper.file_reader import get_file_names_in_folder_with_filetype
+from season_management.ingestion_pipeline import (
+    SeasonIngestionPipeline,
+    SeasonIngestionResult,
+)
+
+
+def find_season_workbooks(directory: str = 'data', first_year: int = 1970) -> dict[int, str]:
+    """Finds the season workbooks in a folder, keyed by season year.
+        - The season year is the first 4 digit number in the file name (ie '2023 Season.xlsx')
+
+    Args:
+        directory (str, optional): folder with the season workbooks. Defaults to 'data'.
+        first_year (int, optional): earliest season to include. Defaults to 1970.
+
+    Returns:
+        dict[int, str]: season year mapped to the workbook path, sorted by year
+    """
+    workbooks: dict[int, str] = {}
+
+    for file_name in get_file_names_in_folder_with_filetype(directory, 'xlsx'):
+        year_match = re.search(r'\d{4}', file_name)
+
+        # skip workbooks that are not named after a season (ie Excel lock files)
+        if year_match is None or file_name.startswith('~$'):
+            continue
+
+        year = int(year_match.group())
+        if year >= first_year:
+            workbooks[year] = os.path.join(directory, file_name)
+
+    return dict(sorted(workbooks.items()))
+
+
+async def backfill_seasons(
+    directory: str = 'data',
+    first_year: int = 1970,
+    max_concurrent_inserts: int = 4,
+    max_workers: int | None = None,
+) -> tuple[list[SeasonIngestionResult], dict[str, dict]]:
+    """Adds every completed season workbook in a folder to the database.
+        - Workbooks stream through a SeasonIngestionPipeline: parsed in a process pool,
+            then inserted through one shared engine, each season in its own transaction
+        - Seasons already in the database are skipped, so re-running is safe
+
+    Args:
+        directory (str, optional): folder with the season workbooks. Defaults to 'data'.
+        first_year (int, optional): earliest season to load. Defaults to 1970.
+        max_concurrent_inserts (int, optional): max seasons inserting at once. Defaults to 4.
+        max_workers (int | None, optional): parsing processes. Defaults to the CPU count.
+
+    Returns:
+        tuple[list[SeasonIngestionResult], dict[str, dict]]: result for each workbook found
+            in year order, and the pipeline stage stats
+    """
+    workbooks = find_season_workbooks(directory, first_year)
+
+    engine: AsyncEngine = get_async_sql_server_engine(
+        DatabaseEnvVariables(server="Local_SQL_Server", database="NFL_Stats")
+    )
+
+    async with engine.connect() as db:
+        existing_years: set[int] = await get_season_years(db)
+
+    pipeline = SeasonIngestionPipeline(
+        engine,
+        parse_workers=max_workers or os.cpu_count(),
+        writers=max_concurrent_inserts,
+    )
+    added_results = await pipeline.run(
+        {year: path for year, path in workbooks.items() if year not in existing_years}
+    )
+
+    skipped_results = [
+        SeasonIngestionResult(year=year, file_path=path, status='skipped')
+        for year, path in workbooks.items()
+        if year in existing_years
+    ]
+    results = sorted(added_results + skipped_results, key=lambda result: result.year)
+
+    return results, pipeline.stats()
+
+
+def print_backfill_report(
+    results: list[SeasonIngestionResult], stage_stats: dict[str, dict], elapsed_seconds: float
+) -> None:
+    """Prints the outcome of each season, the time spent in each stage and the overall
+        throughput
+
+    Args:
+        results (list[SeasonIngestionResult]): results from backfill_seasons
+        stage_stats (dict[str, dict]): pipeline stage stats from backfill_seasons
+        elapsed_seconds (float): wall-clock time of the whole backfill
+    """
+    for result in results:
+        line = f'{result.year}: {result.status}'
+
+        if result.status == 'added':
+            line += (
+                f' ({result.game_count} games, parsed in {round(result.parse_seconds, 2)}s,'
+                f' validated in {round(result.validate_seconds, 4)}s,'
+                f' inserted in {round(result.insert_seconds, 2)}s)'
+            )
+        elif result.status in ('failed', 'invalid'):
+            line += f' - {result.error}'
+
+        print(line)
+
+    added = [result for result in results if result.status == 'added']
+    failed = [result for result in results if result.status in ('failed', 'invalid')]
+    games_added = sum(result.game_count for result in added)
+
+    for stage_name in ('parse', 'validate', 'write'):
+        stage = stage_stats[stage_name]
+        line = (
+            f'{stage_name}: {stage["items"]} seasons ({stage["failures"]} failed) in '
+            f'{stage["busy_seconds"]}s'
+        )
+        # the write stage feeds no queue, so it has no queue depth
+        if (max_queue_depth := stage.get('max_queue_depth')) is not None:
+            line += f', max output queue depth {max_queue_depth}'
+        print(line)
+
+    print(
+        f'{len(added)} seasons added, {len(results) - len(added) - len(failed)} skipped, '
+        f'{len(failed)} failed in {round(elapsed_seconds, 2)} seconds '
+        f'({round(len(added) / elapsed_seconds, 2)} seasons/s, '
+        f'{round(games_added / elapsed_seconds, 1)} games/s)'
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill seasons from Excel workbooks')
+    parser.add_argument('directory', nargs='?', default='data')
+    parser.add_argument('--first-year', type=int, default=1970)
+    parser.add_argument('--max-concurrent-inserts', type=int, default=4)
+    parser.add_argument('--max-workers', type=int, default=None)
+    args = parser.parse_args()
+
+    backfill_start = time.perf_counter()
+    backfill_results, backfill_stage_stats = asyncio.run(
+        backfill_seasons(
+            args.directory, args.first_year, args.max_concurrent_inserts, args.max_workers
+        )
+    )
+    print_backfill_report(
+        backfill_results, backfill_stage_stats, time.perf_counter() - backfill_start
+    )
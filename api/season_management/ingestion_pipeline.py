@@ -0,0 +1,290 @@
+"""Streaming season ingestion: parse -> validate -> write, connected by bounded queues."""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+from sqlalchemy.ext.asyncio import AsyncEngine
+from data.excel_conversion import Team, Division, Game, Season
+from database.insert.db_insert import insert_entire_season, season_write_transaction
+from season_management.add_season import parse_completed_season_workbook
+from season_management.season_validation import validate_season
+
+
+@dataclass(slots=True)
+class SeasonIngestionResult:
+    """Outcome of ingesting a single season"""
+    year: int
+    file_path: str
+    status: str = field(default='pending')
+    game_count: int = field(default=0)
+    parse_seconds: float = field(default=0.0)
+    validate_seconds: float = field(default=0.0)
+    insert_seconds: float = field(default=0.0)
+    error: str = field(default='')
+
+
+@dataclass(slots=True)
+class ParsedSeason:
+    """Normalized season records passed between pipeline stages"""
+    result: SeasonIngestionResult
+    season_info: Season
+    divisions: list[Division]
+    teams: list[Team]
+    games: list[Game]
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Timing and throughput for one pipeline stage"""
+    name: str
+    items: int = field(default=0)
+    failures: int = field(default=0)
+    busy_seconds: float = field(default=0.0)
+    # deepest the queue this stage feeds has been, None for the last stage
+    max_queue_depth: int | None = field(default=0)
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        """Record one item passing through the stage
+
+        Args:
+            seconds (float): time spent on the item
+            failed (bool, optional): whether the item failed. Defaults to False.
+        """
+        self.items += 1
+        self.busy_seconds += seconds
+        if failed:
+            self.failures += 1
+
+
+# a validator returns every problem it finds with a season, or an empty list
+SeasonValidator = Callable[[ParsedSeason], list[str]]
+
+
+def validate_parsed_season(parsed_season: ParsedSeason) -> list[str]:
+    """Default validator: run the column checks in season_validation on the season
+
+    Args:
+        parsed_season (ParsedSeason): season parsed from a workbook
+
+    Returns:
+        list[str]: every problem found, empty if the season is valid
+    """
+    return validate_season(
+        parsed_season.divisions,
+        parsed_season.teams,
+        parsed_season.games,
+        parsed_season.season_info.regular_season_week_count,
+    )
+
+
+class SeasonIngestionPipeline:
+    """
+    This module streams season workbooks into the database in three stages:
+        1. parse: workbooks are parsed in a process pool into ParsedSeason records
+        2. validate: each record is checked by every validator before it can be written
+        3. write: writer tasks insert each season in its own transaction
+
+    The stages are connected by bounded queues, so parsing of the next seasons overlaps
+    with writing the current ones while the number of parsed seasons held in memory
+    never exceeds parse_workers + 2 * queue_size + writers + 1. If a stage raises, the
+    other stages are cancelled, so none is left waiting on a queue nothing reads.
+
+    Example:
+        pipeline = SeasonIngestionPipeline(engine, validators=[...])
+        results = await pipeline.run({2022: 'data/2022 Season.xlsx'})
+        pipeline.stats()
+
+    Attributes:
+        engine (AsyncEngine): engine the writers insert through
+        validators (list[SeasonValidator]): checks every season must pass to be written
+            (defaults to validate_parsed_season)
+        parse_workers (int): max workbooks parsed at once
+        writers (int): number of writer tasks (max open transactions)
+        queue_size (int): max records waiting between two stages
+        stage_stats (dict[str, StageStats]): timing for each stage
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        validators: list[SeasonValidator] = None,
+        parse_workers: int = 2,
+        writers: int = 4,
+        queue_size: int = 2,
+        parse_season: Callable = parse_completed_season_workbook,
+    ):
+        self.engine = engine
+        self.validators = validators if validators is not None else [validate_parsed_season]
+        self.parse_workers = parse_workers
+        self.writers = writers
+        self.queue_size = queue_size
+        self.parse_season = parse_season
+
+        self.parsed_queue: asyncio.Queue[ParsedSeason | None] = None
+        self.validated_queue: asyncio.Queue[ParsedSeason | None] = None
+        self.stage_stats: dict[str, StageStats] = {
+            'parse': StageStats('parse'),
+            'validate': StageStats('validate'),
+            # the write stage feeds no queue
+            'write': StageStats('write', max_queue_depth=None),
+        }
+
+    async def run(self, workbooks: dict[int, str]) -> list[SeasonIngestionResult]:
+        """Ingest season workbooks
+
+        Args:
+            workbooks (dict[int, str]): season year mapped to the workbook path
+
+        Returns:
+            list[SeasonIngestionResult]: result for each workbook, in the order passed in
+        """
+        self.parsed_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.validated_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        results: list[SeasonIngestionResult] = [
+            SeasonIngestionResult(year=year, file_path=file_path)
+            for year, file_path in workbooks.items()
+        ]
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as process_pool:
+            stage_tasks = [
+                asyncio.create_task(self._parse_stage(results, process_pool)),
+                asyncio.create_task(self._validate_stage()),
+                *[asyncio.create_task(self._write_stage()) for _ in range(self.writers)],
+            ]
+            try:
+                await asyncio.gather(*stage_tasks)
+            # gather doesn't cancel the other stages, which could wait on a queue forever
+            except BaseException:
+                for stage_task in stage_tasks:
+                    stage_task.cancel()
+                await asyncio.gather(*stage_tasks, return_exceptions=True)
+                raise
+
+        return results
+
+    def queue_depths(self) -> dict[str, int]:
+        """Current number of records waiting in each queue
+
+        Returns:
+            dict[str, int]: queue name mapped to its depth
+        """
+        return {
+            'parsed': self.parsed_queue.qsize() if self.parsed_queue else 0,
+            'validated': self.validated_queue.qsize() if self.validated_queue else 0,
+        }
+
+    def stats(self) -> dict[str, dict]:
+        """Snapshot of each stage's timing and the current queue depths
+
+        Returns:
+            dict[str, dict]: stage name mapped to its stats, plus 'queue_depths'
+        """
+        snapshot: dict[str, dict] = {}
+        for name, stage in self.stage_stats.items():
+            snapshot[name] = {
+                'items': stage.items,
+                'failures': stage.failures,
+                'busy_seconds': round(stage.busy_seconds, 4),
+            }
+            if stage.max_queue_depth is not None:
+                snapshot[name]['max_queue_depth'] = stage.max_queue_depth
+        snapshot['queue_depths'] = self.queue_depths()
+
+        return snapshot
+
+    async def _put(self, queue: asyncio.Queue, stage: StageStats, item: ParsedSeason) -> None:
+        """Put an item on the queue feeding the next stage, waiting while it is full"""
+        await queue.put(item)
+        stage.max_queue_depth = max(stage.max_queue_depth, queue.qsize())
+
+    async def _parse_stage(
+        self, results: list[SeasonIngestionResult], process_pool: ProcessPoolExecutor
+    ) -> None:
+        """Parse workbooks in the process pool and queue them for validation"""
+        loop = asyncio.get_running_loop()
+        parse_slots = asyncio.Semaphore(self.parse_workers)
+        stage = self.stage_stats['parse']
+
+        async def parse(result: SeasonIngestionResult) -> None:
+            # the slot is held until the record is queued, so a full queue pauses parsing
+            async with parse_slots:
+                start = time.perf_counter()
+                try:
+                    season_info, divisions, teams, games = await loop.run_in_executor(
+                        process_pool, self.parse_season, result.file_path, result.year
+                    )
+                # a workbook that can't be parsed should not stop the other seasons
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    result.status = 'failed'
+                    result.error = f'{type(error).__name__}: {error}'
+                    stage.record(time.perf_counter() - start, failed=True)
+                    return
+
+                result.parse_seconds = time.perf_counter() - start
+                result.game_count = len(games)
+                stage.record(result.parse_seconds)
+
+                await self._put(
+                    self.parsed_queue,
+                    stage,
+                    ParsedSeason(result, season_info, divisions, teams, games),
+                )
+
+        await asyncio.gather(*[parse(result) for result in results])
+        # when a stage fails the others are cancelled instead of sent the end marker
+        await self.parsed_queue.put(None)
+
+    async def _validate_stage(self) -> None:
+        """Run every validator on each parsed season and queue the valid ones for writing"""
+        stage = self.stage_stats['validate']
+
+        while (parsed_season := await self.parsed_queue.get()) is not None:
+            start = time.perf_counter()
+            errors: list[str] = []
+            for validator in self.validators:
+                try:
+                    errors.extend(validator(parsed_season))
+                # a broken validator fails the season rather than stalling the pipeline
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    errors.append(f'{type(error).__name__}: {error}')
+            parsed_season.result.validate_seconds = time.perf_counter() - start
+            stage.record(parsed_season.result.validate_seconds, failed=bool(errors))
+
+            if errors:
+                parsed_season.result.status = 'invalid'
+                parsed_season.result.error = '; '.join(errors)
+                continue
+
+            await self._put(self.validated_queue, stage, parsed_season)
+
+        for _ in range(self.writers):
+            await self.validated_queue.put(None)
+
+    async def _write_stage(self) -> None:
+        """Insert validated seasons, each in its own transaction"""
+        stage = self.stage_stats['write']
+
+        while (parsed_season := await self.validated_queue.get()) is not None:
+            result = parsed_season.result
+            start = time.perf_counter()
+
+            try:
+                async with season_write_transaction(self.engine, result.year) as db:
+                    await insert_entire_season(
+                        db,
+                        parsed_season.season_info,
+                        parsed_season.divisions,
+                        parsed_season.teams,
+                        parsed_season.games,
+                        completed_season=True,
+                    )
+                result.status = 'added'
+            # the transaction has been rolled back, so only this season is lost
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                result.status = 'failed'
+                result.error = f'{type(error).__name__}: {error}'
+
+            result.insert_seconds = time.perf_counter() - start
+            stage.record(result.insert_seconds, failed=result.status == 'failed')
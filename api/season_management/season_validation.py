@@ -0,0 +1,189 @@
+"""Validate parsed season data before it is added to the database.
+
+Every check is a column operation over the whole season, so a season is validated in a
+few milliseconds and every problem is reported at once instead of the first one failing
+part way through the insert transaction.
+"""
+from dataclasses import fields
+import pandas as pd
+from data.excel_conversion import Team, Division, Game
+
+
+def objects_to_dataframe(objects: list, object_class: type) -> pd.DataFrame:
+    """Create a dataframe with a column for each dataclass field
+
+    Args:
+        objects (list): list of dataclass objects
+        object_class (type): the dataclass type, so an empty list still has columns
+
+    Returns:
+        pd.DataFrame: dataframe with one row per object
+    """
+    return pd.DataFrame(
+        {
+            object_field.name: [getattr(obj, object_field.name) for obj in objects]
+            for object_field in fields(object_class)
+        }
+    )
+
+
+def validate_season(
+    divisions: list[Division],
+    teams: list[Team],
+    games: list[Game],
+    regular_season_week_count: int,
+    completed_season: bool = True,
+) -> list[str]:
+    """Validate the objects for a season
+
+    Args:
+        divisions (list[Division]): divisions in the season
+        teams (list[Team]): teams in the season
+        games (list[Game]): games in the season
+        regular_season_week_count (int): number of weeks in the regular season
+        completed_season (bool, optional): whether every game needs a score. Defaults to True.
+
+    Returns:
+        list[str]: every problem found, empty if the season is valid
+    """
+    return validate_season_frames(
+        objects_to_dataframe(divisions, Division),
+        objects_to_dataframe(teams, Team),
+        objects_to_dataframe(games, Game),
+        regular_season_week_count,
+        completed_season,
+    )
+
+
+def validate_season_frames(
+    divisions_df: pd.DataFrame,
+    teams_df: pd.DataFrame,
+    games_df: pd.DataFrame,
+    regular_season_week_count: int,
+    completed_season: bool = True,
+) -> list[str]:
+    """Validate season dataframes with columns named after the excel_conversion fields
+
+    Args:
+        divisions_df (pd.DataFrame): divisions (name, conference)
+        teams_df (pd.DataFrame): teams (full_name, division)
+        games_df (pd.DataFrame): games (week, away_team, home_team, away_score, home_score)
+        regular_season_week_count (int): number of weeks in the regular season
+        completed_season (bool, optional): whether every game needs a score. Defaults to True.
+
+    Returns:
+        list[str]: every problem found, empty if the season is valid
+    """
+    errors: list[str] = []
+
+    ## teams and divisions ##
+
+    # teams in a division that is not in the season (KeyError in add_teams)
+    errors += describe_rows(
+        teams_df,
+        ~teams_df['division'].isin(divisions_df['name']),
+        '{full_name} is in unknown division "{division}"',
+    )
+
+    # team full names are used to look up team ids, so they must be unique
+    errors += describe_rows(
+        teams_df, teams_df['full_name'].duplicated(), 'Team {full_name} is listed more than once'
+    )
+
+    ## games ##
+
+    # teams that are not in the season (KeyError in add_games)
+    known_teams: pd.Series = teams_df['full_name']
+    errors += describe_rows(
+        games_df,
+        ~games_df['away_team'].isin(known_teams),
+        'Week {week}: unknown away team "{away_team}"',
+    )
+    errors += describe_rows(
+        games_df,
+        ~games_df['home_team'].isin(known_teams),
+        'Week {week}: unknown home team "{home_team}"',
+    )
+    errors += describe_rows(
+        games_df,
+        games_df['away_team'] == games_df['home_team'],
+        'Week {week}: {home_team} is listed as playing itself',
+    )
+
+    # week numbers run from 1 to the last playoff round
+    weeks: pd.Series = pd.to_numeric(games_df['week'], errors='coerce')
+    last_week = regular_season_week_count + 4
+    errors += describe_rows(
+        games_df,
+        weeks.isna() | (weeks < 1) | (weeks > last_week) | (weeks % 1 != 0),
+        '{away_team} at {home_team} has week {week}, which is not 1-' + str(last_week),
+    )
+
+    duplicate_games_mask: pd.Series = games_df.duplicated(
+        subset=['week', 'away_team', 'home_team']
+    )
+    errors += describe_rows(
+        games_df,
+        duplicate_games_mask,
+        'Week {week}: {away_team} at {home_team} is listed more than once',
+    )
+
+    # stack away and home teams so each team has one row per game it played,
+    #   leaving out the exact duplicate games reported above
+    team_weeks = pd.DataFrame(
+        {
+            'week': pd.concat([games_df['week'], games_df['week']], ignore_index=True),
+            'team': pd.concat([games_df['away_team'], games_df['home_team']], ignore_index=True),
+        }
+    )[~pd.concat([duplicate_games_mask, duplicate_games_mask], ignore_index=True)]
+    double_booked = team_weeks[team_weeks.duplicated()].drop_duplicates()
+    errors += describe_rows(
+        double_booked,
+        pd.Series(True, index=double_booked.index),
+        'Week {week}: {team} plays more than one game',
+    )
+
+    ## scores ##
+
+    for side in ('away_score', 'home_score'):
+        scores: pd.Series = pd.to_numeric(games_df[side], errors='coerce')
+        # scores that aren't numbers, or are blank when the season is complete
+        unreadable = scores.isna() & games_df[side].notna()
+        if completed_season:
+            unreadable |= scores.isna()
+        # a team can score any whole number of points except 1
+        errors += describe_rows(
+            games_df,
+            (scores < 0) | (scores == 1) | (scores % 1 > 0) | unreadable,
+            'Week {week}: {away_team} at {home_team} has ' + side.replace('_', ' ') + ' {'
+            + side + '}',
+        )
+
+    # playoff games can't end in a tie
+    errors += describe_rows(
+        games_df,
+        (weeks > regular_season_week_count)
+        & games_df['away_score'].notna()
+        & (games_df['away_score'] == games_df['home_score']),
+        'Week {week}: playoff game {away_team} at {home_team} ends in a tie',
+    )
+
+    return errors
+
+
+def describe_rows(df: pd.DataFrame, mask: pd.Series, message: str) -> list[str]:
+    """Format an error message for every row in the mask
+        - Returns straight away when no rows match, which is almost every check
+
+    Args:
+        df (pd.DataFrame): dataframe being checked
+        mask (pd.Series): True for each row with the problem
+        message (str): message format string, with column names as fields
+
+    Returns:
+        list[str]: one message per matching row
+    """
+    if not mask.any():
+        return []
+
+    return [message.format(**row) for row in df[mask].to_dict('records')]